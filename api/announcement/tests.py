@@ -1,3 +1,95 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from .models import Announcement
+
+User = get_user_model()
+
+
+class AnnouncementQueryBudgetTests(APITestCase):
+    """公告接口的查询次数预算，查询次数不应随返回行数增长"""
+
+    # 条件 GET 校验值聚合 + 主查询
+    LIST_BUDGET = 2
+    DETAIL_BUDGET = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='student', email='student@example.com', password='pass', role='student')
+
+    def create_announcements(self, count):
+        for i in range(count):
+            Announcement.objects.create(title=f'公告 {i}', content='内容', source='horizontal')
+            Announcement.objects.create(title=f'通知 {i}', content='内容', type='warning')
+
+    def test_list(self):
+        self.client.force_authenticate(self.user)
+        for count in (1, 5):
+            self.create_announcements(count)
+            with self.assertNumQueries(self.LIST_BUDGET):
+                response = self.client.get('/api/announcement/')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json())
+
+    def test_list_filtered_by_source(self):
+        self.create_announcements(3)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(self.LIST_BUDGET):
+            response = self.client.get('/api/announcement/?source=horizontal')
+        self.assertEqual(len(response.json()), 3)
+
+    def test_detail(self):
+        self.create_announcements(1)
+        self.client.force_authenticate(self.user)
+        announcement = Announcement.objects.first()
+        with self.assertNumQueries(self.DETAIL_BUDGET):
+            response = self.client.get(f'/api/announcement/{announcement.id}/')
+        self.assertEqual(response.status_code, 200)
+
+
+class AnnouncementListTests(APITestCase):
+    """公告列表：需要登录，按筛选条件返回，支持条件 GET"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='student', email='student@example.com', password='pass', role='student')
+        cls.first = Announcement.objects.create(title='公告', content='内容', source='horizontal')
+        cls.second = Announcement.objects.create(title='通知', content='内容', type='warning')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_authentication(self):
+        self.assertEqual(self.client.get('/api/announcement/').status_code, 403)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/announcement/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json()], [self.second.id, self.first.id])
+        self.assertEqual(response.json()[1]['title'], '公告')
+
+        # 公告只读
+        self.assertEqual(self.client.post('/api/announcement/', {'title': 'x'}).status_code, 405)
+
+    def test_filter_and_conditional_get(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/announcement/?source=horizontal')
+        self.assertEqual([item['id'] for item in response.json()], [self.first.id])
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/announcement/?source=horizontal', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # 筛选条件不同的列表使用不同的 ETag
+        response = self.client.get('/api/announcement/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        self.first.delete()
+        response = self.client.get('/api/announcement/?source=horizontal', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.json()), (200, []))
@@ -2,10 +2,11 @@ from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from .models import Announcement
 from .serializers import AnnouncementSerializer
+from mysite.conditional import ConditionalListMixin
 
 # Create your views here.
 
-class AnnouncementViewSet(viewsets.ReadOnlyModelViewSet):
+class AnnouncementViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
     """公告视图集"""
     
     queryset = Announcement.objects.all()
@@ -0,0 +1,146 @@
+"""
+接口压测对比脚本
+
+对一个或多个部署（如 runserver 和 gunicorn）依次施加相同的并发负载，输出吞吐量和延迟分位数，
+并以第一个部署为基准计算吞吐量变化：
+
+    # 开发服务器
+    python manage.py runserver 0.0.0.0:8000
+    # 生产配置
+    gunicorn -c python:mysite.gunicorn_conf
+
+    python loadtest.py --target runserver=http://127.0.0.1:8000 --target gunicorn=http://127.0.0.1:8888 \\
+        --username teacher --password ****** --role teacher --concurrency 50 --duration 30
+
+压测用户很快会触发限流（429 单独计数，不计入吞吐量），压测环境需通过
+THROTTLE_RATE_USER / THROTTLE_RATE_HEAVY 调高限流额度，并在每次压测前确认两个部署使用同一个数据库和 Redis。
+每个并发连接在计时开始前登录，登录的耗时不计入结果。历次压测结果记录在 README 中。
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# 默认压测访问量最大的只读接口
+DEFAULT_PATHS = [
+    '/api/announcement/',
+    '/api/workload/review_counts/',
+    '/api/workload/summary/',
+    '/api/workload/?page_size=20',
+]
+
+
+def login(session, base_url, args):
+    response = session.post(f'{base_url}/api/user/login/', json={
+        'username': args.username,
+        'password': args.password,
+        'role': args.role,
+    }, timeout=args.timeout)
+    response.raise_for_status()
+
+
+def create_session(base_url, args):
+    session = requests.Session()
+    if args.username:
+        login(session, base_url, args)
+    return session
+
+
+def run_worker(session, base_url, args, deadline, results, lock):
+    """单个并发连接：轮流请求各接口，直到截止时间"""
+    latencies, errors, throttled, index = [], 0, 0, 0
+    while time.monotonic() < deadline:
+        path = args.path[index % len(args.path)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            response = session.get(f'{base_url}{path}', timeout=args.timeout)
+        except requests.RequestException:
+            errors += 1
+            continue
+        elapsed = time.perf_counter() - start
+        if response.status_code == 429:
+            throttled += 1
+        elif response.status_code >= 400:
+            errors += 1
+        else:
+            latencies.append(elapsed)
+
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+        results['throttled'] += throttled
+
+
+def run_target(base_url, args):
+    """对一个部署先预热再压测，返回统计结果"""
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        # 登录（密码哈希很慢）在计时之前完成，不计入压测结果
+        sessions = list(executor.map(lambda _: create_session(base_url, args), range(args.concurrency)))
+        # 预热阶段的结果丢弃，只保留正式压测的结果
+        for duration in (args.warmup, args.duration):
+            results = {'latencies': [], 'errors': 0, 'throttled': 0}
+            lock = threading.Lock()
+            deadline = time.monotonic() + duration
+            futures = [
+                executor.submit(run_worker, session, base_url, args, deadline, results, lock)
+                for session in sessions
+            ]
+            for future in futures:
+                future.result()
+
+    latencies = sorted(results['latencies'])
+    stats = {
+        'requests': len(latencies),
+        'rps': len(latencies) / args.duration,
+        'errors': results['errors'],
+        'throttled': results['throttled'],
+    }
+    for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+        stats[name] = latencies[min(int(len(latencies) * q), len(latencies) - 1)] * 1000 if latencies else 0.0
+    stats['mean'] = statistics.fmean(latencies) * 1000 if latencies else 0.0
+    return stats
+
+
+def parse_target(value):
+    name, sep, url = value.partition('=')
+    if not sep:
+        name, url = value, value
+    return name, url.rstrip('/')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='接口压测对比')
+    parser.add_argument('--target', action='append', type=parse_target, required=True,
+                        help='名称=地址，可重复指定，第一个作为对比基准')
+    parser.add_argument('--path', action='append', help='压测的接口路径，可重复指定')
+    parser.add_argument('--username')
+    parser.add_argument('--password')
+    parser.add_argument('--role', default='teacher')
+    parser.add_argument('--concurrency', type=int, default=20, help='并发连接数')
+    parser.add_argument('--duration', type=float, default=30, help='每个部署的压测时长（秒）')
+    parser.add_argument('--warmup', type=float, default=5, help='预热时长（秒），不计入结果')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求超时（秒）')
+    args = parser.parse_args()
+    args.path = args.path or DEFAULT_PATHS
+
+    rows = []
+    for name, url in args.target:
+        print(f'压测 {name} ({url})，并发 {args.concurrency}，时长 {args.duration:g} 秒...')
+        rows.append((name, run_target(url, args)))
+
+    baseline = rows[0][1]['rps']
+    print()
+    print(f"{'部署':<12}{'请求数':>10}{'吞吐量/s':>12}{'平均ms':>10}{'p50ms':>10}{'p95ms':>10}{'p99ms':>10}"
+          f"{'错误':>8}{'限流':>8}{'吞吐变化':>10}")
+    for name, stats in rows:
+        change = f"{(stats['rps'] / baseline - 1) * 100:+.1f}%" if baseline else '-'
+        print(f"{name:<12}{stats['requests']:>10}{stats['rps']:>12.1f}{stats['mean']:>10.1f}{stats['p50']:>10.1f}"
+              f"{stats['p95']:>10.1f}{stats['p99']:>10.1f}{stats['errors']:>8}{stats['throttled']:>8}{change:>10}")
+
+
+if __name__ == '__main__':
+    main()
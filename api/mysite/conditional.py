@@ -0,0 +1,68 @@
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from rest_framework.response import Response
+
+# 计算列表校验值的聚合：行数和 ID 之和用于识别删除和移出筛选范围的行，最大 updated_at 用于识别新增和修改
+LIST_STATS = {'last_modified': Max('updated_at'), 'total': Count('id'), 'id_sum': Sum('id')}
+
+
+def build_list_etag(stats, etag_version, user_pk, full_path):
+    """由聚合结果计算 ETag"""
+    last_modified = stats['last_modified']
+    raw = ':'.join([
+        str(etag_version),
+        str(user_pk),
+        full_path,
+        last_modified.isoformat() if last_modified else '',
+        str(stats['total']),
+        str(stats['id_sum'] or 0),
+    ])
+    return '"%s"' % hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def patch_list_etag(response, etag):
+    """为列表响应（含 304）设置 ETag 和缓存控制头"""
+    response['ETag'] = etag
+    # 要求浏览器每次都带校验值重新验证，数据与登录用户相关
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie', 'Authorization'])
+    return response
+
+
+class ConditionalListMixin:
+    """
+    列表接口的条件 GET 支持
+
+    用一次聚合查询取得可见数据的 max(updated_at)、行数和 ID 之和计算 ETag，
+    请求携带的 If-None-Match 仍然有效时直接返回 304，不再查询列表数据，也不做序列化。
+
+    不提供 Last-Modified：行被删除或移出筛选范围时 max(updated_at) 不变，
+    只凭 If-Modified-Since 会返回过期的 304。
+    """
+    # 响应结构变化时递增，使客户端已缓存的 ETag 失效
+    etag_version = 1
+
+    def get_list_etag(self, queryset):
+        stats = queryset.order_by().aggregate(**LIST_STATS)
+        return build_list_etag(stats, self.etag_version, self.request.user.pk, self.request.get_full_path())
+
+    def list_response(self, queryset):
+        """序列化列表（配置了分页类时按分页返回），并处理条件请求"""
+        etag = self.get_list_etag(queryset)
+
+        response = get_conditional_response(self.request._request, etag=etag)
+        if response is None:
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                response = self.get_paginated_response(serializer.data)
+            else:
+                serializer = self.get_serializer(queryset, many=True)
+                response = Response(serializer.data)
+
+        return patch_list_etag(response, etag)
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
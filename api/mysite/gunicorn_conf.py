@@ -0,0 +1,86 @@
+"""
+Gunicorn 生产环境配置
+
+    gunicorn -c python:mysite.gunicorn_conf
+
+默认使用 gthread worker 运行 WSGI 应用 mysite.wsgi:application，每个 worker 使用 GUNICORN_THREADS 个线程。
+GUNICORN_WORKER_CLASS 设为 uvicorn 的 worker（如 uvicorn.workers.UvicornWorker）时改为运行
+ASGI 应用 mysite.asgi:application；其他 worker 类型一律运行 WSGI 应用。
+所有接口都是同步视图，ASGI 下同样在线程中执行，不会因此提高并发。
+
+- worker 数量默认与可用 CPU 数相同，不超过 GUNICORN_MAX_WORKERS；等待 MySQL、Redis 的并发由 gthread 的线程承担
+- 默认的 worker 数和线程数只在 1 核、SQLite 的环境中压测过（见 README），
+  尚未在多核、MySQL + Redis 的环境中验证，上线前应按实际机器压测后通过环境变量调整
+- preload_app：主进程导入 Django 后再 fork，worker 共享已导入代码的内存
+- max_requests 加随机抖动：worker 处理一定数量的请求后重启，避免内存缓慢增长，也避免同时重启
+- timeout / graceful_timeout：卡住的 worker 被重启；重启和发布时给进行中的请求留出完成时间
+- 多个 worker 时 /metrics 通过 PROMETHEUS_MULTIPROC_DIR 汇总所有 worker 的指标
+"""
+import multiprocessing
+import os
+import shutil
+
+
+def cpu_count():
+    """容器限制了可用 CPU 时以实际可用的数量为准"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8888')}"
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+# 只有 uvicorn 的 worker 是 ASGI worker，sync、gthread、gevent 等都需要 WSGI 应用
+if worker_class.startswith('uvicorn.'):
+    wsgi_app = 'mysite.asgi:application'
+else:
+    wsgi_app = 'mysite.wsgi:application'
+# threads 大于 1 时 gunicorn 会把 sync worker 换成 gthread，只在 gthread 下设置
+if worker_class == 'gthread':
+    threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+workers = int(os.getenv(
+    'GUNICORN_WORKERS',
+    min(cpu_count(), int(os.getenv('GUNICORN_MAX_WORKERS', '12')))
+))
+
+preload_app = True
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+# 导出等较慢的请求已改为后台任务，60 秒足以覆盖同步接口
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# 心跳文件放在内存文件系统中，避免容器磁盘 IO 阻塞导致 worker 被误判超时
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# 信任反向代理传递的 X-Forwarded-* 头
+forwarded_allow_ips = os.getenv('GUNICORN_FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+# prometheus_client 在导入时读取该变量，preload 在 on_starting 之前导入 Django，
+# 因此在加载配置时设置变量并清空上次运行留下的指标文件
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+
+def post_fork(server, worker):
+    """preload 时主进程可能已建立数据库连接，worker 不能共用同一个套接字"""
+    from django.db import connections
+
+    connections.close_all()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
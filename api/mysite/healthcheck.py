@@ -0,0 +1,28 @@
+"""
+容器健康检查命令：python -m mysite.healthcheck
+
+请求本机的 /api/health/，成功时退出码为 0。镜像中没有 curl，只使用标准库，不导入 Django。
+Host 头取 DJANGO_ALLOWED_HOSTS 中的第一个主机名，避免被 ALLOWED_HOSTS 拒绝。
+"""
+import os
+import sys
+import urllib.request
+
+
+def main():
+    hosts = [host.strip() for host in os.getenv('DJANGO_ALLOWED_HOSTS', '').split(',')]
+    host = next((h.lstrip('.') for h in hosts if h and h != '*'), 'localhost')
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{os.getenv('PORT', '8888')}/api/health/",
+        headers={'Host': host},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return 0 if response.status == 200 else 1
+    except Exception as e:
+        print(f"健康检查失败: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
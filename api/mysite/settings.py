@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
+from datetime import timedelta
 import os
 from dotenv import load_dotenv
 
@@ -133,6 +134,23 @@ CACHES = {
     }
 }
 
+# 待审核计数缓存时间（秒），状态变化时主动失效，过期时间只用于兜底
+REVIEW_COUNT_TTL = int(os.getenv('REVIEW_COUNT_TTL', '300'))
+
+# 用户目录（审核人、参与人选择）缓存时间（秒），用户变化时主动失效
+USER_DIRECTORY_TTL = int(os.getenv('USER_DIRECTORY_TTL', '3600'))
+USER_SEARCH_MAX_LIMIT = 50  # 用户搜索每次最多返回的数量
+
+# 会话认证的用户快照缓存时间（秒），用户变化时通过版本号失效
+USER_SNAPSHOT_TTL = int(os.getenv('USER_SNAPSHOT_TTL', '3600'))
+
+# CachedUserBackend 从缓存快照加载会话用户；保留 ModelBackend 使其生效前建立的会话仍然有效，
+# 这些会话过期（SESSION_COOKIE_AGE）后可以移除
+AUTHENTICATION_BACKENDS = [
+    'user.backends.CachedUserBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # Redis 会话配置
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -183,6 +201,27 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# 后台导出任务配置（导出文件不放在 MEDIA_ROOT 下，避免被公开访问）
+EXPORT_ROOT = os.getenv('EXPORT_ROOT', os.path.join(BASE_DIR, 'exports'))
+EXPORT_JOB_WORKERS = int(os.getenv('EXPORT_JOB_WORKERS', '1'))  # 每个 Web 进程的导出进程池大小
+EXPORT_JOB_TIMEOUT = int(os.getenv('EXPORT_JOB_TIMEOUT', '1800'))  # 导出任务超过该时间（秒）未完成视为失败
+EXPORT_CACHE_TTL = int(os.getenv('EXPORT_CACHE_TTL', '86400'))  # 导出文件保留时间（秒）
+
+# 工作量附件与分片上传配置
+WORKLOAD_ATTACHMENT_MAX_SIZE = int(os.getenv('WORKLOAD_ATTACHMENT_MAX_SIZE', str(10 * 1024 * 1024)))  # 10MB
+UPLOAD_CHUNK_MAX_SIZE = int(os.getenv('UPLOAD_CHUNK_MAX_SIZE', str(4 * 1024 * 1024)))  # 单个分片最大字节数
+UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', '86400'))  # 未使用的上传会话保留时间（秒）
+# 图片附件保存前缩小尺寸、重新压缩并去掉 EXIF
+WORKLOAD_IMAGE_OPTIMIZE = os.getenv('WORKLOAD_IMAGE_OPTIMIZE', 'True') == 'True'
+WORKLOAD_IMAGE_MAX_DIMENSION = int(os.getenv('WORKLOAD_IMAGE_MAX_DIMENSION', '2560'))  # 长边最大像素
+WORKLOAD_IMAGE_QUALITY = int(os.getenv('WORKLOAD_IMAGE_QUALITY', '85'))  # JPEG / WebP 压缩质量
+WORKLOAD_THUMBNAIL_FORMAT = os.getenv('WORKLOAD_THUMBNAIL_FORMAT', 'webp')  # 图片附件缩略图格式：webp 或 jpeg
+WORKLOAD_THUMBNAIL_QUALITY = int(os.getenv('WORKLOAD_THUMBNAIL_QUALITY', '80'))
+
+# 附件下载交给前置代理传输：nginx 使用 X-Accel-Redirect，apache 使用 X-Sendfile，留空时由 Django 返回
+MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT', '')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')  # nginx 中映射到 MEDIA_ROOT 的 internal location
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -191,6 +230,17 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # 设置自定义用户模型
 AUTH_USER_MODEL = 'user.User'
 
+# JWT 令牌认证：开启后登录接口同时签发令牌，接口可通过 Authorization: Bearer <access> 访问，
+# 用户信息从令牌声明中读取，不查询会话和用户表
+JWT_AUTH_ENABLED = os.getenv('JWT_AUTH_ENABLED', 'False') == 'True'
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', '15'))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', '1'))),
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'UPDATE_LAST_LOGIN': False,
+}
+
 # REST Framework配置
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -200,18 +250,31 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # 滑动窗口限流，请求按视图声明的 throttle_costs 扣减额度，见 mysite/throttling.py
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'mysite.throttling.CostAnonRateThrottle',
+        'mysite.throttling.CostUserRateThrottle',
+        'mysite.throttling.HeavyRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '30/minute',    # 匿名用户限流
-        'user': '60/minute',    # 认证用户限流
-        'burst': '100/minute',  # 突发请求限流
+        'anon': os.getenv('THROTTLE_RATE_ANON', '30/minute'),    # 匿名用户限流
+        'user': os.getenv('THROTTLE_RATE_USER', '60/minute'),    # 认证用户限流
+        'heavy': os.getenv('THROTTLE_RATE_HEAVY', '40/minute'),  # 导出、导入、批量操作、上传等高代价请求的额外限流
     },
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+if JWT_AUTH_ENABLED:
+    # 携带 Bearer 令牌的请求在令牌认证中完成，不再读取会话
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].insert(0, 'user.authentication.ClaimsJWTAuthentication')
+
+# 允许访问 /metrics 的地址，逗号分隔，支持网段（如 10.0.0.0/8），以 REMOTE_ADDR 判断；管理员登录后也可以访问
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+
+# 工作量列表游标分页配置
+WORKLOAD_PAGE_SIZE = int(os.getenv('WORKLOAD_PAGE_SIZE', '50'))  # 默认每页数量
+WORKLOAD_MAX_PAGE_SIZE = int(os.getenv('WORKLOAD_MAX_PAGE_SIZE', '500'))  # 每页数量上限
+
 
 FRONTEND_PORT = os.getenv("FRONTEND_PORT", "3333")
 FRONTEND_HOSTS = os.getenv("FRONTEND_HOSTS", "localhost,127.0.0.1,web,0.0.0.0").split(",")
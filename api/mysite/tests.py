@@ -0,0 +1,86 @@
+import os
+import runpy
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+
+class HealthTests(TestCase):
+    """健康检查不需要登录，数据库不可用时返回 503"""
+
+    def test_ok(self):
+        response = self.client.get('/api/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_database_unavailable(self):
+        with mock.patch('mysite.views.connection.ensure_connection', side_effect=Exception('down')):
+            response = self.client.get('/api/health/')
+        self.assertEqual(response.status_code, 503)
+
+
+class GunicornConfigTests(TestCase):
+    """gunicorn 配置：按 worker 类型选择 WSGI 或 ASGI 应用，worker 数默认与 CPU 数相同"""
+
+    def load_config(self, worker_class=None, **env):
+        multiproc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, multiproc_dir, ignore_errors=True)
+        # 配置加载时会修改环境变量，结束后恢复
+        with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': multiproc_dir}):
+            for name in ('GUNICORN_WORKER_CLASS', 'GUNICORN_WORKERS', 'GUNICORN_MAX_WORKERS'):
+                os.environ.pop(name, None)
+            if worker_class:
+                os.environ['GUNICORN_WORKER_CLASS'] = worker_class
+            os.environ.update(env)
+            return runpy.run_module('mysite.gunicorn_conf')
+
+    def test_workers_follow_cpu_count(self):
+        with mock.patch('os.sched_getaffinity', return_value=set(range(4)), create=True):
+            self.assertEqual(self.load_config()['workers'], 4)
+            self.assertEqual(self.load_config(GUNICORN_MAX_WORKERS='2')['workers'], 2)
+            self.assertEqual(self.load_config(GUNICORN_WORKERS='6')['workers'], 6)
+
+    def test_worker_class_selects_app(self):
+        config = self.load_config()
+        self.assertEqual((config['worker_class'], config['wsgi_app']), ('gthread', 'mysite.wsgi:application'))
+        self.assertEqual(config['threads'], 4)
+
+        config = self.load_config('sync')
+        self.assertEqual(config['wsgi_app'], 'mysite.wsgi:application')
+        # sync worker 不设置 threads，否则 gunicorn 会改用 gthread
+        self.assertNotIn('threads', config)
+
+        config = self.load_config('uvicorn.workers.UvicornWorker')
+        self.assertEqual(config['wsgi_app'], 'mysite.asgi:application')
+
+
+class MetricsAccessTests(TestCase):
+    """/metrics 只允许指定地址和管理员访问"""
+
+    def test_allowed_addresses(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.5').status_code, 403)
+        # 经同一主机上的反向代理转发的外部请求
+        self.assertEqual(self.client.get('/metrics', HTTP_X_FORWARDED_FOR='203.0.113.5').status_code, 403)
+
+        with self.settings(METRICS_ALLOWED_IPS=['10.0.0.0/8', 'invalid']):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    def test_admin_allowed(self):
+        user = get_user_model().objects.create_user(
+            username='user', email='user@example.com', password='pass', role='teacher')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.5').status_code, 403)
+
+        # 会话中的用户来自缓存快照，在事务提交后失效
+        with self.captureOnCommitCallbacks(execute=True):
+            user.is_staff = True
+            user.save()
+        response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'api_throttle_requests_total', response.content)
+
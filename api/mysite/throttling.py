@@ -0,0 +1,182 @@
+"""
+按代价计数的滑动窗口限流
+
+DRF 自带的限流对每个请求计数 1。这里每个视图通过 throttle_costs 声明各动作的代价
+（导出、批量操作、上传高于普通读取），请求按代价扣减所在范围的额度：
+
+    class WorkloadViewSet(viewsets.ModelViewSet):
+        throttle_costs = {'export': 10, 'bulk_review': 5, 'thumbnail': 0}
+
+代价为 0 的动作不计入任何范围的额度（如页面上成批加载的缩略图和附件）。
+
+额度使用滑动窗口计数：当前窗口的计数加上一窗口计数按剩余比例折算，
+避免固定窗口在边界处放行两倍请求。Redis 中通过 Lua 脚本原子地判断和扣减；
+默认缓存不是 django-redis 时（如测试环境）退回到缓存接口。Redis 不可用时放行请求。
+
+限流结果通过 django-prometheus 暴露的 /metrics 输出：
+- api_throttle_requests_total{scope, view, result}：放行 / 拒绝的请求数
+- api_throttle_cost_total{scope, view}：放行请求消耗的额度
+- api_throttle_remaining_ratio{scope}：请求后剩余额度占比的分布
+"""
+import logging
+
+from django.conf import settings
+from prometheus_client import Counter, Histogram
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_REQUESTS = Counter(
+    'api_throttle_requests_total', '限流检查的请求数', ['scope', 'view', 'result']
+)
+THROTTLE_COST = Counter(
+    'api_throttle_cost_total', '放行请求消耗的限流额度', ['scope', 'view']
+)
+THROTTLE_REMAINING = Histogram(
+    'api_throttle_remaining_ratio', '请求后剩余额度占比', ['scope'],
+    buckets=(0, 0.1, 0.25, 0.5, 0.75, 1),
+)
+
+# KEYS: 当前窗口, 上一窗口；ARGV: 额度, 代价, 上一窗口权重, 过期时间
+# 返回 {是否放行, 扣减后（或拒绝时）已用额度, 上一窗口计数}，已用额度为小数，以字符串返回
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local used = previous * tonumber(ARGV[3]) + current
+local cost = tonumber(ARGV[2])
+if used + cost > tonumber(ARGV[1]) then
+    return {0, tostring(used), previous}
+end
+redis.call('INCRBY', KEYS[1], cost)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {1, tostring(used + cost), previous}
+"""
+
+
+def get_view_cost(view):
+    """视图当前动作的代价，未声明时为 1"""
+    costs = getattr(view, 'throttle_costs', None) or {}
+    return costs.get(getattr(view, 'action', None), costs.get('default', 1))
+
+
+class CostRateThrottle(SimpleRateThrottle):
+    """按视图代价扣减额度的滑动窗口限流"""
+    redis_script = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        cost = self.get_cost(view)
+        if not cost:
+            return True
+        # 单个请求的代价不能超过整个窗口的额度
+        cost = min(cost, self.num_requests)
+
+        now = self.timer()
+        window = int(now // self.duration)
+        elapsed = (now % self.duration) / self.duration
+        previous_weight = 1 - elapsed
+        keys = [f'{self.key}:{window}', f'{self.key}:{window - 1}']
+        allowed, used, previous = self.consume(keys, cost, previous_weight)
+
+        view_name = view.__class__.__name__
+        THROTTLE_REQUESTS.labels(self.scope, view_name, 'allowed' if allowed else 'throttled').inc()
+        THROTTLE_REMAINING.labels(self.scope).observe(max(self.num_requests - used, 0) / self.num_requests)
+        if allowed:
+            THROTTLE_COST.labels(self.scope, view_name).inc(cost)
+            return True
+
+        self.wait_seconds = self.get_wait(used + cost - self.num_requests, previous, elapsed)
+        return False
+
+    def get_cost(self, view):
+        """返回本次请求的代价，返回 None 或 0 时不参与此范围的限流"""
+        return get_view_cost(view)
+
+    def consume(self, keys, cost, previous_weight):
+        ttl = self.duration * 2
+        if settings.CACHES['default']['BACKEND'].startswith('django_redis'):
+            try:
+                return self.consume_redis(keys, cost, previous_weight, ttl)
+            except Exception as e:
+                logger.warning(f"限流计数失败，放行请求: {e}")
+                return True, 0, 0
+        return self.consume_cache(keys, cost, previous_weight, ttl)
+
+    def consume_redis(self, keys, cost, previous_weight, ttl):
+        from django_redis import get_redis_connection
+
+        if CostRateThrottle.redis_script is None:
+            CostRateThrottle.redis_script = get_redis_connection('default').register_script(SLIDING_WINDOW_SCRIPT)
+        allowed, used, previous = CostRateThrottle.redis_script(
+            keys=[self.cache.make_key(key) for key in keys],
+            args=[self.num_requests, cost, previous_weight, ttl],
+        )
+        return bool(allowed), float(used), int(previous)
+
+    def consume_cache(self, keys, cost, previous_weight, ttl):
+        """不支持脚本的缓存后端，判断和扣减不是原子操作"""
+        counts = self.cache.get_many(keys)
+        previous = counts.get(keys[1], 0)
+        used = previous * previous_weight + counts.get(keys[0], 0)
+        if used + cost > self.num_requests:
+            return False, used, previous
+        self.cache.add(keys[0], 0, ttl)
+        try:
+            self.cache.incr(keys[0], cost)
+        except ValueError:
+            self.cache.set(keys[0], cost, ttl)
+        return True, used + cost, previous
+
+    def get_wait(self, excess, previous, elapsed):
+        """
+        估算额度恢复所需的秒数
+
+        上一窗口的计数在本窗口内线性折减，折减足以覆盖超出部分时按折减速度计算，
+        否则等到本窗口结束。
+        """
+        if previous and previous * (1 - elapsed) >= excess:
+            return excess * self.duration / previous
+        return (1 - elapsed) * self.duration
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class CostUserRateThrottle(CostRateThrottle):
+    """已登录用户按用户计数，匿名用户按 IP 计数（与 UserRateThrottle 相同）"""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class CostAnonRateThrottle(CostRateThrottle):
+    """匿名用户按 IP 计数（与 AnonRateThrottle 相同）"""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class HeavyRateThrottle(CostUserRateThrottle):
+    """
+    高代价请求的独立额度
+
+    只对代价大于 1 的动作生效，导出、导入等请求耗尽此额度后不影响普通读取。
+    """
+    scope = 'heavy'
+
+    def get_cost(self, view):
+        cost = get_view_cost(view)
+        return cost if cost > 1 else None
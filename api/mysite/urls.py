@@ -16,11 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework.permissions import IsAdminUser
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
+from .views import health, metrics
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -28,7 +28,10 @@ urlpatterns = [
     path("api/workload/", include("workload.urls")),  # 包含workload应用的URL配置
     path("api/announcement/", include("announcement.urls")),  # 添加公告应用的 URL
     path("api/project/", include("project.urls")), # 包含project应用的URL配置
+    path("api/health/", health, name='health'),  # 健康检查
     path('doc/schema/', SpectacularAPIView.as_view(permission_classes=[IsAdminUser]), name='schema'),# schema的配置文件的路由，下面两个ui也是根据这个配置文件来生成的
     path('doc/swagger/', SpectacularSwaggerView.as_view(url_name='schema',permission_classes=[IsAdminUser]), name='swagger-ui'),# swagger-ui的路由
     path('doc/redoc/', SpectacularRedocView.as_view(url_name='schema',permission_classes=[IsAdminUser]), name='redoc'),  # redoc的路由
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('metrics', metrics, name='prometheus-django-metrics'),  # Prometheus 指标（含限流指标），只允许指定地址和管理员访问
+]
+# 附件不再通过 MEDIA_URL 公开访问，统一经由 /api/workload/{id}/attachment/ 检查权限后下载
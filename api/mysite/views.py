@@ -0,0 +1,62 @@
+import ipaddress
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from django_prometheus.exports import ExportToDjangoView
+
+logger = logging.getLogger(__name__)
+
+
+@require_GET
+def health(request):
+    """
+    健康检查，供容器 HEALTHCHECK 和负载均衡使用
+
+    不需要登录，只检查数据库连接是否可用，不检查 Redis。
+    会话保存在缓存中（SESSION_ENGINE 为 cache），Redis 不可用时已登录的用户需要重新登录，
+    缓存读取退回到数据库查询；Redis 故障时所有实例同时被判定为不健康并重启也无助于恢复。
+    """
+    try:
+        connection.ensure_connection()
+    except Exception as e:
+        logger.error(f"健康检查失败: {e}")
+        return JsonResponse({"status": "error"}, status=503)
+    return JsonResponse({"status": "ok"})
+
+
+def metrics_ip_allowed(request):
+    """
+    请求是否直接来自允许的地址
+
+    经反向代理转发的请求 REMOTE_ADDR 是代理的地址（通常就是 127.0.0.1），
+    带有 X-Forwarded-For 的请求不按地址放行，Prometheus 应直接访问应用端口。
+    """
+    if 'HTTP_X_FORWARDED_FOR' in request.META:
+        return False
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    for allowed in settings.METRICS_ALLOWED_IPS:
+        try:
+            if address in ipaddress.ip_network(allowed, strict=False):
+                return True
+        except ValueError:
+            logger.warning(f"METRICS_ALLOWED_IPS 中的地址无效: {allowed}")
+    return False
+
+
+@require_GET
+def metrics(request):
+    """
+    Prometheus 指标
+
+    指标中包含各接口的请求量、限流和数据库信息，只允许 METRICS_ALLOWED_IPS 中的地址
+    （Prometheus 所在的主机或网段）和已登录的管理员访问。
+    """
+    if not (metrics_ip_allowed(request) or request.user.is_staff):
+        return JsonResponse({"detail": "无权访问"}, status=403)
+    return ExportToDjangoView(request)
@@ -1,10 +1,23 @@
-from django.db import models, transaction
+from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 import os
+from workload.review_counts import invalidate_project_counts
+from workload.search import index_objects, unindex_object
 
 User = get_user_model()
 
+class ProjectQuerySet(models.QuerySet):
+    """项目查询集"""
+
+    def with_related(self):
+        """预加载序列化所需的关联对象，使列表和详情的查询次数与行数无关"""
+        return self.select_related(
+            'submitter', 'teacher_reviewer'
+        ).prefetch_related(
+            models.Prefetch('shares', queryset=ProjectShare.objects.select_related('user'))
+        )
+
 class Project(models.Model):
     """项目模型"""
 
@@ -57,6 +70,8 @@ class Project(models.Model):
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
 
+    objects = ProjectQuerySet.as_manager()
+
     class Meta:
         verbose_name = '项目'
         verbose_name_plural = '项目'
@@ -65,21 +80,25 @@ class Project(models.Model):
     def __str__(self):
         return f"{self.name}"
 
-    @transaction.atomic
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录加载时的名称，变化时才更新搜索索引
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
+
     def save(self, *args, **kwargs):
-        # 如果是新创建的记录，确保ID不使用固定值，而是自动生成
-        if self.pk and not Project.objects.filter(pk=self.pk).exists():
-            # 如果指定了ID但不存在，清除ID让数据库自动生成
-            self.pk = None
-
-        # 如果是新创建的记录
-        if not self.pk:
-            # 先保存以获取ID
-            super().save(*args, **kwargs)
-        else:
-            super().save(*args, **kwargs)
+        # 新建时直接 INSERT，修改时直接 UPDATE
+        super().save(*args, **kwargs)
+
+        invalidate_project_counts()
+        if self.name != getattr(self, '_loaded_name', None):
+            index_objects([self])
+            self._loaded_name = self.name
 
     def delete(self, *args, **kwargs):
+        invalidate_project_counts()
+        unindex_object(self)
         super().delete(*args, **kwargs)
 
 class ProjectShare(models.Model):
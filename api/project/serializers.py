@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Project, ProjectShare
+from workload.shares import sync_shares
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 import os
@@ -96,9 +97,7 @@ class ProjectSerializer(serializers.ModelSerializer):
 
             # 创建项目参与记录
             if shares_data:
-                for s in shares_data:
-                    print(s)
-                    ProjectShare.objects.create(project=instance, user=s['user'])
+                sync_shares(ProjectShare, 'project', instance, shares_data, created=True)
 
             return instance
         except Exception as e:
@@ -117,15 +116,9 @@ class ProjectSerializer(serializers.ModelSerializer):
         instance = super().update(instance, validated_data)
 
 
-        # 更新 shares（只负责写，不负责清理）
+        # 更新 shares（只负责写，不负责清理），只写入有变化的记录
         if shares_data is not None:
-            # 先删除原来的
-            instance.shares.all().delete()
-            for s in shares_data:
-                ProjectShare.objects.create(project=instance, user=s['user'])
-
-        # 这里不再写清理逻辑，因为 save() 已经兜底处理了
-        instance.save()
+            sync_shares(ProjectShare, 'project', instance, shares_data)
 
         return instance
 
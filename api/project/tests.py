@@ -0,0 +1,108 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from .models import Project, ProjectShare
+
+User = get_user_model()
+
+
+class ProjectQueryBudgetTests(APITestCase):
+    """项目接口的查询次数预算，查询次数不应随返回行数增长"""
+
+    # 条件 GET 校验值聚合 + 主查询（含 submitter/teacher_reviewer 连接）+ shares 预加载
+    LIST_BUDGET = 3
+    # 主查询 + shares 预加载
+    DETAIL_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='pass', role='teacher')
+        cls.mentor = User.objects.create_user(
+            username='mentor', email='mentor@example.com', password='pass', role='mentor')
+
+    def create_projects(self, count):
+        for i in range(count):
+            for review_status in ('pending', 'approved', 'rejected'):
+                project = Project.objects.create(
+                    name=f'项目 {review_status} {i}', project_status='in_research',
+                    start_date=date(2025, 1, 1), submitter=self.mentor,
+                    teacher_reviewer=self.teacher if review_status != 'pending' else None,
+                    review_status=review_status)
+                ProjectShare.objects.create(project=project, user=self.mentor)
+                ProjectShare.objects.create(project=project, user=self.teacher)
+
+    def assert_list_budget(self, user, url, budget=LIST_BUDGET):
+        """在少量和大量数据下分别请求，查询次数都必须等于预算"""
+        self.client.force_authenticate(user)
+        for count in (1, 5):
+            self.create_projects(count)
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json())
+
+    def test_list_teacher(self):
+        self.assert_list_budget(self.teacher, '/api/project/')
+
+    def test_list_mentor(self):
+        self.assert_list_budget(self.mentor, '/api/project/')
+
+    def test_declared(self):
+        self.assert_list_budget(self.mentor, '/api/project/getDeclaredById/')
+
+    def test_related(self):
+        self.assert_list_budget(self.mentor, '/api/project/getRelatedById/')
+
+    def test_pending_review(self):
+        self.assert_list_budget(self.teacher, '/api/project/pending_review/')
+
+    def test_approved_review(self):
+        self.assert_list_budget(self.teacher, '/api/project/approved_review/')
+
+    def test_reviewed(self):
+        self.assert_list_budget(self.teacher, '/api/project/reviewed/')
+
+    def test_all_projects(self):
+        self.assert_list_budget(self.teacher, '/api/project/all_projects/')
+
+    def test_detail(self):
+        self.create_projects(1)
+        project = Project.objects.first()
+        self.client.force_authenticate(self.teacher)
+        with self.assertNumQueries(self.DETAIL_BUDGET):
+            response = self.client.get(f'/api/project/{project.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['shares']), 2)
+
+
+class ProjectSearchIndexTests(APITestCase):
+    """项目只在名称变化时重建搜索索引"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = User.objects.create_user(
+            username='mentor', email='mentor@example.com', password='pass', role='mentor')
+
+    def test_reindex_on_name_change(self):
+        with mock.patch('project.models.index_objects') as index_objects:
+            project = Project.objects.create(
+                name='智能仓储', project_status='in_research',
+                start_date=date(2025, 1, 1), submitter=self.mentor)
+            self.assertEqual(index_objects.call_count, 1)
+
+            project = Project.objects.get(pk=project.pk)
+            project.project_status = 'completed'
+            project.save()
+            self.assertEqual(index_objects.call_count, 1)
+
+            project.name = '无人机巡检'
+            project.save()
+            self.assertEqual(index_objects.call_count, 2)
+
+            # 保存后以新名称为基准，再次保存不重复索引
+            project.save()
+            self.assertEqual(index_objects.call_count, 2)
@@ -6,6 +6,8 @@ from django.db.models import Q
 from django.http import HttpResponse
 from .models import Project, ProjectShare
 from .serializers import ProjectSerializer, ProjectReviewSerializer
+from mysite.conditional import ConditionalListMixin
+from workload.search import SearchMixin
 import logging
 import traceback
 import os
@@ -21,10 +23,17 @@ logger = logging.getLogger(__name__)
 
 # Create your views here.
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ConditionalListMixin, SearchMixin, viewsets.ModelViewSet):
     """项目视图集"""
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # 各动作的限流代价，未列出的动作为 1
+    throttle_costs = {
+        'create': 2,
+        'update': 2,
+        'partial_update': 2,
+        'search': 2,
+    }
 
     def get_queryset(self):
         """获取用户可以访问的项目列表"""
@@ -33,15 +42,15 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
         # 如果是获取已提交的项目列表，只返回自己提交的
         if submitted:
-            return Project.objects.filter(submitter=user)
+            return Project.objects.with_related().filter(submitter=user)
 
         # 否则根据角色返回可访问的项目
         if user.role == 'teacher':
             # 教师可以看到所有项目
-            return Project.objects.all()
+            return Project.objects.with_related()
         else:
             # 其他人只能看到自己提交的项目
-            return Project.objects.filter(submitter=user)
+            return Project.objects.with_related().filter(submitter=user)
         return Project.objects.none()
 
     def create(self, request, *args, **kwargs):
@@ -168,12 +177,11 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def getDeclaredById(self, request):
         user = self.request.user
 
-        queryset = Project.objects.filter(
+        queryset = Project.objects.with_related().filter(
             Q(submitter_id=user.id)  # 提交的待审核项目
         )
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     # @action(detail=False, methods=['get'])
     # def getRelatedById(self, request):
@@ -210,10 +218,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
             project_ids = ProjectShare.objects.filter(
                 user_id=user.id
             ).values_list('project_id', flat=True)
-            projects = Project.objects.filter(id__in=project_ids)
+            projects = Project.objects.with_related().filter(id__in=project_ids)
 
-            serializer = self.get_serializer(projects, many=True)
-            return Response(serializer.data)
+            return self.list_response(projects)
 
         except Exception as e:
             # 记录异常并返回错误响应
@@ -227,12 +234,11 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def pending_review(self, request):
         """获取待审核的项目列表"""
 
-        queryset = Project.objects.filter(
+        queryset = Project.objects.with_related().filter(
             Q(review_status="pending")  # 提交的待审核项目
         )
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
     
     @action(detail=False, methods=['get'])
     def approved_review(self, request):
@@ -240,17 +246,16 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """获取审核成功的项目列表"""
         if user.role == 'teacher':
             # 教师可以看到所有项目
-            queryset = Project.objects.filter(
+            queryset = Project.objects.with_related().filter(
                 Q(review_status='approved')
             )
         else:
             # 其他人什么都看不到
-            queryset = Project.objects.filter(
+            queryset = Project.objects.with_related().filter(
                 Q(review_status='teacher_want_you_see')
             )
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     @action(detail=False, methods=['get'])
     def reviewed(self, request):
@@ -266,14 +271,13 @@ class ProjectViewSet(viewsets.ModelViewSet):
         #         status=status.HTTP_403_FORBIDDEN
         #     )
 
-        queryset = Project.objects.filter(
+        queryset = Project.objects.with_related().filter(
             Q(review_status='approved') |
             Q(review_status='rejected')
         )
 
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     @action(detail=False, methods=['get'])
     def all_projects(self, request):
@@ -285,9 +289,8 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        queryset = Project.objects.all()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = Project.objects.with_related()
+        return self.list_response(queryset)
 
     @action(detail=True, methods=['post'])
     def review(self, request, pk=None):
@@ -0,0 +1,70 @@
+"""
+JWT 令牌认证（JWT_AUTH_ENABLED 开启后可用）
+
+访问令牌中保存 id、username、role 等声明，认证时直接由声明构造用户对象，
+不读取会话也不查询用户表。构造出的用户只加载了声明中的字段，
+其他字段（如 email、password）在首次访问时才从数据库读取。
+
+访问令牌有效期较短；刷新令牌时重新读取用户，角色变化或用户被禁用后在下一次刷新时生效。
+"""
+from django.contrib.auth import get_user_model
+from rest_framework import exceptions, serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .snapshots import build_user
+
+User = get_user_model()
+
+# 写入令牌的用户字段
+USER_CLAIMS = ('username', 'role', 'is_staff', 'is_superuser')
+
+
+def issue_tokens(user):
+    """签发刷新令牌和访问令牌，访问令牌从刷新令牌复制用户声明"""
+    refresh = RefreshToken.for_user(user)
+    for claim in USER_CLAIMS:
+        refresh[claim] = getattr(user, claim)
+    return {
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+    }
+
+
+def user_from_claims(token):
+    """由令牌声明构造用户对象，未包含的字段为延迟加载"""
+    values = {'id': token[api_settings.USER_ID_CLAIM], 'is_active': True}
+    for claim in USER_CLAIMS:
+        values[claim] = token[claim]
+    return build_user(values)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """从访问令牌的声明构造用户，不查询用户表"""
+
+    def get_user(self, validated_token):
+        try:
+            return user_from_claims(validated_token)
+        except KeyError:
+            raise InvalidToken("令牌中缺少用户信息")
+
+
+class ClaimsTokenRefreshSerializer(serializers.Serializer):
+    """
+    刷新令牌
+
+    重新读取用户并签发新的刷新令牌和访问令牌，令牌中的角色随之更新，已禁用的用户不能刷新。
+    """
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            refresh = RefreshToken(attrs['refresh'])
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        user = User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed("用户不存在或已被禁用")
+        return issue_tokens(user)
@@ -0,0 +1,17 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .snapshots import get_cached_user
+
+
+class CachedUserBackend(ModelBackend):
+    """
+    会话认证时从缓存的用户快照构造用户，不查询用户表
+
+    登录时的用户名密码校验与 ModelBackend 相同。
+    """
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        if user is None or not self.user_can_authenticate(user):
+            return None
+        return user
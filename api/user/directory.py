@@ -0,0 +1,73 @@
+"""
+用户目录缓存
+
+提交工作量和项目时选择审核导师、大创参与人需要按角色列出用户。
+按角色把启用状态的用户 (id, username, role) 缓存在 Redis 中，按用户名排序，
+用户新建、修改或删除时在事务提交后清除，过期时间只用于兜底。
+目录对所有登录用户开放，不包含邮箱。
+Redis 不可用时 django-redis 忽略异常并返回 None，退回到数据库查询。
+
+输入联想的搜索不扫描缓存的目录，直接在数据库中按用户名前缀查询并限制条数，
+用户名有唯一索引，MySQL 不区分大小写的排序规则下前缀 LIKE 可以使用该索引。
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+ALL_ROLES = 'all'
+
+# 目录返回的字段
+DIRECTORY_VALUES = ('id', 'username', 'role')
+
+# 影响目录内容的字段，只更新其他字段（如 last_login、email）时不清除缓存
+DIRECTORY_FIELDS = {'username', 'role', 'is_active'}
+
+
+def directory_key(role):
+    # 目录去掉邮箱后更换键名，不再返回之前缓存的包含邮箱的目录
+    return f'user_directory:v2:{role or ALL_ROLES}'
+
+
+def get_user_directory(role=None):
+    """返回 [{"id", "username", "role"}, ...]，role 为空时返回全部角色"""
+    from django.contrib.auth import get_user_model
+
+    key = directory_key(role)
+    users = cache.get(key)
+    if users is None:
+        queryset = get_user_model().objects.filter(is_active=True)
+        if role:
+            queryset = queryset.filter(role=role)
+        users = list(queryset.order_by('username').values(*DIRECTORY_VALUES))
+        cache.set(key, users, settings.USER_DIRECTORY_TTL)
+    return users
+
+
+def search_user_directory(query='', role=None, limit=None):
+    """
+    按用户名前缀匹配（不区分大小写），最多返回 limit 条
+
+    邮箱只在完整输入时匹配，不能通过逐字输入前缀试探出其他用户的邮箱。
+    """
+    from django.contrib.auth import get_user_model
+
+    query = query.strip()
+    queryset = get_user_model().objects.filter(is_active=True)
+    if role:
+        queryset = queryset.filter(role=role)
+    if query:
+        queryset = queryset.filter(Q(username__istartswith=query) | Q(email__iexact=query))
+    queryset = queryset.order_by('username').values(*DIRECTORY_VALUES)
+    return list(queryset[:limit] if limit else queryset)
+
+
+def invalidate_user_directory(update_fields=None):
+    """用户变化后，在事务提交后清除全部目录缓存"""
+    if update_fields is not None and not DIRECTORY_FIELDS.intersection(update_fields):
+        return
+    from django.contrib.auth import get_user_model
+
+    roles = [role for role, _ in get_user_model().ROLE_CHOICES]
+    keys = [directory_key(None)] + [directory_key(role) for role in roles]
+    transaction.on_commit(lambda: cache.delete_many(keys))
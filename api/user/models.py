@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from .directory import invalidate_user_directory
+from .snapshots import invalidate_user_snapshot
 
 class User(AbstractUser):
     """
@@ -21,4 +23,22 @@ class User(AbstractUser):
         verbose_name_plural = '用户'
         
     def __str__(self):
-        return self.username 
\ No newline at end of file
+        return self.username
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        invalidate_user_directory(update_fields)
+        invalidate_user_snapshot(self.pk, update_fields)
+
+    def delete(self, *args, **kwargs):
+        invalidate_user_directory()
+        invalidate_user_snapshot(self.pk)
+        return super().delete(*args, **kwargs)
+
+    def get_session_auth_hash(self):
+        # 由缓存快照构造的用户没有加载密码，使用快照中保存的会话校验值
+        session_auth_hash = getattr(self, '_session_auth_hash', None)
+        if session_auth_hash and 'password' in self.get_deferred_fields():
+            return session_auth_hash
+        return super().get_session_auth_hash()
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.conf import settings
 
 User = get_user_model()
 
@@ -11,6 +12,12 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'role']
         read_only_fields = ['id']
 
+class UserSearchQuerySerializer(serializers.Serializer):
+    """用户搜索参数"""
+    q = serializers.CharField(required=False, allow_blank=True, max_length=150, default='')
+    role = serializers.ChoiceField(choices=User.ROLE_CHOICES, required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=settings.USER_SEARCH_MAX_LIMIT, default=20)
+
 class UserRegisterSerializer(serializers.ModelSerializer):
     """用户注册序列化器"""
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
@@ -37,22 +44,9 @@ class UserLoginSerializer(serializers.Serializer):
     """用户登录序列化器"""
     username = serializers.CharField(required=True)
     password = serializers.CharField(required=True, write_only=True)
+    # 用户角色是否匹配在视图中认证成功后检查，不单独查询用户
     role = serializers.ChoiceField(choices=User.ROLE_CHOICES, required=True)
 
-    def validate(self, attrs):
-        username = attrs.get('username')
-        role = attrs.get('role')
-        
-        # 验证用户角色是否匹配
-        try:
-            user = User.objects.get(username=username)
-            if user.role != role:
-                raise serializers.ValidationError({"role": "所选角色与用户角色不匹配"})
-        except User.DoesNotExist:
-            pass  # 用户不存在的错误会在视图中处理
-            
-        return attrs
-
 class UserUpdateSerializer(serializers.ModelSerializer):
     """用户信息更新序列化器"""
     class Meta:
@@ -0,0 +1,88 @@
+"""
+用户快照缓存
+
+会话认证的每个请求都要按会话中的用户ID读取用户表，而大多数接口只用到 id、username、role 和 is_active。
+把这些字段和会话校验值缓存在 Redis 中，认证时由快照构造用户对象，未缓存的字段在首次访问时才读取数据库。
+
+失效采用版本号：每个用户有一个版本号键，用户变化时在事务提交后递增版本号，
+快照中记录生成时的版本号，与当前版本号一致才使用。读取数据库和写入快照之间发生的修改
+会使版本号变化，旧数据写入的快照不会再被使用。快照和版本号通过一次 get_many 读取。
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# 快照中保存的用户字段（id 以外）
+SNAPSHOT_FIELDS = ('username', 'role', 'is_active', 'is_staff', 'is_superuser')
+
+# 影响快照内容的字段，password 变化会改变会话校验值
+SNAPSHOT_SOURCE_FIELDS = set(SNAPSHOT_FIELDS) | {'password'}
+
+
+def snapshot_key(user_id):
+    return f'user_snapshot:{user_id}'
+
+
+def version_key(user_id):
+    return f'user_snapshot_version:{user_id}'
+
+
+def new_version():
+    # 版本号键被淘汰后重新生成，使用时间戳避免与旧快照中的版本号重复
+    return time.time_ns()
+
+
+def build_user(values, session_auth_hash=None):
+    """
+    由部分字段构造用户对象，其余字段为延迟加载
+
+    只保存这样的用户时 Django 只写回已加载的字段。
+    """
+    User = get_user_model()
+    fields = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    user = User.from_db(DEFAULT_DB_ALIAS, fields, [values[name] for name in fields])
+    user._session_auth_hash = session_auth_hash
+    return user
+
+
+def get_cached_user(user_id):
+    """按ID读取用户，优先使用缓存的快照，用户不存在时返回 None"""
+    keys = [snapshot_key(user_id), version_key(user_id)]
+    cached = cache.get_many(keys)
+    snapshot = cached.get(keys[0])
+    version = cached.get(keys[1])
+    if version is not None and snapshot is not None and snapshot['version'] == version:
+        return build_user(snapshot['user'], snapshot['session_auth_hash'])
+
+    if version is None:
+        cache.add(keys[1], new_version(), None)
+        version = cache.get(keys[1])
+
+    user = get_user_model()._default_manager.filter(pk=user_id).first()
+    if user is not None and version is not None:
+        values = {'id': user.pk}
+        values.update({field: getattr(user, field) for field in SNAPSHOT_FIELDS})
+        cache.set(keys[0], {
+            'version': version,
+            'user': values,
+            'session_auth_hash': user.get_session_auth_hash(),
+        }, settings.USER_SNAPSHOT_TTL)
+    return user
+
+
+def invalidate_user_snapshot(user_id, update_fields=None):
+    """用户变化后，在事务提交后递增版本号，使已缓存的快照失效"""
+    if update_fields is not None and not SNAPSHOT_SOURCE_FIELDS.intersection(update_fields):
+        return
+
+    def bump():
+        key = version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_version(), None)
+
+    transaction.on_commit(bump)
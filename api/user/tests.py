@@ -1,3 +1,179 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .authentication import ClaimsJWTAuthentication, issue_tokens, user_from_claims
+from .snapshots import get_cached_user
+
+User = get_user_model()
+
+
+class UserDirectoryTests(APITestCase):
+    """用户目录缓存：按角色和前缀搜索，用户变化后失效"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(
+            username='student', email='student@example.com', password='pass', role='student')
+        cls.mentor_a = User.objects.create_user(
+            username='wang', email='alice@example.com', password='pass', role='mentor')
+        cls.mentor_b = User.objects.create_user(
+            username='wu', email='bob@example.com', password='pass', role='mentor')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.student)
+
+    def test_search_by_prefix_and_role(self):
+        response = self.client.get('/api/user/search/', {'q': 'W', 'role': 'mentor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {'id': self.mentor_a.id, 'username': 'wang', 'role': 'mentor'},
+            {'id': self.mentor_b.id, 'username': 'wu', 'role': 'mentor'},
+        ])
+        self.assertEqual(len(self.client.get('/api/user/search/', {'limit': 1}).json()), 1)
+        self.assertEqual(self.client.get('/api/user/search/', {'limit': 1000}).status_code, 400)
+
+        # 一次查询，按条数限制在数据库中完成
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/user/search/', {'q': 'w', 'role': 'mentor', 'limit': 1})
+        self.assertEqual(len(queries), 1)
+        self.assertIn('LIMIT 1', queries[0]['sql'])
+
+    def test_email_matched_only_in_full(self):
+        def search(q):
+            return [u['username'] for u in self.client.get('/api/user/search/', {'q': q}).json()]
+
+        # 不能通过邮箱前缀试探其他用户的邮箱
+        self.assertEqual(search('bob'), [])
+        self.assertEqual(search('bob@example'), [])
+        self.assertEqual(search('Bob@Example.com'), ['wu'])
+
+    def test_list_without_email(self):
+        response = self.client.get('/api/user/list/', {'role': 'mentor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {'id': self.mentor_a.id, 'username': 'wang', 'role': 'mentor'},
+            {'id': self.mentor_b.id, 'username': 'wu', 'role': 'mentor'},
+        ])
+
+    def test_invalidated_on_change(self):
+        self.assertEqual(len(self.client.get('/api/user/list/', {'role': 'mentor'}).json()), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(
+                username='zhao', email='zhao@example.com', password='pass', role='mentor')
+        self.assertEqual(len(self.client.get('/api/user/list/', {'role': 'mentor'}).json()), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mentor_b.is_active = False
+            self.mentor_b.save()
+        self.assertEqual(
+            [u['username'] for u in self.client.get('/api/user/list/', {'role': 'mentor'}).json()],
+            ['wang', 'zhao'])
+
+        # 只更新登录时间不清除缓存
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.mentor_a.save(update_fields=['last_login'])
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(JWT_AUTH_ENABLED=True)
+class TokenAuthTests(APITestCase):
+    """JWT 令牌：登录时签发，认证时由声明构造用户，不查询用户表"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = User.objects.create_user(
+            username='mentor', email='mentor@example.com', password='pass', role='mentor')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_login_and_authenticate_from_claims(self):
+        response = self.client.post('/api/user/login/', {
+            'username': 'mentor', 'password': 'pass', 'role': 'mentor'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        access = response.json()['access']
+
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        with self.assertNumQueries(0):
+            user, _ = ClaimsJWTAuthentication().authenticate(request)
+            self.assertEqual((user.pk, user.username, user.role), (self.mentor.pk, 'mentor', 'mentor'))
+            self.assertTrue(user.is_authenticated)
+        # 未包含在令牌中的字段延迟加载
+        self.assertEqual(user.email, 'mentor@example.com')
+
+    def test_refresh_reloads_user(self):
+        refresh = issue_tokens(self.mentor)['refresh']
+        User.objects.filter(pk=self.mentor.pk).update(role='teacher')
+        response = self.client.post('/api/user/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.json()['access'])['role'], 'teacher')
+
+        User.objects.filter(pk=self.mentor.pk).update(is_active=False)
+        response = self.client.post('/api/user/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_profile_update_uses_full_record(self):
+        # 令牌签发后角色已被修改
+        token = AccessToken.for_user(self.mentor)
+        token.payload.update(username='mentor', role='student', is_staff=False, is_superuser=False)
+        self.client.force_authenticate(user_from_claims(token))
+        response = self.client.patch('/api/user/update/', {'email': 'new@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        # 令牌中过期的角色不会写回数据库
+        self.mentor.refresh_from_db()
+        self.assertEqual((self.mentor.email, self.mentor.role), ('new@example.com', 'mentor'))
+
+
+class UserSnapshotTests(APITestCase):
+    """会话认证从缓存的用户快照构造用户，用户变化后按版本号失效"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = User.objects.create_user(
+            username='mentor', email='mentor@example.com', password='pass', role='mentor')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.mentor)
+
+    def user_queries(self, queries):
+        return [q['sql'] for q in queries.captured_queries if '"user_user"' in q['sql']]
+
+    def test_cached_user_skips_users_table(self):
+        self.client.get('/api/user/list/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/user/list/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_queries(queries), [])
+
+    def test_invalidated_on_change(self):
+        self.client.get('/api/user/list/')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/user/update/', {'username': 'mentor2'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/user/list/')
+        self.assertEqual(len(self.user_queries(queries)), 2)  # 重新读取用户 + 刷新用户目录
+        self.assertEqual(get_cached_user(self.mentor.pk).username, 'mentor2')
+
+        # 修改密码后原会话失效
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/user/change-password/', {
+                'current_password': 'pass', 'new_password': 'N3w-passw0rd!', 'confirm_password': 'N3w-passw0rd!'
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.client.get('/api/user/search/').status_code, (401, 403))
+
+    def test_login_role_mismatch(self):
+        response = self.client.post('/api/user/login/', {
+            'username': 'mentor', 'password': 'pass', 'role': 'teacher'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('role', response.json())
@@ -3,14 +3,18 @@ from .views import (
     UserRegisterView,
     UserLoginView,
     UserListView,
+    UserSearchView,
     UserUpdateView,
     ChangePasswordView,
+    TokenRefreshView,
 )
 
 urlpatterns = [
     path('register/', UserRegisterView.as_view(), name='user-register'),
     path('login/', UserLoginView.as_view(), name='user-login'),
     path('list/', UserListView.as_view(), name='user-list'),
+    path('search/', UserSearchView.as_view(), name='user-search'),
     path('update/', UserUpdateView.as_view(), name='user-update'),
     path('change-password/', ChangePasswordView.as_view(), name='user-change-password'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='user-token-refresh'),
 ] 
\ No newline at end of file
@@ -4,16 +4,36 @@ from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from rest_framework_simplejwt.views import TokenRefreshView as BaseTokenRefreshView
 from .serializers import (
     UserSerializer,
     UserRegisterSerializer,
     UserLoginSerializer,
     UserUpdateSerializer,
     ChangePasswordSerializer,
+    UserSearchQuerySerializer,
 )
+from .directory import get_user_directory, search_user_directory
+from .authentication import issue_tokens, ClaimsTokenRefreshSerializer
 
 User = get_user_model()
 
+
+def full_user(request):
+    """
+    返回完整的当前用户
+
+    令牌认证的用户只加载了令牌中的字段，保存时只会写回这些字段，
+    修改用户信息前重新读取完整记录，避免用令牌中过期的角色覆盖数据库。
+    """
+    user = request.user
+    if user.get_deferred_fields():
+        user = User.objects.get(pk=user.pk)
+        request.user = user
+    return user
+
+
 class UserRegisterView(generics.CreateAPIView):
     """用户注册视图"""
     permission_classes = [permissions.AllowAny]
@@ -41,11 +61,19 @@ class UserLoginView(APIView):
             user = authenticate(request, username=username, password=password)
             
             if user is not None:
+                if user.role != serializer.validated_data['role']:
+                    return Response({
+                        "role": ["所选角色与用户角色不匹配"]
+                    }, status=status.HTTP_400_BAD_REQUEST)
                 login(request, user)
-                return Response({
+                data = {
                     "message": "登录成功",
                     "user": UserSerializer(user).data
-                })
+                }
+                if settings.JWT_AUTH_ENABLED:
+                    # 同时签发令牌，客户端可改用 Authorization: Bearer <access> 访问接口
+                    data.update(issue_tokens(user))
+                return Response(data)
             else:
                 return Response({
                     "message": "用户名或密码错误"
@@ -53,19 +81,47 @@ class UserLoginView(APIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class UserListView(generics.ListAPIView):
-    """获取所有用户列表视图"""
-    queryset = User.objects.all()
-    serializer_class = UserSerializer
+class UserListView(APIView):
+    """
+    获取用户列表视图
+
+    数据来自缓存的用户目录，只包含启用状态的用户，按用户名排序，不返回邮箱；?role= 可按角色筛选。
+    """
     permission_classes = [permissions.IsAuthenticated]
 
+    def get(self, request):
+        role = request.query_params.get('role') or None
+        if role and role not in dict(User.ROLE_CHOICES):
+            return Response({"detail": "无效的角色"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_user_directory(role))
+
+class TokenRefreshView(BaseTokenRefreshView):
+    """刷新令牌：重新读取用户后签发新的令牌"""
+    serializer_class = ClaimsTokenRefreshSerializer
+
+class UserSearchView(APIView):
+    """
+    用户搜索视图（审核导师、参与人输入联想）
+
+    按用户名前缀匹配，邮箱只在完整输入时匹配，?role= 按角色筛选，?limit= 限制返回数量。
+    直接查询数据库并限制条数，不返回邮箱。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        serializer = UserSearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        users = search_user_directory(params['q'], params.get('role'), params['limit'])
+        return Response(users)
+
 class UserUpdateView(generics.UpdateAPIView):
     """用户信息更新视图"""
     serializer_class = UserUpdateSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        return full_user(self.request)
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -85,6 +141,7 @@ class ChangePasswordView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
+        request.user = full_user(request)
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             user = request.user
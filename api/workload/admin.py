@@ -1,6 +1,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from django.urls import reverse
 from .models import Workload,WorkloadShare
+from .rollup import collect_contributions, apply_delta, track_rollup
+from .thumbnails import is_image
+from .search import search_queryset
+from django.db.models import Q
 from django.forms.models import BaseInlineFormSet
 from django.core.exceptions import ValidationError
 from django import forms
@@ -67,8 +72,8 @@ class WorkloadAdmin(admin.ModelAdmin):
         'source', 'work_type', 'start_date', 'end_date', 'status'
     ]
     list_filter = ['status', 'source', 'work_type', 'intensity_type']
+    # 名称和内容通过全文索引搜索（见 get_search_results），避免对 content 做 LIKE 全表扫描
     search_fields = [
-        'name', 'content',
         'submitter__username',
         'mentor_reviewer__username',
         'teacher_reviewer__username'
@@ -138,17 +143,25 @@ class WorkloadAdmin(admin.ModelAdmin):
 
         return fieldsets
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        by_username, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        matched = search_queryset(queryset, search_term).order_by().values('pk')
+        return queryset.filter(Q(pk__in=matched) | Q(pk__in=by_username.values('pk'))), may_have_duplicates
+
     def preview_attachments(self, obj):
         """预览附件"""
         if not obj.attachments:
             return '无附件'
 
-        file_url = obj.attachments.url
-        file_name = obj.attachments.name.split('/')[-1]
+        file_url = reverse('workload-attachment', kwargs={'pk': obj.pk})
+        file_name = obj.original_filename or obj.attachments.name.split('/')[-1]
 
         # 判断文件类型
-        if file_name.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-            # 图片预览
+        if is_image(obj.attachments.name):
+            # 图片预览使用缩略图，原图通过下载链接查看
+            thumbnail_url = reverse('workload-thumbnail', kwargs={'pk': obj.pk})
             return format_html(
                 '<div style="margin: 10px 0;">'
                 '<img src="{}" style="max-width: 300px; max-height: 150px; border-radius: 5px; margin-bottom: 10px;"><br>'
@@ -157,7 +170,7 @@ class WorkloadAdmin(admin.ModelAdmin):
                 'border-radius: 3px; color: #666; text-decoration: none;">'
                 '下载原图</a>'
                 '</div>',
-                file_url, file_url
+                thumbnail_url, file_url
             )
         else:
             # 其他文件类型显示下载链接
@@ -172,3 +185,21 @@ class WorkloadAdmin(admin.ModelAdmin):
             )
 
     preview_attachments.short_description = '附件预览'
+
+    def save_model(self, request, obj, form, change):
+        # 记录修改前对月度汇总的贡献，占比在 save_related 中保存后再同步差值
+        obj._rollup_before = collect_contributions([obj.pk])
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        obj = form.instance
+        apply_delta(getattr(obj, '_rollup_before', {}), collect_contributions([obj.pk]))
+
+    def delete_model(self, request, obj):
+        with track_rollup([obj.pk]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with track_rollup(list(queryset.values_list('pk', flat=True))):
+            super().delete_queryset(request, queryset)
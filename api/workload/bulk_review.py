@@ -0,0 +1,105 @@
+"""
+工作量批量审核
+
+审核规则与单条审核（WorkloadViewSet.review）一致：
+- 导师只能审核指定自己为审核导师的学生工作量
+- 教师审核学生提交的工作量时，要求导师已审核通过
+
+整个批次在一个事务中执行：一次加锁查询读取所有工作量并逐条判断权限，
+再用一条带条件的 UPDATE 写入审核结果，最后同步月度汇总表和待审核计数。
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Workload
+from .review_counts import invalidate_workload_counts
+from .rollup import track_rollup
+
+logger = logging.getLogger(__name__)
+
+
+def check_review_permission(user, row):
+    """返回不能审核的原因，可以审核时返回 None"""
+    if user.role == 'mentor':
+        if row['submitter__role'] != 'student' or row['mentor_reviewer_id'] != user.id:
+            return "您不是该工作量的指定审核导师"
+    elif user.role == 'teacher':
+        if row['submitter__role'] == 'student' and row['status'] != 'mentor_approved':
+            return "学生提交的工作量需要导师审核通过后才能进行教师审核"
+    return None
+
+
+def review_update_condition(user, rows, allowed):
+    """
+    UPDATE 语句的条件，与 check_review_permission 对应
+
+    只使用工作量表自身的列，避免 UPDATE 中出现连接（MySQL 会因此先额外执行一次 SELECT）。
+    提交人角色不会随审核变化，按加锁查询的结果拆分 id 即可。
+    """
+    if user.role == 'mentor':
+        return Q(id__in=allowed, mentor_reviewer=user)
+    student_ids = [pk for pk in allowed if rows[pk]['submitter__role'] == 'student']
+    other_ids = [pk for pk in allowed if rows[pk]['submitter__role'] != 'student']
+    return Q(id__in=student_ids, status='mentor_approved') | Q(id__in=other_ids)
+
+
+def review_values(user, status, comment, now):
+    """审核写入的字段；update() 不会触发 auto_now，需要显式更新 updated_at"""
+    values = {'status': status, 'updated_at': now}
+    if user.role == 'mentor':
+        values.update(mentor_comment=comment, mentor_review_time=now)
+    else:
+        values.update(teacher_comment=comment, teacher_review_time=now, teacher_reviewer=user)
+    return values
+
+
+def apply_bulk_review(user, ids, status, comment):
+    """
+    批量审核工作量
+
+    返回 (更新条数, 逐条结果)，逐条结果的顺序与 ids 相同：
+    {"id": 1, "success": true} 或 {"id": 2, "success": false, "detail": "失败原因"}
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # 一次查询取得权限判断所需的列，并锁定工作量行直到事务结束
+        rows = {
+            row['id']: row
+            for row in Workload.objects.select_for_update(of=('self',)).filter(id__in=ids).order_by().values(
+                'id', 'status', 'submitter__role', 'mentor_reviewer_id'
+            )
+        }
+
+        errors = {}
+        allowed = []
+        for pk in ids:
+            row = rows.get(pk)
+            if row is None:
+                errors[pk] = "工作量不存在"
+                continue
+            reason = check_review_permission(user, row)
+            if reason:
+                errors[pk] = reason
+            else:
+                allowed.append(pk)
+
+        updated = 0
+        if allowed:
+            with track_rollup(allowed):
+                updated = Workload.objects.filter(
+                    review_update_condition(user, rows, allowed)
+                ).update(**review_values(user, status, comment, now))
+            if updated != len(allowed):
+                logger.warning(f"批量审核预期更新 {len(allowed)} 条，实际更新 {updated} 条")
+            invalidate_workload_counts(*(rows[pk]['mentor_reviewer_id'] for pk in allowed))
+
+    results = []
+    for pk in ids:
+        if pk in errors:
+            results.append({'id': pk, 'success': False, 'detail': errors[pk]})
+        else:
+            results.append({'id': pk, 'success': True})
+    return updated, results
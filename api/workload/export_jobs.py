@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from .exports import write_workbook
+from .models import Workload, ExportJob
+from .serializers import WorkloadFilterSerializer
+
+logger = logging.getLogger(__name__)
+
+# 每个 Web 进程懒加载一个本地进程池，导出在子进程中执行，不占用请求线程。
+# gunicorn 多 worker 时导出进程总数为 worker 数 × EXPORT_JOB_WORKERS
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """获取导出进程池，使用 spawn 启动子进程，避免继承父进程的数据库连接"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.EXPORT_JOB_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _executor
+
+
+def reset_executor(broken):
+    """丢弃异常退出的进程池，其他线程已重建时不重复丢弃"""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+
+
+def submit_to_pool(job_id):
+    """提交任务到进程池，进程池异常退出时重建一次"""
+    executor = get_executor()
+    try:
+        executor.submit(run_export_job, job_id)
+    except BrokenProcessPool:
+        reset_executor(executor)
+        try:
+            get_executor().submit(run_export_job, job_id)
+        except Exception as e:
+            logger.error(f"提交导出任务失败: {e}")
+            ExportJob.objects.filter(pk=job_id).update(
+                status='failed', error='导出任务提交失败', finished_at=timezone.now()
+            )
+
+
+def fail_stale_jobs(queryset=None):
+    """
+    把超过 EXPORT_JOB_TIMEOUT 仍未完成的任务标记为失败
+
+    执行任务的 Web 进程被重启（max_requests、超时被杀或发布）时，进程池随之退出，
+    任务会一直停留在排队中或导出中。提交和查询任务时检查，也可由 fail_stale_export_jobs 命令定期执行。
+    """
+    if queryset is None:
+        queryset = ExportJob.objects.all()
+    deadline = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+    count = queryset.filter(status__in=('pending', 'running'), created_at__lt=deadline).update(
+        status='failed', error='导出任务超时，请重新导出', finished_at=timezone.now()
+    )
+    if count:
+        logger.warning(f"{count} 个导出任务超时，已标记为失败")
+    return count
+
+
+def get_export_queryset(params):
+    """根据导出条件构造查询集"""
+    if 'workload_ids' in params:
+        return Workload.objects.filter(id__in=params['workload_ids'])
+    serializer = WorkloadFilterSerializer(data=params.get('filters', {}))
+    serializer.is_valid(raise_exception=True)
+    return serializer.filter_queryset(Workload.objects.all())
+
+
+def get_cache_path(cache_key):
+    return os.path.join(settings.EXPORT_ROOT, f'{cache_key}.xlsx')
+
+
+def compute_cache_key(params, queryset):
+    """
+    以导出条件、行数和最大 updated_at 作为缓存键
+
+    行数用于识别删除，最大 updated_at 用于识别新增和修改，一次聚合查询即可得到。
+    """
+    stats = queryset.aggregate(total=Count('id'), last_updated=Max('updated_at'))
+    raw = json.dumps({
+        'params': params,
+        'total': stats['total'],
+        'last_updated': stats['last_updated'].isoformat() if stats['last_updated'] else None,
+    }, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest(), stats['total']
+
+
+def prune_export_cache():
+    """删除超过保留时间的导出文件"""
+    if not os.path.isdir(settings.EXPORT_ROOT):
+        return
+    expire_before = time.time() - settings.EXPORT_CACHE_TTL
+    for name in os.listdir(settings.EXPORT_ROOT):
+        path = os.path.join(settings.EXPORT_ROOT, name)
+        try:
+            if os.path.getmtime(path) < expire_before:
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"清理导出缓存失败: {path}, {e}")
+
+
+def create_export_job(user, params):
+    """
+    创建导出任务
+
+    相同条件且数据未变化时直接复用磁盘上的导出文件，任务立即完成；
+    否则在事务提交后交给进程池执行。
+    """
+    queryset = get_export_queryset(params)
+    cache_key, total = compute_cache_key(params, queryset)
+    if not total:
+        raise NotFound("未找到指定的工作量")
+
+    prune_export_cache()
+    fail_stale_jobs()
+    job = ExportJob(user=user, params=params, cache_key=cache_key, total=total)
+    if os.path.exists(get_cache_path(cache_key)):
+        job.status = 'finished'
+        job.processed = total
+        job.finished_at = timezone.now()
+        job.save()
+        logger.info(f"导出任务 {job.pk} 命中缓存")
+        return job
+
+    job.save()
+    job_id = str(job.pk)
+    transaction.on_commit(lambda: submit_to_pool(job_id))
+    logger.info(f"用户 {user.username} 提交导出任务 {job_id}，共 {total} 条")
+    return job
+
+
+def run_export_job(job_id):
+    """在进程池子进程中执行导出任务"""
+    close_old_connections()
+    try:
+        job = ExportJob.objects.get(pk=job_id)
+    except ExportJob.DoesNotExist:
+        return
+
+    path = get_cache_path(job.cache_key)
+    jobs = ExportJob.objects.filter(pk=job_id)
+    try:
+        if os.path.exists(path):
+            # 其他任务已生成相同的文件
+            jobs.update(status='finished', processed=job.total, finished_at=timezone.now())
+            return
+
+        # 已被标记为超时失败的任务不再执行
+        if not jobs.filter(status='pending').update(status='running'):
+            return
+        os.makedirs(settings.EXPORT_ROOT, exist_ok=True)
+        tmp_path = f'{path}.{job_id}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                count = write_workbook(
+                    get_export_queryset(job.params), f,
+                    progress=lambda processed: jobs.update(processed=processed)
+                )
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        jobs.update(status='finished', total=count, processed=count, finished_at=timezone.now())
+        logger.info(f"导出任务 {job_id} 完成，共 {count} 条")
+    except Exception as e:
+        logger.error(f"导出任务 {job_id} 失败: {str(e)}")
+        logger.error(traceback.format_exc())
+        jobs.update(status='failed', error=str(e), finished_at=timezone.now())
+    finally:
+        close_old_connections()
@@ -0,0 +1,137 @@
+import tempfile
+from itertools import chain, islice
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+
+from .models import Workload
+
+# 导出表头
+EXPORT_HEADERS = [
+    '提交人', '工作量名称', '工作量内容', '工作来源', '工作类型',
+    '开始日期', '结束日期', '工作强度类型', '工作强度值', '状态',
+    '导师评语', '导师审核时间', '教师评语', '教师审核时间',
+    '创建时间', '大创阶段', '参与人及占比', '已发助教工资'
+]
+
+# 每批从数据库读取的行数，同时作为估算列宽的样本行数
+EXPORT_CHUNK_SIZE = 500
+
+# 选项值到显示名称的映射，避免逐个单元格调用 get_*_display
+SOURCE_LABELS = dict(Workload.SOURCE_CHOICES)
+TYPE_LABELS = dict(Workload.TYPE_CHOICES)
+INTENSITY_TYPE_LABELS = dict(Workload.INTENSITY_TYPE_CHOICES)
+STATUS_LABELS = dict(Workload.STATUS_CHOICES)
+INNOVATION_STAGE_LABELS = dict(Workload.INNOVATION_STAGE_CHOICES)
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def format_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def export_row(workload):
+    """将一条工作量转换为一行导出数据"""
+    if workload.source == 'innovation':
+        # shares 已通过 with_related 预加载，不会逐行查询
+        share_text = "; ".join(
+            f"{share.user.username}:{share.percentage}%" for share in workload.shares.all()
+        )
+        innovation_stage = INNOVATION_STAGE_LABELS.get(workload.innovation_stage, '')
+    else:
+        share_text = ''
+        innovation_stage = ''
+
+    return [
+        workload.submitter.username,
+        workload.name,
+        workload.content,
+        SOURCE_LABELS.get(workload.source, workload.source),
+        TYPE_LABELS.get(workload.work_type, workload.work_type),
+        workload.start_date.strftime('%Y-%m-%d'),
+        workload.end_date.strftime('%Y-%m-%d'),
+        INTENSITY_TYPE_LABELS.get(workload.intensity_type, workload.intensity_type),
+        workload.intensity_value,
+        STATUS_LABELS.get(workload.status, workload.status),
+        workload.mentor_comment,
+        format_datetime(workload.mentor_review_time),
+        workload.teacher_comment,
+        format_datetime(workload.teacher_review_time),
+        format_datetime(workload.created_at),
+        innovation_stage,
+        share_text,
+        workload.assistant_salary_paid if workload.source == 'assistant' else '',
+    ]
+
+
+def iter_export_rows(queryset):
+    """分批读取工作量并逐行生成导出数据"""
+    queryset = queryset.with_related().order_by('-created_at', '-id')
+    for workload in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield export_row(workload)
+
+
+def column_widths(rows):
+    """根据表头和样本行计算列宽"""
+    widths = [len(header) for header in EXPORT_HEADERS]
+    for row in rows:
+        for index, value in enumerate(row):
+            if value is not None:
+                widths[index] = max(widths[index], len(str(value)))
+    return [width + 2 for width in widths]
+
+
+def write_workbook(queryset, fileobj, progress=None):
+    """
+    以 write_only 模式将工作量写入 Excel 文件
+
+    write_only 工作表的列宽必须在写入第一行之前确定，因此先读取第一批数据
+    估算列宽，之后的行直接写入，内存占用与导出行数无关。
+    progress 为可选回调，每写完一批调用一次，参数为已写入的行数。
+    返回写入的数据行数。
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("工作量记录")
+
+    rows = iter_export_rows(queryset)
+    sample = list(islice(rows, EXPORT_CHUNK_SIZE))
+    for index, width in enumerate(column_widths(sample), 1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+
+    # 设置表头样式
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    header_alignment = Alignment(horizontal='center', vertical='center')
+    header_cells = []
+    for header in EXPORT_HEADERS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    count = 0
+    for row in chain(sample, rows):
+        ws.append(row)
+        count += 1
+        if progress and count % EXPORT_CHUNK_SIZE == 0:
+            progress(count)
+
+    wb.save(fileobj)
+    return count
+
+
+def build_export_file(queryset):
+    """生成导出文件并返回已定位到开头的临时文件对象，文件关闭后自动删除"""
+    fileobj = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        write_workbook(queryset, fileobj)
+    except Exception:
+        fileobj.close()
+        raise
+    fileobj.seek(0)
+    return fileobj
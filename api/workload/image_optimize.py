@@ -0,0 +1,100 @@
+"""
+图片附件上传前处理
+
+附件中最常见的是手机拍摄的照片，原图通常有 8~12MB。保存前：
+1. 用 python-magic 按文件内容判断真实类型，只处理 JPEG / PNG / WebP（GIF 可能是动图，不处理），
+   动态 WebP 和 APNG 重新编码只会保留第一帧，同样不处理
+2. 按 EXIF 方向旋转后，长边超过 WORKLOAD_IMAGE_MAX_DIMENSION 的图片等比缩小
+3. 按原格式重新压缩，不写入 EXIF（拍摄位置等信息不随附件保存）
+
+附件大小限制按处理后的文件检查。WORKLOAD_IMAGE_OPTIMIZE=false 时跳过处理。
+"""
+import io
+import logging
+import os
+
+import magic
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# 文件内容类型 -> Pillow 格式名
+OPTIMIZE_FORMATS = {
+    'image/jpeg': 'JPEG',
+    'image/png': 'PNG',
+    'image/webp': 'WEBP',
+}
+
+# 判断文件类型读取的字节数
+MAGIC_HEADER_SIZE = 2048
+
+
+def detect_content_type(fileobj):
+    """按文件内容判断类型，读取后恢复文件位置"""
+    fileobj.seek(0)
+    header = fileobj.read(MAGIC_HEADER_SIZE)
+    fileobj.seek(0)
+    return magic.from_buffer(header, mime=True)
+
+
+def encode_options(fmt):
+    if fmt == 'JPEG':
+        return {'quality': settings.WORKLOAD_IMAGE_QUALITY, 'optimize': True, 'progressive': True}
+    if fmt == 'WEBP':
+        return {'quality': settings.WORKLOAD_IMAGE_QUALITY, 'method': 4}
+    return {'optimize': True}
+
+
+def optimize_image_upload(upload):
+    """
+    处理上传的图片附件，返回处理后的文件；不是支持的图片类型、无法解析或处理后没有变小时返回原文件
+
+    返回的文件保留原始文件名，content_type 为检测到的真实类型。
+    """
+    if not settings.WORKLOAD_IMAGE_OPTIMIZE:
+        return upload
+
+    content_type = detect_content_type(upload)
+    fmt = OPTIMIZE_FORMATS.get(content_type)
+    if fmt is None:
+        return upload
+
+    max_size = settings.WORKLOAD_IMAGE_MAX_DIMENSION
+    try:
+        with Image.open(upload) as original:
+            if getattr(original, 'is_animated', False):
+                return upload
+            original_size = original.size
+            has_exif = bool(original.getexif())
+            # JPEG 在解码时直接缩小到不小于目标尺寸的分辨率
+            original.draft('RGB', (max_size, max_size))
+            image = ImageOps.exif_transpose(original)
+        resized = max(original_size) > max_size
+        if resized:
+            image.thumbnail((max_size, max_size), Image.LANCZOS)
+        if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        buffer = io.BytesIO()
+        image.save(buffer, fmt, **encode_options(fmt))
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning(f"图片处理失败，保存原文件: {upload.name}, {e}")
+        return upload
+    finally:
+        upload.seek(0)
+
+    size = buffer.tell()
+    # 没有缩小尺寸也没有需要去掉的 EXIF 时，重新压缩变大则保留原文件
+    if not resized and not has_exif and size >= upload.size:
+        return upload
+
+    logger.info(
+        f"图片附件处理: {upload.name}, {original_size[0]}x{original_size[1]} -> "
+        f"{image.size[0]}x{image.size[1]}, {upload.size} -> {size} 字节"
+    )
+    buffer.seek(0)
+    return InMemoryUploadedFile(
+        buffer, 'attachments', os.path.basename(upload.name), content_type, size, None
+    )
@@ -0,0 +1,306 @@
+"""
+工作量批量导入
+
+支持 .xlsx（openpyxl read_only 模式）和 .csv，逐行读取，内存占用与文件行数无关。
+每读取一批数据行：
+1. 一次查询解析本批新出现的用户名，一次查询解析本批新出现的项目ID
+2. 逐行做字段校验，并复用 check_workload_rules 与接口提交使用同一套业务规则
+3. 校验通过的行通过 bulk_create 写入
+
+整个导入在一个事务中执行，校验失败的行不会写入，并在结果中给出行号和原因。
+大创类工作量需要填写参与人占比，不支持导入。
+"""
+import csv
+import io
+import os
+import zipfile
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from project.models import Project
+from .models import Workload
+from .review_counts import invalidate_workload_counts
+from .search import index_objects
+from .serializers import check_workload_rules
+
+User = get_user_model()
+
+# 表头到字段的映射，表头也可以直接使用字段名
+IMPORT_COLUMNS = {
+    '提交人': 'submitter',
+    '工作量名称': 'name',
+    '工作量内容': 'content',
+    '工作来源': 'source',
+    '工作类型': 'work_type',
+    '开始日期': 'start_date',
+    '结束日期': 'end_date',
+    '工作强度类型': 'intensity_type',
+    '工作强度值': 'intensity_value',
+    '已发助教工资': 'assistant_salary_paid',
+    '审核导师': 'mentor_reviewer',
+    '项目ID': 'project',
+}
+COLUMN_LABELS = {field: label for label, field in IMPORT_COLUMNS.items()}
+
+REQUIRED_COLUMNS = [
+    'submitter', 'name', 'content', 'source', 'work_type',
+    'start_date', 'end_date', 'intensity_type', 'intensity_value',
+]
+
+# 每批处理的行数，同时作为 bulk_create 的批大小
+IMPORT_CHUNK_SIZE = 500
+
+# 选项字段同时接受显示名称和选项值
+CHOICE_LABELS = {
+    'source': {label: value for value, label in Workload.SOURCE_CHOICES},
+    'work_type': {label: value for value, label in Workload.TYPE_CHOICES},
+    'intensity_type': {label: value for value, label in Workload.INTENSITY_TYPE_CHOICES},
+}
+
+
+class WorkloadImportRowSerializer(serializers.ModelSerializer):
+    """导入行的字段校验，关联对象由导入流程批量解析"""
+
+    class Meta:
+        model = Workload
+        fields = [
+            'name', 'content', 'source', 'work_type', 'start_date', 'end_date',
+            'intensity_type', 'intensity_value', 'assistant_salary_paid',
+        ]
+
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError({"end_date": "结束日期不能早于开始日期"})
+        if data['source'] == 'innovation':
+            raise serializers.ValidationError({"source": "大创类工作量需要填写参与人占比，不支持导入"})
+        return data
+
+
+def iter_xlsx_rows(fileobj):
+    # 损坏或改了扩展名的文件不是合法的 zip 包，缺少工作表的包在读取时抛出 KeyError
+    try:
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        raise serializers.ValidationError("无法读取 .xlsx 文件，请确认文件未损坏")
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    except (zipfile.BadZipFile, KeyError):
+        raise serializers.ValidationError("无法读取 .xlsx 文件，请确认文件未损坏")
+    finally:
+        wb.close()
+
+
+def iter_csv_rows(fileobj):
+    # 兼容 Excel 另存为 CSV 时写入的 BOM
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    except UnicodeDecodeError:
+        raise serializers.ValidationError("CSV 文件需使用 UTF-8 编码")
+    finally:
+        text.detach()
+
+
+def iter_records(fileobj, filename):
+    """
+    逐行读取导入文件，返回 (行号, {字段: 值})
+
+    行号与表格中显示的行号一致，空行跳过。
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.xlsx':
+        rows = iter_xlsx_rows(fileobj)
+    elif ext == '.csv':
+        rows = iter_csv_rows(fileobj)
+    else:
+        raise serializers.ValidationError("只支持 .xlsx 和 .csv 文件")
+
+    header = next(rows, None)
+    if not header:
+        raise serializers.ValidationError("导入文件为空")
+    fields = []
+    for cell in header:
+        name = str(cell).strip() if cell is not None else ''
+        fields.append(IMPORT_COLUMNS.get(name, name if name in COLUMN_LABELS else None))
+    missing = [COLUMN_LABELS[field] for field in REQUIRED_COLUMNS if field not in fields]
+    if missing:
+        raise serializers.ValidationError(f"导入文件缺少列: {', '.join(missing)}")
+
+    for row_number, row in enumerate(rows, 2):
+        record = {}
+        for field, value in zip(fields, row):
+            if field is None:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+            if value is None or value == '':
+                continue
+            record[field] = value
+        if record:
+            yield row_number, record
+
+
+def normalize_record(record):
+    """把单元格的值转换为序列化器可以接受的输入"""
+    data = {}
+    for field, value in record.items():
+        if isinstance(value, datetime):
+            value = value.date()
+        if field in CHOICE_LABELS:
+            value = CHOICE_LABELS[field].get(value, value)
+        data[field] = value
+    return data
+
+
+def format_errors(detail):
+    """把 ValidationError.detail 展开为 "列名: 原因" 形式的列表"""
+    if isinstance(detail, dict):
+        messages = []
+        for field, errors in detail.items():
+            for message in format_errors(errors):
+                if field == api_settings.NON_FIELD_ERRORS_KEY:
+                    messages.append(message)
+                else:
+                    messages.append(f"{COLUMN_LABELS.get(field, field)}: {message}")
+        return messages
+    if isinstance(detail, (list, tuple)):
+        return [message for item in detail for message in format_errors(item)]
+    return [str(detail)]
+
+
+class ImportLookups:
+    """按批解析用户名和项目ID，已解析过的值不再重复查询"""
+
+    def __init__(self):
+        self.users = {}
+        self.projects = {}
+
+    def load(self, records):
+        usernames = set()
+        project_ids = set()
+        for record in records:
+            for field in ('submitter', 'mentor_reviewer'):
+                if field in record:
+                    usernames.add(str(record[field]))
+            project_id = parse_id(record.get('project'))
+            if project_id is not None:
+                project_ids.add(project_id)
+
+        usernames -= set(self.users)
+        if usernames:
+            self.users.update({username: None for username in usernames})
+            self.users.update(
+                {user.username: user for user in User.objects.filter(username__in=usernames)}
+            )
+
+        project_ids -= set(self.projects)
+        if project_ids:
+            self.projects.update({pk: None for pk in project_ids})
+            self.projects.update(Project.objects.in_bulk(project_ids))
+
+
+def parse_id(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def build_workload(record, lookups):
+    """校验一行数据，返回 (未保存的工作量, 错误列表)"""
+    errors = []
+    submitter = lookups.users.get(str(record.get('submitter', '')))
+    if submitter is None:
+        errors.append(f"{COLUMN_LABELS['submitter']}: 用户不存在")
+
+    mentor_reviewer = None
+    if 'mentor_reviewer' in record:
+        mentor_reviewer = lookups.users.get(str(record['mentor_reviewer']))
+        if mentor_reviewer is None or mentor_reviewer.role != 'mentor':
+            errors.append(f"{COLUMN_LABELS['mentor_reviewer']}: 导师不存在")
+
+    project = None
+    if 'project' in record:
+        project = lookups.projects.get(parse_id(record['project']))
+        if project is None:
+            errors.append(f"{COLUMN_LABELS['project']}: 项目不存在")
+
+    serializer = WorkloadImportRowSerializer(data=normalize_record(record))
+    if not serializer.is_valid():
+        errors.extend(format_errors(serializer.errors))
+    if errors:
+        return None, errors
+
+    data = dict(serializer.validated_data)
+    data['mentor_reviewer_id'] = mentor_reviewer
+    data['project_id'] = project
+    try:
+        check_workload_rules(data, submitter)
+    except serializers.ValidationError as e:
+        return None, format_errors(e.detail)
+
+    # bulk_create 不调用 Workload.save，这里按 save 的规则清理与来源无关的字段
+    source = data['source']
+    return Workload(
+        name=data['name'],
+        content=data['content'],
+        source=source,
+        work_type=data['work_type'],
+        start_date=data['start_date'],
+        end_date=data['end_date'],
+        intensity_type=data['intensity_type'],
+        intensity_value=data['intensity_value'],
+        assistant_salary_paid=data.get('assistant_salary_paid') if source == 'assistant' else None,
+        project=project if source == 'horizontal' else None,
+        submitter=submitter,
+        mentor_reviewer=mentor_reviewer,
+    ), []
+
+
+def import_workloads(fileobj, filename, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    导入工作量
+
+    返回 {"total": 数据行数, "valid": 校验通过行数, "created": 写入行数,
+          "errors": [{"row": 行号, "errors": [原因, ...]}, ...]}
+    dry_run 为 True 时只校验不写入。
+    """
+    result = {'total': 0, 'valid': 0, 'created': 0, 'errors': []}
+    lookups = ImportLookups()
+    mentor_ids = set()
+    records = iter_records(fileobj, filename)
+
+    with transaction.atomic():
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            lookups.load(record for _, record in chunk)
+
+            workloads = []
+            for row_number, record in chunk:
+                workload, errors = build_workload(record, lookups)
+                if errors:
+                    result['errors'].append({'row': row_number, 'errors': errors})
+                else:
+                    workloads.append(workload)
+                    mentor_ids.add(workload.mentor_reviewer_id)
+
+            result['total'] += len(chunk)
+            result['valid'] += len(workloads)
+            if workloads and not dry_run:
+                Workload.objects.bulk_create(workloads, batch_size=chunk_size)
+                # bulk_create 不调用 Workload.save，单独更新搜索索引
+                index_objects(workloads)
+                result['created'] += len(workloads)
+
+        if result['created']:
+            invalidate_workload_counts(*mentor_ids)
+    return result
@@ -0,0 +1,113 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.http import HttpRequest, QueryDict
+from rest_framework.request import Request
+from workload.models import Workload
+from workload.pagination import KeysetPagination
+from workload.views import WorkloadViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = '打印工作量视图集各个列表接口首页查询的执行计划，用于确认审核队列使用了复合索引'
+
+    ROLES = ('student', 'mentor', 'teacher')
+
+    def add_arguments(self, parser):
+        for role in self.ROLES:
+            parser.add_argument(
+                f'--{role}',
+                metavar='USERNAME',
+                help=f'以指定的 {role} 用户身份生成查询，默认取该角色的第一个用户'
+            )
+        parser.add_argument(
+            '--format',
+            choices=['traditional', 'tree', 'json'],
+            help='EXPLAIN 输出格式（MySQL 8 支持 tree），默认使用数据库默认格式'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='使用 EXPLAIN ANALYZE 实际执行查询并输出耗时'
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=KeysetPagination.page_size,
+            help='模拟分页首页的行数'
+        )
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if options['format']:
+            explain_options['format'] = options['format']
+        if options['analyze']:
+            explain_options['analyze'] = True
+
+        index_names = [index.name for index in Workload._meta.indexes]
+        found_any = False
+
+        for role in self.ROLES:
+            user = self.get_user(role, options[role])
+            if user is None:
+                self.stdout.write(self.style.WARNING(f'没有 {role} 角色的用户，跳过'))
+                continue
+            found_any = True
+
+            for action, queryset in self.get_querysets(user):
+                queryset = queryset.order_by(*KeysetPagination.ordering)[:options['page_size']]
+                self.stdout.write(self.style.MIGRATE_HEADING(f'== {role} {user.username} · {action} =='))
+                try:
+                    plan = queryset.explain(**explain_options)
+                except Exception as e:
+                    raise CommandError(f'生成执行计划失败: {e}')
+                self.stdout.write(plan)
+
+                used = [name for name in index_names if name in plan]
+                if used:
+                    self.stdout.write(self.style.SUCCESS(f'使用索引: {", ".join(used)}'))
+                else:
+                    self.stdout.write(self.style.WARNING('未使用工作量复合索引'))
+                self.stdout.write('')
+
+        if not found_any:
+            raise CommandError('数据库中没有任何用户，无法生成查询')
+
+    def get_user(self, role, username):
+        """获取指定角色的用户"""
+        if username:
+            try:
+                return User.objects.get(username=username, role=role)
+            except User.DoesNotExist:
+                raise CommandError(f'用户 {username} 不存在或不是 {role} 角色')
+        return User.objects.filter(role=role).order_by('id').first()
+
+    def get_view(self, user, query_string=''):
+        """构造与线上请求一致的视图实例"""
+        http_request = HttpRequest()
+        http_request.method = 'GET'
+        http_request.GET = QueryDict(query_string)
+        request = Request(http_request)
+        request.user = user
+        view = WorkloadViewSet()
+        view.request = request
+        view.format_kwarg = None
+        return view
+
+    def get_querysets(self, user):
+        """返回该用户可访问的各接口查询集"""
+        view = self.get_view(user)
+        yield 'list', view.get_queryset()
+        yield 'list?submitted=true', self.get_view(user, 'submitted=true').get_queryset()
+
+        pending = view.get_pending_review_queryset(user)
+        if pending is not None:
+            yield 'pending_review', pending
+
+        reviewed = view.get_reviewed_queryset(user)
+        if reviewed is not None:
+            yield 'reviewed', reviewed
+
+        if user.role == 'teacher':
+            yield 'all_workloads', Workload.objects.with_related()
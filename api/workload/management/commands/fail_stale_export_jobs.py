@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from workload.export_jobs import fail_stale_jobs
+
+
+class Command(BaseCommand):
+    help = '把超过 EXPORT_JOB_TIMEOUT 仍未完成的导出任务标记为失败，可由定时任务执行'
+
+    def handle(self, *args, **options):
+        count = fail_stale_jobs()
+        self.stdout.write(self.style.SUCCESS(f'已将 {count} 个超时的导出任务标记为失败'))
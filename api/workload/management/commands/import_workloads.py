@@ -0,0 +1,58 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from workload.imports import import_workloads, IMPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = '从 .xlsx 或 .csv 文件批量导入工作量，并输出逐行错误报告'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='导入文件路径（.xlsx 或 .csv）')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只校验不写入'
+        )
+        parser.add_argument(
+            '--report',
+            help='错误报告输出路径（CSV），不指定时输出到终端'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='每批读取和写入的行数'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, 'rb') as f:
+                result = import_workloads(
+                    f, path, dry_run=options['dry_run'], chunk_size=options['chunk_size']
+                )
+        except OSError as e:
+            raise CommandError(f'无法读取导入文件: {e}')
+        except ValidationError as e:
+            raise CommandError('; '.join(str(message) for message in e.detail))
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['行号', '错误'])
+                for error in result['errors']:
+                    writer.writerow([error['row'], '; '.join(error['errors'])])
+        else:
+            for error in result['errors']:
+                self.stdout.write(self.style.ERROR(f"第 {error['row']} 行: {'; '.join(error['errors'])}"))
+
+        summary = (
+            f"共 {result['total']} 行，校验通过 {result['valid']} 行，"
+            f"失败 {len(result['errors'])} 行，写入 {result['created']} 行"
+        )
+        if options['dry_run']:
+            summary += '（仅校验，未写入）'
+        self.stdout.write(self.style.SUCCESS(summary) if not result['errors'] else self.style.WARNING(summary))
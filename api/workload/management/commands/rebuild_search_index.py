@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from project.models import Project
+from workload.models import Workload, SearchToken
+from workload.search import rebuild_index, uses_fulltext
+
+
+class Command(BaseCommand):
+    help = '全量重建工作量和项目的搜索索引（仅用于 SQLite 等不支持 ngram 全文索引的数据库）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='每批读取和写入的行数'
+        )
+
+    def handle(self, *args, **options):
+        if uses_fulltext():
+            self.stdout.write('当前数据库使用 MySQL ngram 全文索引，由数据库自动维护，无需重建')
+            return
+
+        self.stdout.write('正在重建搜索索引...')
+        with transaction.atomic():
+            workloads = rebuild_index(SearchToken, Workload, chunk_size=options['chunk_size'])
+            projects = rebuild_index(SearchToken, Project, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'重建完成，共索引 {workloads} 条工作量、{projects} 个项目'))
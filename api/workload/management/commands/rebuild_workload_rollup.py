@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from workload.rollup import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = '根据已审核的工作量全量重建工作量月度汇总表'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='每批读取和写入的行数'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('正在重建工作量月度汇总表...')
+        count = rebuild_rollup(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'重建完成，共写入 {count} 条汇总记录'))
@@ -0,0 +1,135 @@
+"""
+受权限控制的附件下载
+
+权限检查在视图中完成，文件传输按 MEDIA_ACCEL_REDIRECT 配置交给前置代理：
+- nginx：返回 X-Accel-Redirect，由 nginx 的 internal location 从 MEDIA_ROOT 读取文件
+- apache：返回 X-Sendfile（需要 mod_xsendfile）
+- 未配置：由 Django 以流式响应返回，支持单个 Range 请求，便于断点续传和在线预览
+
+附件由用户上传，只有 INLINE_CONTENT_TYPES 中的类型允许在浏览器中直接打开，
+其余文件（HTML、SVG 等可能执行脚本的类型）一律以 application/octet-stream 作为附件下载，
+并禁止浏览器嗅探内容类型，避免上传的文件在站点域名下执行脚本。
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# 允许在线预览的类型：位图图片和 PDF，不包括可以内嵌脚本的 SVG
+INLINE_CONTENT_TYPES = {
+    'image/jpeg',
+    'image/png',
+    'image/gif',
+    'image/webp',
+    'image/bmp',
+    'application/pdf',
+}
+
+
+def parse_range(header, size):
+    """
+    解析 Range 请求头，返回 (start, end)，end 包含在内
+
+    不支持或无法解析的格式返回 None（按完整文件响应），范围无法满足时抛出 ValueError。
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # 包括多个范围的请求，按完整文件返回
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-N：最后 N 个字节
+        length = int(end)
+        if length == 0:
+            raise ValueError
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError
+    return start, end
+
+
+def file_headers(response, filename, mtime, as_attachment):
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(mtime)
+    # 附件需要登录才能访问，只允许浏览器缓存
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+
+def serve_file(request, name, path, filename, as_attachment=False):
+    """
+    返回存储中的文件
+
+    name 为文件相对于 MEDIA_ROOT 的路径，path 为本地完整路径，filename 为下载时显示的文件名。
+    不在 INLINE_CONTENT_TYPES 中的类型强制以 application/octet-stream 作为附件下载。
+    """
+    content_type = mimetypes.guess_type(filename)[0] or mimetypes.guess_type(name)[0]
+    if content_type not in INLINE_CONTENT_TYPES:
+        content_type = 'application/octet-stream'
+        as_attachment = True
+    stat = os.stat(path)
+
+    accel = settings.MEDIA_ACCEL_REDIRECT
+    if accel == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+        return file_headers(response, filename, stat.st_mtime, as_attachment)
+    if accel == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return file_headers(response, filename, stat.st_mtime, as_attachment)
+
+    size = stat.st_size
+    range_header = request.META.get('HTTP_RANGE')
+    byte_range = None
+    if range_header and size:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    f = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type)
+        return file_headers(response, filename, stat.st_mtime, as_attachment)
+
+    start, end = byte_range
+    f.seek(start)
+    response = StreamingHttpResponse(RangeFileWrapper(f, end - start + 1), status=206, content_type=content_type)
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return file_headers(response, filename, stat.st_mtime, as_attachment)
+
+
+class RangeFileWrapper:
+    """从文件当前位置起按块读取指定长度"""
+    block_size = 64 * 1024
+
+    def __init__(self, f, length):
+        self.f = f
+        self.remaining = length
+
+    def __iter__(self):
+        while self.remaining > 0:
+            data = self.f.read(min(self.block_size, self.remaining))
+            if not data:
+                break
+            self.remaining -= len(data)
+            yield data
+
+    def close(self):
+        self.f.close()
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0002_projectshare'),
+        ('workload', '0008_workload_project'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workload',
+            index=models.Index(fields=['submitter', '-created_at'], name='workload_submitter_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workload',
+            index=models.Index(fields=['mentor_reviewer', 'status', '-created_at'], name='workload_mentor_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workload',
+            index=models.Index(fields=['status', '-created_at'], name='workload_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workload',
+            index=models.Index(fields=['teacher_reviewer', '-created_at'], name='workload_teacher_created_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:29
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workload', '0009_workload_review_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, verbose_name='任务ID')),
+                ('params', models.JSONField(default=dict, verbose_name='导出条件')),
+                ('cache_key', models.CharField(db_index=True, max_length=64, verbose_name='缓存键')),
+                ('status', models.CharField(choices=[('pending', '排队中'), ('running', '导出中'), ('finished', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='任务状态')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='总行数')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='已处理行数')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL, verbose_name='提交者')),
+            ],
+            options={
+                'verbose_name': '导出任务',
+                'verbose_name_plural': '导出任务',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
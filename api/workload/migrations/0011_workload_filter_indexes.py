@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0002_projectshare'),
+        ('workload', '0010_exportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workload',
+            index=models.Index(fields=['source', '-created_at'], name='workload_source_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workload',
+            index=models.Index(fields=['start_date'], name='workload_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workload',
+            index=models.Index(fields=['end_date'], name='workload_end_date_idx'),
+        ),
+    ]
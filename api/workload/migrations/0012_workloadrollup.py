@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workload', '0011_workload_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkloadRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('horizontal', '横向'), ('innovation', '大创'), ('hardware', '硬件小组'), ('assessment', '考核小组'), ('documentation', '材料撰写'), ('assistant', '助教'), ('other', '其他')], max_length=20, verbose_name='工作来源')),
+                ('month', models.DateField(help_text='当月第一天', verbose_name='月份')),
+                ('amount', models.FloatField(default=0, help_text='按工作强度类型折算到当月的工作量，大创按占比分摊', verbose_name='工作量')),
+                ('workload_count', models.IntegerField(default=0, verbose_name='工作量条数')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workload_rollups', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '工作量月度汇总',
+                'verbose_name_plural': '工作量月度汇总',
+                'ordering': ['user', 'month', 'source'],
+                'unique_together': {('user', 'source', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:42
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workload', '0012_workloadrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, verbose_name='上传ID')),
+                ('filename', models.CharField(max_length=255, verbose_name='原始文件名')),
+                ('path', models.CharField(max_length=500, verbose_name='存储路径')),
+                ('size', models.PositiveBigIntegerField(verbose_name='文件大小')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='已接收字节数')),
+                ('status', models.CharField(choices=[('uploading', '上传中'), ('completed', '已完成')], default='uploading', max_length=20, verbose_name='上传状态')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='更新时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='上传者')),
+            ],
+            options={
+                'verbose_name': '上传会话',
+                'verbose_name_plural': '上传会话',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
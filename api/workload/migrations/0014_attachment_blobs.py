@@ -0,0 +1,39 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:45
+
+import workload.models
+import workload.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workload', '0013_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=500, unique=True, verbose_name='存储路径')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='文件大小')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='引用数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '附件文件',
+                'verbose_name_plural': '附件文件',
+            },
+        ),
+        migrations.AddField(
+            model_name='workload',
+            name='original_filename',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='原始文件名'),
+        ),
+        migrations.AlterField(
+            model_name='workload',
+            name='attachments',
+            field=models.FileField(blank=True, help_text='支持上传图片、文档等文件', max_length=500, null=True, storage=workload.storage.ContentAddressedStorage(), upload_to=workload.models.workload_file_path, verbose_name='附件'),
+        ),
+    ]
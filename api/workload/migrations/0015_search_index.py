@@ -0,0 +1,111 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:53
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+
+# MySQL 使用 InnoDB ngram 全文索引：(应用, 模型, 索引名, 字段)
+FULLTEXT_INDEXES = [
+    ('workload', 'Workload', 'workload_name_ft', ('name',)),
+    ('workload', 'Workload', 'workload_name_content_ft', ('name', 'content')),
+    ('project', 'Project', 'project_name_ft', ('name',)),
+]
+
+# 以下切分规则复制自创建本迁移时的 workload.search，迁移不引用应用代码，
+# 之后修改 workload.search 不影响本迁移的执行结果（可通过 rebuild_search_index 命令按新规则重建）
+NGRAM_SIZE = 2
+WORD_RE = re.compile(r'\w+')
+
+# (应用, 模型, 索引中的记录类型, ((字段, 权重), ...))
+SEARCH_MODELS = [
+    ('workload', 'Workload', 'workload.workload', (('name', 2), ('content', 1))),
+    ('project', 'Project', 'project.project', (('name', 1),)),
+]
+
+BACKFILL_CHUNK_SIZE = 500
+
+
+def tokenize(text):
+    tokens = []
+    for word in WORD_RE.findall((text or '').lower()):
+        if len(word) <= NGRAM_SIZE:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + NGRAM_SIZE] for i in range(len(word) - NGRAM_SIZE + 1))
+    return tokens
+
+
+def build_tokens(token_model, kind, search_fields, objs):
+    tokens = []
+    for obj in objs:
+        weights = Counter()
+        for field, weight in search_fields:
+            for token in tokenize(getattr(obj, field)):
+                weights[token] += weight
+        tokens.extend(
+            token_model(kind=kind, object_id=obj.pk, token=token, weight=weight)
+            for token, weight in weights.items()
+        )
+    return tokens
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        qn = schema_editor.quote_name
+        for app_label, model_name, index_name, fields in FULLTEXT_INDEXES:
+            table = apps.get_model(app_label, model_name)._meta.db_table
+            columns = ', '.join(qn(field) for field in fields)
+            schema_editor.execute(
+                f'ALTER TABLE {qn(table)} ADD FULLTEXT INDEX {qn(index_name)} ({columns}) WITH PARSER ngram'
+            )
+        return
+
+    # 其他数据库为已有数据建立倒排索引
+    token_model = apps.get_model('workload', 'SearchToken')
+    for app_label, model_name, kind, search_fields in SEARCH_MODELS:
+        model = apps.get_model(app_label, model_name)
+        fields = [field for field, _ in search_fields]
+        batch = []
+        for obj in model.objects.only('pk', *fields).order_by('pk').iterator(chunk_size=BACKFILL_CHUNK_SIZE):
+            batch.append(obj)
+            if len(batch) >= BACKFILL_CHUNK_SIZE:
+                token_model.objects.bulk_create(build_tokens(token_model, kind, search_fields, batch))
+                batch = []
+        if batch:
+            token_model.objects.bulk_create(build_tokens(token_model, kind, search_fields, batch))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        qn = schema_editor.quote_name
+        for app_label, model_name, index_name, _ in FULLTEXT_INDEXES:
+            table = apps.get_model(app_label, model_name)._meta.db_table
+            schema_editor.execute(f'ALTER TABLE {qn(table)} DROP INDEX {qn(index_name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workload', '0014_attachment_blobs'),
+        ('project', '0002_projectshare'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50, verbose_name='记录类型')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='记录ID')),
+                ('token', models.CharField(max_length=20, verbose_name='n-gram')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='权重')),
+            ],
+            options={
+                'verbose_name': '搜索索引',
+                'verbose_name_plural': '搜索索引',
+                'indexes': [models.Index(fields=['kind', 'token', 'object_id'], name='search_token_idx'), models.Index(fields=['kind', 'object_id'], name='search_object_idx')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,17 +1,38 @@
-from django.db import models, transaction
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 import os
+import uuid
 from datetime import date, timedelta
 from project.models import Project
+from .review_counts import invalidate_workload_counts
+from .storage import attachment_storage, is_blob_name
+from .thumbnails import delete_thumbnails, generate_thumbnails_on_commit, is_image
+from .search import index_objects, unindex_object
 
 User = get_user_model()
 
+def attachment_path(username, filename):
+    """生成附件的存储路径"""
+    # 保留原始文件名，按用户和随机目录组织文件
+    # 目录在插入前生成，不依赖工作量ID，新建带附件的工作量只需一次 INSERT
+    # 如果文件名包含中文，不进行编码处理
+    return f'workload_files/{username}/{uuid.uuid4().hex}/{filename}'
+
 def workload_file_path(instance, filename):
     """生成工作量附件的存储路径"""
-    # 保留原始文件名，按用户和工作量ID组织文件
-    # 如果文件名包含中文，不进行编码处理
-    return f'workload_files/{instance.submitter.username}/{instance.id}/{filename}'
+    return attachment_path(instance.submitter.username, filename)
+
+class WorkloadQuerySet(models.QuerySet):
+    """工作量查询集"""
+
+    def with_related(self):
+        """预加载序列化所需的关联对象，使列表和详情的查询次数与行数无关"""
+        return self.select_related(
+            'submitter', 'mentor_reviewer', 'teacher_reviewer', 'project'
+        ).prefetch_related(
+            models.Prefetch('shares', queryset=WorkloadShare.objects.select_related('user'))
+        )
 
 class Workload(models.Model):
     """工作量模型"""
@@ -95,11 +116,13 @@ class Workload(models.Model):
     attachments = models.FileField(
         '附件',
         upload_to=workload_file_path,
+        storage=attachment_storage,
         max_length=500,
         blank=True,
         null=True,
         help_text='支持上传图片、文档等文件'
     )
+    original_filename = models.CharField('原始文件名', max_length=255, blank=True, null=True)
     
     # 关联用户
     submitter = models.ForeignKey(
@@ -140,14 +163,43 @@ class Workload(models.Model):
     # 时间戳
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    objects = WorkloadQuerySet.as_manager()
     
     class Meta:
         verbose_name = '工作量'
         verbose_name_plural = '工作量'
         ordering = ['-created_at']
+        indexes = [
+            # 提交者自己的工作量列表（get_queryset / submitted=true）
+            models.Index(fields=['submitter', '-created_at'], name='workload_submitter_created_idx'),
+            # 导师待审核 / 已审核队列：mentor_reviewer + status
+            models.Index(fields=['mentor_reviewer', 'status', '-created_at'], name='workload_mentor_status_idx'),
+            # 教师待审核队列：status = mentor_approved / pending
+            models.Index(fields=['status', '-created_at'], name='workload_status_created_idx'),
+            # 教师已审核列表：teacher_reviewer
+            models.Index(fields=['teacher_reviewer', '-created_at'], name='workload_teacher_created_idx'),
+            # 教师总览的来源筛选与日期排序
+            models.Index(fields=['source', '-created_at'], name='workload_source_created_idx'),
+            models.Index(fields=['start_date'], name='workload_start_date_idx'),
+            models.Index(fields=['end_date'], name='workload_end_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.submitter.username}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录加载时的导师审核人，更换导师后需要同时刷新原导师的待审核计数
+        instance._loaded_mentor_reviewer_id = instance.__dict__.get('mentor_reviewer_id')
+        # 记录加载时的来源，来源由大创改为其他来源时才需要清理占比
+        instance._loaded_source = instance.__dict__.get('source')
+        # 记录加载时的附件，附件变化时维护文件引用数
+        instance._loaded_attachments = instance.__dict__.get('attachments') or None
+        # 记录加载时的名称和内容，变化时才更新搜索索引
+        instance._loaded_search_text = (instance.__dict__.get('name'), instance.__dict__.get('content'))
+        return instance
     
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -188,14 +240,13 @@ class Workload(models.Model):
             if self.submitter.role == 'student':
                 raise ValidationError('学生不能提交大创类工作量')
 
-    @transaction.atomic
     def save(self, *args, **kwargs):
         # 清理与 source 无关的字段
+        clear_shares = False
         if self.source != 'innovation':
             self.innovation_stage = None
-            # 删除所有 shares
-            if self.pk:  # 仅当已存在时删除
-                self.shares.all().delete()
+            # 仅在来源由大创改为其他来源时删除 shares，其他来源的保存不访问占比表
+            clear_shares = bool(self.pk) and getattr(self, '_loaded_source', None) == 'innovation'
 
         if self.source != 'assistant':
             self.assistant_salary_paid = None
@@ -203,39 +254,50 @@ class Workload(models.Model):
         if self.source not in ['horizontal']:
             self.project = None
 
-        # 如果是新创建的记录，确保ID不使用固定值，而是自动生成
-        if self.pk and not Workload.objects.filter(pk=self.pk).exists():
-            # 如果指定了ID但不存在，清除ID让数据库自动生成
-            self.pk = None
-            
-        # 如果是新创建的记录
-        if not self.pk:
-            # 先保存以获取ID
-            super().save(*args, **kwargs)
-            
-            # 如果有附件，重新保存以使用正确的文件路径
-            if self.attachments:
-                try:
-                    old_path = self.attachments.path
-                    filename = os.path.basename(old_path)
-                    new_path = workload_file_path(self, filename)
-                    # 更新文件路径
-                    self.attachments.name = new_path
-                    super().save(update_fields=['attachments'], *args, **kwargs)
-                except Exception as e:
-                    import logging
-                    logging.getLogger(__name__).error(f"处理附件时出错: {e}")
+        # 新上传的附件记录原始文件名，存储路径由文件内容决定
+        # 新上传的文件在写入存储时已增加引用，直接指定路径（如引用分片上传的文件）时在这里增加
+        new_upload = bool(self.attachments) and not self.attachments._committed
+        if new_upload:
+            self.original_filename = os.path.basename(self.attachments.name)
+        elif not self.attachments:
+            self.original_filename = None
+
+        # 新建时直接 INSERT（附件路径在 pre_save 中生成，不依赖ID），修改时直接 UPDATE
+        old_attachment = getattr(self, '_loaded_attachments', None)
+        if clear_shares or (self.attachments.name or None) != old_attachment:
+            with transaction.atomic():
+                if clear_shares:
+                    self.shares.all().delete()
+                super().save(*args, **kwargs)
+                # 附件变化时增加新文件的引用、释放旧文件的引用
+                new_attachment = self.attachments.name or None
+                if new_attachment != old_attachment:
+                    if new_attachment:
+                        if not new_upload:
+                            AttachmentBlob.acquire(new_attachment, self.attachments.size)
+                        if is_image(new_attachment):
+                            transaction.on_commit(lambda: generate_thumbnails_on_commit(new_attachment))
+                    if old_attachment:
+                        AttachmentBlob.release(old_attachment)
+                    self._loaded_attachments = new_attachment
         else:
             super().save(*args, **kwargs)
 
+        invalidate_workload_counts(
+            self.mentor_reviewer_id, getattr(self, '_loaded_mentor_reviewer_id', None)
+        )
+        self._loaded_source = self.source
+        if (self.name, self.content) != getattr(self, '_loaded_search_text', None):
+            index_objects([self])
+            self._loaded_search_text = (self.name, self.content)
+
+    @transaction.atomic
     def delete(self, *args, **kwargs):
-        # 删除关联的文件
+        # 释放关联文件的引用，没有其他工作量引用时在事务提交后删除文件
         if self.attachments:
-            try:
-                if os.path.isfile(self.attachments.path):
-                    os.remove(self.attachments.path)
-            except Exception as e:
-                print(f"删除文件失败: {e}")
+            AttachmentBlob.release(self.attachments.name)
+        invalidate_workload_counts(self.mentor_reviewer_id)
+        unindex_object(self)
         super().delete(*args, **kwargs)
 
 class WorkloadShare(models.Model):
@@ -264,4 +326,190 @@ class WorkloadShare(models.Model):
         unique_together = ('workload', 'user')  # 同一个工作量中不能重复添加同一个用户
 
     def __str__(self):
-        return f"{self.user.username} - {self.percentage}% ({self.workload.name})"
\ No newline at end of file
+        return f"{self.user.username} - {self.percentage}% ({self.workload.name})"
+
+class ExportJob(models.Model):
+    """后台导出任务"""
+
+    STATUS_CHOICES = (
+        ('pending', '排队中'),
+        ('running', '导出中'),
+        ('finished', '已完成'),
+        ('failed', '失败'),
+    )
+
+    id = models.UUIDField('任务ID', primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='export_jobs',
+        verbose_name='提交者'
+    )
+    params = models.JSONField('导出条件', default=dict)
+    cache_key = models.CharField('缓存键', max_length=64, db_index=True)
+    status = models.CharField('任务状态', max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField('总行数', default=0)
+    processed = models.PositiveIntegerField('已处理行数', default=0)
+    error = models.TextField('错误信息', blank=True, null=True)
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    finished_at = models.DateTimeField('完成时间', null=True, blank=True)
+
+    class Meta:
+        verbose_name = '导出任务'
+        verbose_name_plural = '导出任务'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.id} - {self.get_status_display()}"
+
+
+class WorkloadRollup(models.Model):
+    """按用户、来源和月份汇总的已审核工作量（由 workload.rollup 增量维护）"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='workload_rollups',
+        verbose_name='用户'
+    )
+    source = models.CharField('工作来源', max_length=20, choices=Workload.SOURCE_CHOICES)
+    month = models.DateField('月份', help_text='当月第一天')
+    amount = models.FloatField('工作量', default=0, help_text='按工作强度类型折算到当月的工作量，大创按占比分摊')
+    workload_count = models.IntegerField('工作量条数', default=0)
+
+    class Meta:
+        verbose_name = '工作量月度汇总'
+        verbose_name_plural = '工作量月度汇总'
+        unique_together = ('user', 'source', 'month')
+        ordering = ['user', 'month', 'source']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.get_source_display()} - {self.month:%Y-%m}: {self.amount}"
+
+
+class UploadSession(models.Model):
+    """
+    分片上传会话
+
+    文件按字节偏移量分片追加写入 path 指向的最终文件，上传完成后在提交或修改工作量时
+    通过 upload_id 引用，附件直接使用该文件，会话随之删除。
+    """
+
+    STATUS_CHOICES = (
+        ('uploading', '上传中'),
+        ('completed', '已完成'),
+    )
+
+    id = models.UUIDField('上传ID', primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name='上传者'
+    )
+    filename = models.CharField('原始文件名', max_length=255)
+    path = models.CharField('存储路径', max_length=500)
+    size = models.PositiveBigIntegerField('文件大小')
+    offset = models.PositiveBigIntegerField('已接收字节数', default=0)
+    status = models.CharField('上传状态', max_length=20, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    updated_at = models.DateTimeField('更新时间', auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name = '上传会话'
+        verbose_name_plural = '上传会话'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} - {self.get_status_display()}"
+
+
+class AttachmentBlob(models.Model):
+    """按内容存储的附件文件及其引用数（文件由 workload.storage 写入）"""
+    name = models.CharField('存储路径', max_length=500, unique=True)
+    size = models.PositiveBigIntegerField('文件大小', default=0)
+    ref_count = models.PositiveIntegerField('引用数', default=0)
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+
+    class Meta:
+        verbose_name = '附件文件'
+        verbose_name_plural = '附件文件'
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    @classmethod
+    def acquire(cls, name, size=0):
+        """增加文件的引用数"""
+        if not is_blob_name(name):
+            return
+        if not cls.objects.filter(name=name).update(ref_count=models.F('ref_count') + 1):
+            try:
+                with transaction.atomic():
+                    cls.objects.create(name=name, size=size, ref_count=1)
+            except IntegrityError:
+                # 并发创建了同一文件的记录
+                cls.objects.filter(name=name).update(ref_count=models.F('ref_count') + 1)
+
+    @classmethod
+    def release(cls, name):
+        """减少文件的引用数，归零时在事务提交后删除文件"""
+        if is_blob_name(name):
+            cls.objects.filter(name=name, ref_count__gt=0).update(ref_count=models.F('ref_count') - 1)
+            if not cls.objects.filter(name=name, ref_count=0).exists():
+                return
+        # 旧路径下的附件没有引用记录，每个文件只属于一条工作量，直接删除
+        transaction.on_commit(lambda: delete_unreferenced_file(name))
+
+
+def delete_unreferenced_file(name):
+    """
+    删除没有任何引用的附件文件
+
+    按内容存储的文件先锁定引用记录并确认引用数仍为 0，再删除文件和记录。
+    同时引用该文件的 acquire 会等待此事务结束，之后发现文件不存在时由存储重新写入。
+    """
+    if not is_blob_name(name):
+        remove_attachment_file(name)
+        return
+    with transaction.atomic():
+        blob = AttachmentBlob.objects.select_for_update().filter(name=name, ref_count=0).first()
+        if blob is None:
+            # 删除前又被新的工作量或上传会话引用
+            return
+        remove_attachment_file(name)
+        blob.delete()
+
+
+def remove_attachment_file(name):
+    try:
+        attachment_storage.delete(name)
+    except OSError as e:
+        import logging
+        logging.getLogger(__name__).error(f"删除文件失败: {name}, {e}")
+    if is_image(name):
+        delete_thumbnails(name)
+
+
+class SearchToken(models.Model):
+    """
+    全文搜索的倒排索引（由 workload.search 维护）
+
+    仅在不支持 ngram 全文索引的数据库（SQLite）中使用，MySQL 使用 FULLTEXT 索引，此表为空。
+    """
+    kind = models.CharField('记录类型', max_length=50)
+    object_id = models.PositiveBigIntegerField('记录ID')
+    token = models.CharField('n-gram', max_length=20)
+    weight = models.PositiveIntegerField('权重', default=1)
+
+    class Meta:
+        verbose_name = '搜索索引'
+        verbose_name_plural = '搜索索引'
+        indexes = [
+            # 按 n-gram 查找记录
+            models.Index(fields=['kind', 'token', 'object_id'], name='search_token_idx'),
+            # 更新或删除一条记录的索引
+            models.Index(fields=['kind', 'object_id'], name='search_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.token}"
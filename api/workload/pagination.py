@@ -0,0 +1,169 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    基于 (created_at, id) 的键集游标分页
+
+    - 每页多取一行判断是否还有下一页，不执行 COUNT(*)
+    - 游标编码了上一页最后一行的排序键值，下一页通过 WHERE 条件定位，
+      不使用 OFFSET，翻页代价与页码无关
+    - 仅当请求携带 cursor 或 page_size 参数时启用分页，
+      未携带时保持原有的完整列表响应，兼容旧版前端
+    """
+    page_size = settings.WORKLOAD_PAGE_SIZE
+    max_page_size = settings.WORKLOAD_MAX_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = '无效的分页游标'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.model = queryset.model
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.build_keyset_filter(position))
+
+        # 多取一行用于判断是否还有下一页
+        rows = list(queryset[:self.page_size + 1])
+        self.has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self.get_position(rows[-1]) if self.has_more else None
+        return rows
+
+    def get_page_size(self, request):
+        """读取并限制每页数量"""
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, view):
+        """视图可通过 keyset_ordering 指定排序字段，最后一个字段必须唯一"""
+        ordering = getattr(view, 'keyset_ordering', None) or self.ordering
+        return tuple(ordering)
+
+    def get_position(self, obj):
+        """提取一行记录在排序键上的取值"""
+        return [
+            self.model._meta.get_field(name.lstrip('-')).value_to_string(obj)
+            for name in self.ordering
+        ]
+
+    def build_keyset_filter(self, position):
+        """
+        构造 (k1, k2, ...) 严格位于游标之后的条件：
+        k1 < v1 OR (k1 = v1 AND k2 < v2) OR ...
+        """
+        conditions = []
+        for index, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equals = {
+                prev.lstrip('-'): position[i]
+                for i, prev in enumerate(self.ordering[:index])
+            }
+            conditions.append(Q(**equals, **{f'{field}__{lookup}': position[index]}))
+        return reduce(or_, conditions)
+
+    def encode_cursor(self, position):
+        payload = json.dumps(position, ensure_ascii=False).encode('utf-8')
+        cursor = base64.urlsafe_b64encode(payload).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError(cursor)
+            return [
+                self.model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.ordering, position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'has_more': self.has_more,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'has_more': {
+                    'type': 'boolean',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': '分页游标，取自上一页响应中的 next',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'每页数量，最大 {self.max_page_size}',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    搜索结果分页
+
+    结果按相关度排序，没有可用于键集分页的稳定排序键，使用页码分页。
+    """
+    page_size = settings.WORKLOAD_PAGE_SIZE
+    max_page_size = settings.WORKLOAD_MAX_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    invalid_page_message = '无效的页码'
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# 教师的待审核队列对所有教师相同，共用一个计数
+WORKLOAD_TEACHER_KEY = 'review_count:workload:teacher'
+PROJECT_TEACHER_KEY = 'review_count:project:teacher'
+
+
+def workload_mentor_key(user_id):
+    return f'review_count:workload:mentor:{user_id}'
+
+
+def get_review_count(key, queryset):
+    """
+    读取待审核计数
+
+    优先读取 Redis 缓存，未命中时执行一次 COUNT 查询并回写。
+    Redis 不可用时 django-redis 忽略异常并返回 None，同样退回到 COUNT 查询。
+    """
+    count = cache.get(key)
+    if count is None:
+        count = queryset.order_by().count()
+        cache.set(key, count, settings.REVIEW_COUNT_TTL)
+    return count
+
+
+def invalidate_workload_counts(*mentor_ids):
+    """工作量状态或审核人变化后，在事务提交后清除相关计数"""
+    keys = [WORKLOAD_TEACHER_KEY] + [workload_mentor_key(pk) for pk in set(mentor_ids) if pk]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_project_counts():
+    """项目审核状态变化后，在事务提交后清除教师的待审核项目计数"""
+    transaction.on_commit(lambda: cache.delete(PROJECT_TEACHER_KEY))
@@ -0,0 +1,144 @@
+"""
+工作量月度汇总表的维护
+
+汇总表以 (用户, 来源, 月份) 为键，记录已审核工作量折算到各月的数值：
+- total：强度值按天数比例分摊到各月
+- daily：强度值 × 当月天数
+- weekly：强度值 × 当月天数 / 7
+大创类工作量按 WorkloadShare.percentage 分摊给每个参与人，其他来源全部计入提交者。
+
+所有会改变工作量状态、内容、占比或删除工作量的写操作都放在 track_rollup 中执行，
+进入时读取受影响工作量当前的贡献值，退出时重新读取并把差值写入汇总表，
+与业务写操作处于同一事务。
+"""
+from calendar import monthrange
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import F, Prefetch
+
+from .models import Workload, WorkloadShare, WorkloadRollup
+
+# 计入汇总的审核状态
+ROLLUP_STATUSES = ('teacher_approved',)
+
+
+def iter_months(start, end):
+    """按月拆分日期区间，返回 (当月第一天, 区间在当月的天数)"""
+    current = start
+    while current <= end:
+        last_day = date(current.year, current.month, monthrange(current.year, current.month)[1])
+        span_end = min(end, last_day)
+        yield current.replace(day=1), (span_end - current).days + 1
+        current = span_end + timedelta(days=1)
+
+
+def monthly_amounts(workload):
+    """将一条工作量的强度值折算到各月"""
+    if not workload.start_date or not workload.end_date or workload.end_date < workload.start_date:
+        return {}
+    total_days = (workload.end_date - workload.start_date).days + 1
+    amounts = {}
+    for month, days in iter_months(workload.start_date, workload.end_date):
+        if workload.intensity_type == 'daily':
+            amounts[month] = workload.intensity_value * days
+        elif workload.intensity_type == 'weekly':
+            amounts[month] = workload.intensity_value * days / 7
+        else:
+            amounts[month] = workload.intensity_value * days / total_days
+    return amounts
+
+
+def user_ratios(workload):
+    """工作量在各用户间的分摊比例"""
+    if workload.source == 'innovation':
+        return {share.user_id: share.percentage / 100 for share in workload.shares.all()}
+    return {workload.submitter_id: 1.0}
+
+
+def collect_contributions(workload_ids):
+    """
+    计算指定工作量当前对汇总表的贡献
+
+    返回 {(user_id, source, month): [amount, workload_count]}
+    """
+    contributions = defaultdict(lambda: [0.0, 0])
+    ids = [pk for pk in workload_ids if pk is not None]
+    if not ids:
+        return contributions
+
+    workloads = Workload.objects.filter(
+        id__in=ids, status__in=ROLLUP_STATUSES
+    ).order_by().prefetch_related(
+        Prefetch('shares', queryset=WorkloadShare.objects.only('workload_id', 'user_id', 'percentage'))
+    )
+    for workload in workloads:
+        add_contribution(contributions, workload)
+    return contributions
+
+
+def add_contribution(contributions, workload):
+    amounts = monthly_amounts(workload)
+    for user_id, ratio in user_ratios(workload).items():
+        for month, amount in amounts.items():
+            entry = contributions[(user_id, workload.source, month)]
+            entry[0] += amount * ratio
+            entry[1] += 1
+
+
+def apply_delta(before, after):
+    """把前后贡献的差值写入汇总表"""
+    for key in set(before) | set(after):
+        old_amount, old_count = before.get(key, (0.0, 0))
+        new_amount, new_count = after.get(key, (0.0, 0))
+        delta_amount = new_amount - old_amount
+        delta_count = new_count - old_count
+        if abs(delta_amount) < 1e-9 and delta_count == 0:
+            continue
+
+        user_id, source, month = key
+        rollup, _ = WorkloadRollup.objects.get_or_create(user_id=user_id, source=source, month=month)
+        WorkloadRollup.objects.filter(pk=rollup.pk).update(
+            amount=F('amount') + delta_amount,
+            workload_count=F('workload_count') + delta_count
+        )
+        WorkloadRollup.objects.filter(pk=rollup.pk, workload_count__lte=0).delete()
+
+
+@contextmanager
+def track_rollup(workload_ids):
+    """
+    在同一事务中执行写操作并同步汇总表
+
+    用法：
+        with track_rollup([workload.pk]):
+            workload.save()
+    """
+    with transaction.atomic():
+        ids = list(workload_ids)
+        before = collect_contributions(ids)
+        yield
+        apply_delta(before, collect_contributions(ids))
+
+
+@transaction.atomic
+def rebuild_rollup(chunk_size=1000):
+    """根据当前已审核的工作量全量重建汇总表，返回写入的汇总行数"""
+    contributions = defaultdict(lambda: [0.0, 0])
+    workloads = Workload.objects.filter(status__in=ROLLUP_STATUSES).order_by().prefetch_related(
+        Prefetch('shares', queryset=WorkloadShare.objects.only('workload_id', 'user_id', 'percentage'))
+    )
+    for workload in workloads.iterator(chunk_size=chunk_size):
+        add_contribution(contributions, workload)
+
+    WorkloadRollup.objects.all().delete()
+    WorkloadRollup.objects.bulk_create(
+        [
+            WorkloadRollup(user_id=user_id, source=source, month=month, amount=amount, workload_count=count)
+            for (user_id, source, month), (amount, count) in contributions.items()
+        ],
+        batch_size=chunk_size
+    )
+    return len(contributions)
@@ -0,0 +1,199 @@
+"""
+工作量和项目的全文搜索
+
+中文没有空格分词，文本按 2 个字符的 n-gram 切分建立倒排索引（英文和数字同样切分），
+搜索词切分后按命中的 n-gram 数量排序，名称中的命中权重更高。
+
+- MySQL：使用 InnoDB FULLTEXT 索引（WITH PARSER ngram），由数据库在事务提交时维护，
+  相关度由 MATCH ... AGAINST 计算
+- 其他数据库（开发和测试使用的 SQLite）：SearchToken 表作为倒排索引，
+  工作量和项目保存、删除后在事务提交时由应用更新
+
+搜索结果只在调用方传入的查询集范围内筛选，可见范围由各视图的 get_queryset 决定。
+"""
+import logging
+import re
+from collections import Counter
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.expressions import RawSQL
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .pagination import SearchPagination
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 2
+
+# 搜索词最大长度，避免切分出过多 n-gram
+MAX_QUERY_LENGTH = 100
+
+# 参与搜索的字段及权重
+SEARCH_FIELDS = {
+    'workload.workload': (('name', 2), ('content', 1)),
+    'project.project': (('name', 1),),
+}
+
+WORD_RE = re.compile(r'\w+')
+
+
+def uses_fulltext():
+    """是否使用数据库的 ngram 全文索引"""
+    return connection.vendor == 'mysql'
+
+
+def tokenize(text):
+    """把文本切分为 n-gram，不足 n 个字符的词保留原样"""
+    tokens = []
+    for word in WORD_RE.findall((text or '').lower()):
+        if len(word) <= NGRAM_SIZE:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + NGRAM_SIZE] for i in range(len(word) - NGRAM_SIZE + 1))
+    return tokens
+
+
+def weighted_tokens(obj):
+    """计算一条记录的 {n-gram: 权重}"""
+    weights = Counter()
+    for field, weight in SEARCH_FIELDS[obj._meta.label_lower]:
+        for token in tokenize(getattr(obj, field)):
+            weights[token] += weight
+    return weights
+
+
+def build_tokens(token_model, objs):
+    tokens = []
+    for obj in objs:
+        kind = obj._meta.label_lower
+        tokens.extend(
+            token_model(kind=kind, object_id=obj.pk, token=token, weight=weight)
+            for token, weight in weighted_tokens(obj).items()
+        )
+    return tokens
+
+
+def index_objects(objs):
+    """在事务提交后重建这些记录的索引，使用 MySQL 全文索引时不需要维护"""
+    objs = [obj for obj in objs if obj.pk is not None]
+    if uses_fulltext() or not objs:
+        return
+    transaction.on_commit(lambda: write_index(objs))
+
+
+def unindex_object(obj):
+    """在事务提交后删除记录的索引"""
+    if uses_fulltext():
+        return
+    kind, object_id = obj._meta.label_lower, obj.pk
+    token_model = apps.get_model('workload', 'SearchToken')
+    transaction.on_commit(
+        lambda: token_model.objects.filter(kind=kind, object_id=object_id).delete()
+    )
+
+
+def write_index(objs):
+    token_model = apps.get_model('workload', 'SearchToken')
+    kind = objs[0]._meta.label_lower
+    try:
+        with transaction.atomic():
+            token_model.objects.filter(kind=kind, object_id__in=[obj.pk for obj in objs]).delete()
+            token_model.objects.bulk_create(build_tokens(token_model, objs), batch_size=1000)
+    except Exception as e:
+        # 索引更新失败不影响已提交的数据，可通过 rebuild_search_index 命令重建
+        logger.error(f"更新搜索索引失败: {kind}, {e}")
+
+
+def rebuild_index(token_model, model, chunk_size=500):
+    """重建一个模型的全部索引"""
+    kind = model._meta.label_lower
+    token_model.objects.filter(kind=kind).delete()
+    fields = [field for field, _ in SEARCH_FIELDS[kind]]
+    queryset = model.objects.only('pk', *fields).order_by('pk')
+    count = 0
+    batch = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        batch.append(obj)
+        if len(batch) >= chunk_size:
+            token_model.objects.bulk_create(build_tokens(token_model, batch))
+            count += len(batch)
+            batch = []
+    if batch:
+        token_model.objects.bulk_create(build_tokens(token_model, batch))
+        count += len(batch)
+    return count
+
+
+def fulltext_match(model, fields, query):
+    """MATCH ... AGAINST 表达式，字段带表名，避免与关联表的同名字段冲突"""
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = ', '.join(f'{table}.{qn(model._meta.get_field(field).column)}' for field in fields)
+    return RawSQL(f'MATCH ({columns}) AGAINST (%s IN NATURAL LANGUAGE MODE)', [query])
+
+
+def search_queryset(queryset, query):
+    """
+    在查询集中搜索，返回按相关度从高到低排序的查询集
+
+    每条结果带有 search_score 属性；搜索词切分后为空时返回空查询集。
+    """
+    query = (query or '').strip()[:MAX_QUERY_LENGTH]
+    tokens = set(tokenize(query))
+    if not tokens:
+        return queryset.none()
+
+    model = queryset.model
+    search_fields = SEARCH_FIELDS[model._meta.label_lower]
+    if uses_fulltext():
+        # 名称单独建有全文索引，名称命中时额外加分
+        all_fields = [field for field, _ in search_fields]
+        score = fulltext_match(model, all_fields, query)
+        if len(all_fields) > 1:
+            score = score + fulltext_match(model, all_fields[:1], query)
+        return queryset.alias(
+            search_match=fulltext_match(model, all_fields, query)
+        ).filter(search_match__gt=0).annotate(
+            search_score=score
+        ).order_by('-search_score', '-pk')
+
+    token_model = apps.get_model('workload', 'SearchToken')
+    matches = token_model.objects.filter(kind=model._meta.label_lower, token__in=tokens)
+    score = matches.filter(object_id=OuterRef('pk')).values('object_id').annotate(
+        score=Sum('weight')
+    ).values('score')
+    return queryset.filter(
+        pk__in=matches.values('object_id')
+    ).annotate(
+        search_score=Subquery(score)
+    ).order_by('-search_score', '-pk')
+
+
+class SearchMixin:
+    """为视图集增加 search 接口，在 get_queryset 的可见范围内搜索"""
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        全文搜索
+
+        ?q= 为搜索词，结果按相关度从高到低排序，每条结果附带 score，
+        通过 ?page= 和 ?page_size= 分页。
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {"detail": "请输入搜索关键词"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(search_queryset(self.get_queryset(), query), request, view=self)
+        data = self.get_serializer(page, many=True).data
+        for item, obj in zip(data, page):
+            item['score'] = round(float(obj.search_score or 0), 4)
+        return paginator.get_paginated_response(data)
@@ -1,7 +1,13 @@
 from rest_framework import serializers
-from .models import Workload, WorkloadShare
+from .models import Workload, WorkloadShare, ExportJob, UploadSession
+from .shares import sync_shares
+from .thumbnails import is_image
+from .image_optimize import optimize_image_upload
+from .uploads import delete_upload_session
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from rest_framework.reverse import reverse
+from django.conf import settings
 import os
 import logging
 from datetime import timedelta,date
@@ -31,6 +37,75 @@ class WorkloadShareSerializer(serializers.ModelSerializer):
         model = WorkloadShare
         fields = ['user', 'user_info', 'percentage']
 
+def check_workload_rules(data, user, instance=None):
+    """
+    工作量的业务规则校验，不满足时抛出 ValidationError
+
+    data 为已通过字段校验的数据，project_id / mentor_reviewer_id 为模型实例；
+    修改时传入 instance，未提交的字段取原值。批量导入复用同一套规则。
+    """
+    # 如果是学生提交，必须指定导师
+    if user.role == 'student' and not data.get('mentor_reviewer_id'):
+        raise serializers.ValidationError("学生提交工作量时必须指定导师")
+
+    # 材料撰写必须在完成后1个月内申报
+    source = data.get('source', getattr(instance, 'source', None))
+    end_date = data.get('end_date', getattr(instance, 'end_date', None))
+    if source == 'documentation' and end_date:
+        today = date.today()
+        if today - end_date > timedelta(days=30):
+            raise serializers.ValidationError({
+                "end_date": "材料撰写类工作量必须在完成后1个月内申报"
+            })
+
+    # 大创必须填写阶段
+    innovation_stage = data.get('innovation_stage') or getattr(instance, 'innovation_stage', None)
+    if source == 'innovation' and not innovation_stage:
+        raise serializers.ValidationError({
+            "innovation_stage": "大创类工作量必须选择阶段（立项前/立项后）"
+        })
+    # 大创工作量：验证 shares
+    if source == 'innovation':
+        shares = data.get('shares')
+        if not shares or len(shares) == 0:
+            raise serializers.ValidationError({"shares": "大创类工作量必须指定参与人员及占比"})
+        total = sum(s['percentage'] for s in shares)
+        if abs(total - 100.0) > 1e-6:
+            raise serializers.ValidationError({"shares": "大创类工作量占比总和必须为100"})
+        submitter_id = user.id
+        if submitter_id not in [s['user'].id if isinstance(s['user'], User) else s['user'] for s in shares]:
+            raise serializers.ValidationError({"shares": "提交者必须包含在大创类工作量的占比中"})
+
+    # 学生不能提交大创工作量
+    if source == 'innovation' and user.role == 'student':
+        raise serializers.ValidationError("学生不能提交大创类工作量")
+
+    # 助教必须填写工资
+    assistant_salary_paid = data.get('assistant_salary_paid') or getattr(instance, 'assistant_salary_paid', None)
+    if source == 'assistant' and assistant_salary_paid is None:
+        raise serializers.ValidationError({
+            "assistant_salary_paid": "助教类工作量必须填写已发助教工资"
+        })
+
+    # 大创/横向/材料撰写必须关联已审核通过的项目
+    project = data.get('project_id') or getattr(instance, 'project', None)
+    name = data.get('name') or getattr(instance, 'name', None)
+
+    if source in ['horizontal']:
+        if not project:
+            raise serializers.ValidationError({
+                "project": "横向的工作量必须选择一个已审核通过的项目"
+            })
+        if project.review_status != 'approved':  # 假设 Project 有 status 字段，且教师审核通过标记为 approved
+            raise serializers.ValidationError({
+                "project": "关联的项目必须是教师已审核通过的项目"
+            })
+        if name != project.name:
+            raise serializers.ValidationError({
+                "name": "工作量名称必须与所选项目的名称一致"
+            })
+
+
 class WorkloadSerializer(serializers.ModelSerializer):
     """工作量序列化器"""
     submitter = UserSimpleSerializer(read_only=True)
@@ -42,7 +117,10 @@ class WorkloadSerializer(serializers.ModelSerializer):
         required=False
     )
     attachments_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     original_filename = serializers.SerializerMethodField()
+    # 通过分片上传完成的附件
+    upload_id = serializers.UUIDField(write_only=True, required=False)
     # 新增字段：大创参与人及占比
     shares = WorkloadShareSerializer(many=True, required=False)
 
@@ -60,30 +138,43 @@ class WorkloadSerializer(serializers.ModelSerializer):
             'id', 'name', 'content', 'source', 'work_type',
             'start_date', 'end_date', 'intensity_type', 'intensity_value',
             'innovation_stage', 'assistant_salary_paid',
-            'attachments', 'attachments_url', 'original_filename', 'submitter', 
+            'attachments', 'attachments_url', 'thumbnail_url', 'original_filename', 'submitter', 
             'mentor_reviewer', 'mentor_reviewer_id', 'mentor_comment', 'mentor_review_time',
             'teacher_reviewer', 'teacher_comment', 'teacher_review_time',
             'status', 'created_at', 'updated_at',
-            'shares', 'project', 'project_id'
+            'shares', 'project', 'project_id', 'upload_id'
         ]
         read_only_fields = [
             'status', 'mentor_comment', 'teacher_comment',
             'mentor_review_time', 'teacher_review_time',
             'created_at', 'updated_at'
         ]
+        extra_kwargs = {
+            # 只用于上传；返回存储路径既无法访问又会暴露内部路径，下载地址见 attachments_url
+            'attachments': {'write_only': True},
+        }
 
     def get_attachments_url(self, obj):
-        """获取附件的URL"""
+        """获取附件的下载地址（经过权限检查的下载接口）"""
         if obj.attachments:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.attachments.url)
+                return request.build_absolute_uri(reverse('workload-attachment', kwargs={'pk': obj.pk}))
+        return None
+
+    def get_thumbnail_url(self, obj):
+        """图片附件的缩略图地址，默认尺寸，可通过 ?size= 改为 small 或 large"""
+        if obj.attachments and is_image(obj.attachments.name):
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(reverse('workload-thumbnail', kwargs={'pk': obj.pk}))
         return None
 
     def get_original_filename(self, obj):
         """获取原始文件名"""
         if obj.attachments:
-            return os.path.basename(obj.attachments.name)
+            # 按内容存储的附件文件名是哈希，原始文件名单独保存；旧附件的路径中保留了原始文件名
+            return obj.original_filename or os.path.basename(obj.attachments.name)
         return None
 
     def validate(self, data):
@@ -105,75 +196,30 @@ class WorkloadSerializer(serializers.ModelSerializer):
         if not request or not request.user:
             raise serializers.ValidationError("无法获取当前用户信息")
 
-        # 如果是学生提交，必须指定导师
-        if request.user.role == 'student' and not data.get('mentor_reviewer_id'):
-            raise serializers.ValidationError("学生提交工作量时必须指定导师")
-
-        # 验证文件大小
+        # 图片附件先缩小和重新压缩，按处理后的大小验证
         attachments = data.get('attachments')
         if attachments:
-            if attachments.size > 10 * 1024 * 1024:  # 10MB
+            attachments = data['attachments'] = optimize_image_upload(attachments)
+            if attachments.size > settings.WORKLOAD_ATTACHMENT_MAX_SIZE:
                 raise serializers.ValidationError({
                     "attachments": "文件大小不能超过10MB"
                 })
 
-        # 材料撰写必须在完成后1个月内申报
-        source = data.get('source', getattr(self.instance, 'source', None))
-        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
-        if source == 'documentation' and end_date:
-            today = date.today()
-            if today - end_date > timedelta(days=30):
-                raise serializers.ValidationError({
-                    "end_date": "材料撰写类工作量必须在完成后1个月内申报"
-                })
-
-        # 大创必须填写阶段
-        innovation_stage = data.get('innovation_stage') or getattr(self.instance, 'innovation_stage', None)
-        if source == 'innovation' and not innovation_stage:
-            raise serializers.ValidationError({
-                "innovation_stage": "大创类工作量必须选择阶段（立项前/立项后）"
-            })
-        # 大创工作量：验证 shares
-        if source == 'innovation':
-            shares = data.get('shares')
-            if not shares or len(shares) == 0:
-                raise serializers.ValidationError({"shares": "大创类工作量必须指定参与人员及占比"})
-            total = sum(s['percentage'] for s in shares)
-            if abs(total - 100.0) > 1e-6:
-                raise serializers.ValidationError({"shares": "大创类工作量占比总和必须为100"})
-            submitter_id = request.user.id
-            if submitter_id not in [s['user'].id if isinstance(s['user'], User) else s['user'] for s in shares]:
-                raise serializers.ValidationError({"shares": "提交者必须包含在大创类工作量的占比中"})
-
-        # 学生不能提交大创工作量
-        if source == 'innovation' and request.user.role == 'student':
-            raise serializers.ValidationError("学生不能提交大创类工作量")
-
-        # 助教必须填写工资
-        assistant_salary_paid = data.get('assistant_salary_paid') or getattr(self.instance, 'assistant_salary_paid',
-                                                                                None)
-        if source == 'assistant' and assistant_salary_paid is None:
-            raise serializers.ValidationError({
-                "assistant_salary_paid": "助教类工作量必须填写已发助教工资"
-            })
-
-        # 大创/横向/材料撰写必须关联已审核通过的项目
-        project = data.get('project_id') or getattr(self.instance, 'project', None)
-        name = data.get('name') or getattr(self.instance, 'name', None)
-
-        if source in ['horizontal']:
-            if not project:
-                raise serializers.ValidationError({
-                    "project": "横向的工作量必须选择一个已审核通过的项目"
-                })
-            if project.review_status != 'approved':  # 假设 Project 有 status 字段，且教师审核通过标记为 approved
-                raise serializers.ValidationError({
-                    "project": "关联的项目必须是教师已审核通过的项目"
-                })
-            if name != project.name:
-                raise serializers.ValidationError({
-                    "name": "工作量名称必须与所选项目的名称一致"
-                })
+        # 引用分片上传完成的文件作为附件
+        upload_id = data.pop('upload_id', None)
+        if upload_id:
+            if attachments:
+                raise serializers.ValidationError({"upload_id": "不能同时上传附件和引用分片上传的文件"})
+            session = UploadSession.objects.filter(
+                pk=upload_id, user=request.user, status='completed'
+            ).first()
+            if session is None:
+                raise serializers.ValidationError({"upload_id": "上传不存在或尚未完成"})
+            data['attachments'] = session.path
+            data['original_filename'] = session.filename
+            data['upload_session'] = session
+
+        check_workload_rules(data, request.user, self.instance)
 
         # 把验证过的 project_id 写入 project 字段，保证 create/update 正常
         if 'project_id' in data:
@@ -186,6 +232,7 @@ class WorkloadSerializer(serializers.ModelSerializer):
         mentor_reviewer = validated_data.pop('mentor_reviewer_id', None)
         submitter = self.context['request'].user
         shares_data = validated_data.pop('shares', None)
+        upload_session = validated_data.pop('upload_session', None)
         
         # 如果指定了ID但数据库中已存在相同ID的记录，则移除ID让数据库自动生成
         if 'id' in validated_data and Workload.objects.filter(id=validated_data['id']).exists():
@@ -204,8 +251,10 @@ class WorkloadSerializer(serializers.ModelSerializer):
             instance = super().create({**validated_data, 'submitter': submitter})
             # 创建大创占比记录
             if shares_data:
-                for s in shares_data:
-                    WorkloadShare.objects.create(workload=instance, user=s['user'], percentage=s['percentage'])
+                sync_shares(WorkloadShare, 'workload', instance, shares_data, ('percentage',), created=True)
+            # 工作量已引用该文件，删除上传会话并释放会话持有的引用
+            if upload_session:
+                delete_upload_session(upload_session)
             return instance
         except Exception as e:
             logger = logging.getLogger(__name__)
@@ -214,37 +263,23 @@ class WorkloadSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         shares_data = validated_data.pop('shares', None)
+        upload_session = validated_data.pop('upload_session', None)
         """更新工作量时设置审核者"""
         if 'mentor_reviewer_id' in validated_data:
             mentor_reviewer = validated_data.pop('mentor_reviewer_id')
             validated_data['mentor_reviewer'] = mentor_reviewer
 
-        # 如果更新了附件，删除旧文件
-        if 'attachments' in validated_data and instance.attachments:
-            try:
-                old_file = instance.attachments.path
-                if os.path.exists(old_file):
-                    os.remove(old_file)
-            except Exception as e:
-                print(f"删除旧文件失败: {e}")
+        # 更新附件后旧文件的引用由 Workload.save 释放，没有其他工作量引用时才删除
 
         # 更新工作量记录
         instance = super().update(instance, validated_data)
 
-        # 如果有新附件，确保目录存在
-        if instance.attachments:
-            directory = os.path.dirname(instance.attachments.path)
-            os.makedirs(directory, exist_ok=True)
-
-        # 更新 shares（只负责写，不负责清理）
+        # 更新 shares（只负责写，不负责清理），只写入有变化的记录
         if instance.source == 'innovation' and shares_data is not None:
-            # 先删除原来的
-            instance.shares.all().delete()
-            for s in shares_data:
-                WorkloadShare.objects.create(workload=instance, user=s['user'], percentage=s['percentage'])
+            sync_shares(WorkloadShare, 'workload', instance, shares_data, ('percentage',))
 
-        # 这里不再写清理逻辑，因为 save() 已经兜底处理了
-        instance.save()
+        if upload_session:
+            delete_upload_session(upload_session)
 
         return instance
 
@@ -284,4 +319,195 @@ class WorkloadReviewSerializer(serializers.ModelSerializer):
             instance.teacher_reviewer = user
             instance.teacher_review_time = timezone.now()
                 
-        return data 
\ No newline at end of file
+        return data 
+
+class MultipleChoiceParamField(serializers.Field):
+    """多选参数，支持逗号分隔的字符串或数组"""
+
+    def __init__(self, choices, **kwargs):
+        self.choices = [value for value, _ in choices]
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            values = [value.strip() for value in data.split(',') if value.strip()]
+        elif isinstance(data, (list, tuple)):
+            values = [str(value) for value in data]
+        else:
+            raise serializers.ValidationError("必须是逗号分隔的字符串或数组")
+        invalid = [value for value in values if value not in self.choices]
+        if invalid:
+            raise serializers.ValidationError(f"无效的选项: {', '.join(invalid)}")
+        return sorted(set(values))
+
+    def to_representation(self, value):
+        return value
+
+
+class WorkloadFilterSerializer(serializers.Serializer):
+    """工作量筛选条件"""
+    status = MultipleChoiceParamField(choices=Workload.STATUS_CHOICES, required=False)
+    source = MultipleChoiceParamField(choices=Workload.SOURCE_CHOICES, required=False)
+    submitter = serializers.IntegerField(required=False, min_value=1)
+    project = serializers.IntegerField(required=False, min_value=1)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError({"date_to": "结束日期不能早于开始日期"})
+        return data
+
+    def filter_queryset(self, queryset):
+        """按验证后的条件过滤查询集"""
+        data = self.validated_data
+        if data.get('status'):
+            queryset = queryset.filter(status__in=data['status'])
+        if data.get('source'):
+            queryset = queryset.filter(source__in=data['source'])
+        if data.get('submitter'):
+            queryset = queryset.filter(submitter_id=data['submitter'])
+        if data.get('project'):
+            queryset = queryset.filter(project_id=data['project'])
+        if data.get('date_from'):
+            queryset = queryset.filter(start_date__gte=data['date_from'])
+        if data.get('date_to'):
+            queryset = queryset.filter(start_date__lte=data['date_to'])
+        return queryset
+
+
+class WorkloadOrderingSerializer(serializers.Serializer):
+    """工作量排序参数，只允许按有索引的字段排序"""
+    ORDERING_FIELDS = ('created_at', 'start_date', 'end_date')
+
+    ordering = serializers.ChoiceField(
+        choices=[prefix + field for field in ORDERING_FIELDS for prefix in ('', '-')],
+        required=False,
+        default='-created_at'
+    )
+
+    def get_ordering(self):
+        """返回排序字段，并以 id 作为同值时的次序，保证游标分页稳定"""
+        ordering = self.validated_data['ordering']
+        return (ordering, '-id' if ordering.startswith('-') else 'id')
+
+
+class WorkloadSummaryFilterSerializer(serializers.Serializer):
+    """工作量汇总查询条件"""
+    user = serializers.IntegerField(required=False, min_value=1)
+    source = MultipleChoiceParamField(choices=Workload.SOURCE_CHOICES, required=False)
+    month_from = serializers.DateField(required=False, input_formats=['%Y-%m'])
+    month_to = serializers.DateField(required=False, input_formats=['%Y-%m'])
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if data.get('user'):
+            queryset = queryset.filter(user_id=data['user'])
+        if data.get('source'):
+            queryset = queryset.filter(source__in=data['source'])
+        if data.get('month_from'):
+            queryset = queryset.filter(month__gte=data['month_from'])
+        if data.get('month_to'):
+            queryset = queryset.filter(month__lte=data['month_to'])
+        return queryset
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """导出任务序列化器"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    progress = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'status', 'status_display', 'total', 'processed', 'progress',
+            'error', 'download_url', 'created_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """导出进度百分比"""
+        if obj.status == 'finished':
+            return 100
+        if not obj.total:
+            return 0
+        return min(99, int(obj.processed * 100 / obj.total))
+
+    def get_download_url(self, obj):
+        if obj.status != 'finished':
+            return None
+        request = self.context.get('request')
+        url = reverse('export-job-download', kwargs={'pk': obj.pk})
+        return request.build_absolute_uri(url) if request else url
+
+
+class ExportJobCreateSerializer(serializers.Serializer):
+    """提交导出任务：指定工作量ID列表或筛选条件"""
+    workload_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    filters = WorkloadFilterSerializer(required=False)
+
+    def validate(self, data):
+        if not data.get('workload_ids') and 'filters' not in data:
+            raise serializers.ValidationError("请选择要导出的工作量或指定筛选条件")
+        return data
+
+    def get_params(self):
+        """规范化后的导出条件，相同条件得到相同的缓存键"""
+        data = self.validated_data
+        if data.get('workload_ids'):
+            return {'workload_ids': sorted(set(data['workload_ids']))}
+        return {'filters': WorkloadFilterSerializer(data['filters']).data}
+
+
+class WorkloadBulkReviewSerializer(serializers.Serializer):
+    """批量审核：同一审核结果和评论应用到多条工作量"""
+    # 单次请求的最大条数
+    MAX_IDS = 1000
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_IDS
+    )
+    status = serializers.ChoiceField(choices=Workload.STATUS_CHOICES)
+    comment = serializers.CharField(error_messages={'required': '请填写审核评论', 'blank': '请填写审核评论'})
+
+    def validate(self, data):
+        user = self.context['request'].user
+        if user.role == 'mentor':
+            if data['status'] not in ['mentor_approved', 'mentor_rejected']:
+                raise serializers.ValidationError("导师只能将状态设置为'导师已审核'或'导师已驳回'")
+        elif user.role == 'teacher':
+            if data['status'] not in ['teacher_approved', 'teacher_rejected']:
+                raise serializers.ValidationError("教师只能将状态设置为'教师已审核'或'教师已驳回'")
+        else:
+            raise serializers.ValidationError("只有导师和教师可以审核工作量")
+        # 去重并保持请求中的顺序
+        data['ids'] = list(dict.fromkeys(data['ids']))
+        return data
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """分片上传会话"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'offset', 'status', 'status_display', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    """创建分片上传会话"""
+    filename = serializers.CharField(max_length=200)
+    size = serializers.IntegerField(min_value=1)
+
+    def validate_filename(self, value):
+        filename = os.path.basename(value.replace('\\', '/')).strip()
+        if not filename or filename in ('.', '..'):
+            raise serializers.ValidationError("文件名无效")
+        return filename
+
+    def validate_size(self, value):
+        if value > settings.WORKLOAD_ATTACHMENT_MAX_SIZE:
+            raise serializers.ValidationError("文件大小不能超过10MB")
+        return value
@@ -0,0 +1,52 @@
+"""
+参与人记录（WorkloadShare / ProjectShare）的批量写入
+
+按 user 对比现有记录和提交的记录：新增的 bulk_create，字段变化的 bulk_update，
+不再出现的用一条带条件的 DELETE 删除，未变化的记录不产生写操作。
+"""
+
+
+def sync_shares(model, parent_field, parent, shares_data, update_fields=(), created=False):
+    """
+    同步 parent 的参与人记录
+
+    model: 参与人模型，通过 user 外键区分记录
+    parent_field: 指向 parent 的外键字段名，如 'workload'
+    shares_data: 序列化器校验后的数据，每项包含 user 和 update_fields 中的字段
+    created: parent 刚刚创建、没有已有记录时传 True，省去读取现有记录的查询
+    """
+    desired = {}
+    for item in shares_data:
+        user = item['user']
+        desired[getattr(user, 'pk', user)] = item
+
+    existing = {}
+    if not created:
+        existing = {share.user_id: share for share in model.objects.filter(**{parent_field: parent})}
+
+    removed = [share.pk for user_id, share in existing.items() if user_id not in desired]
+    if removed:
+        model.objects.filter(pk__in=removed).delete()
+
+    to_create = []
+    to_update = []
+    for user_id, item in desired.items():
+        share = existing.get(user_id)
+        if share is None:
+            to_create.append(model(
+                **{parent_field: parent, 'user_id': user_id},
+                **{field: item[field] for field in update_fields}
+            ))
+            continue
+        changed = False
+        for field in update_fields:
+            if getattr(share, field) != item[field]:
+                setattr(share, field, item[field])
+                changed = True
+        if changed:
+            to_update.append(share)
+
+    if to_create:
+        model.objects.bulk_create(to_create)
+    if to_update:
+        model.objects.bulk_update(to_update, list(update_fields))
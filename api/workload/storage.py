@@ -0,0 +1,77 @@
+"""
+按内容寻址的附件存储
+
+附件以 SHA-256 作为文件名保存在 workload_files/sha256/<前两位>/<哈希><扩展名>，
+相同内容（且扩展名相同）的文件只保存一份。上传时边写入临时文件边计算哈希，
+不需要再读一遍文件。
+
+同一个文件被多少条工作量（以及已完成、尚未被引用的上传会话）引用记录在 AttachmentBlob.ref_count 中。
+写入或复用文件时由存储增加一次引用，归调用方持有：新上传的附件归工作量，分片上传的文件归上传会话。
+引用数归零后在事务中锁定引用记录、确认仍为 0 才删除文件，见 models.delete_unreferenced_file。
+原始文件名保存在 Workload.original_filename。
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = 'workload_files/sha256'
+
+
+def blob_name(digest, filename):
+    """由内容哈希和原始文件名得到存储路径"""
+    ext = os.path.splitext(filename)[1].lower()
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest}{ext}'
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(f'{BLOB_PREFIX}/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """以内容哈希作为文件名的本地文件存储"""
+
+    def get_available_name(self, name, max_length=None):
+        # 实际文件名在 _save 中由内容决定，同名即同内容，不需要避让
+        return name
+
+    def _save(self, name, content):
+        directory = self.path(BLOB_PREFIX)
+        os.makedirs(directory, exist_ok=True)
+
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    sha256.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+
+            name = blob_name(sha256.hexdigest(), name)
+            full_path = self.path(name)
+            # 先增加引用再检查文件：删除文件的一方锁定引用记录并确认引用数为 0，
+            # 增加引用后文件不会再被删除；若文件刚被删除，这里重新写入
+            apps.get_model('workload', 'AttachmentBlob').acquire(name, size)
+            if os.path.exists(full_path):
+                # 已有相同内容的文件
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+
+attachment_storage = ContentAddressedStorage()
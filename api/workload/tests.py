@@ -1,3 +1,1516 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from PIL import Image
+from prometheus_client import REGISTRY
+import redis
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from mysite.throttling import SLIDING_WINDOW_SCRIPT, CostRateThrottle, CostUserRateThrottle, HeavyRateThrottle
+from project.models import Project
+from .pagination import KeysetPagination
+from .models import Workload, WorkloadShare, WorkloadRollup, UploadSession, AttachmentBlob, SearchToken, ExportJob
+from .rollup import rebuild_rollup
+from .export_jobs import run_export_job
+from .exports import EXPORT_HEADERS
+from .uploads import append_chunk, delete_upload_session, UploadOffsetMismatch
+from .search import tokenize
+from .storage import attachment_storage
+from .thumbnails import THUMBNAIL_SIZES, thumbnail_name
+
+User = get_user_model()
+
+
+def create_user(username, role):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password='pass', role=role)
+
+
+def create_workload(submitter, **fields):
+    """创建工作量，未指定的字段使用一条待审核的硬件小组工作量的默认值"""
+    values = {
+        'name': '硬件', 'content': '内容', 'source': 'hardware', 'work_type': 'remote',
+        'start_date': date(2025, 1, 1), 'end_date': date(2025, 1, 2),
+        'intensity_type': 'total', 'intensity_value': 1,
+    }
+    values.update(fields)
+    return Workload.objects.create(submitter=submitter, **values)
+
+
+class WorkloadAPITestCase(APITestCase):
+    """工作量接口测试的基类：教师、导师、学生各一个用户，每个测试前清空缓存"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = create_user('teacher', 'teacher')
+        cls.mentor = create_user('mentor', 'mentor')
+        cls.student = create_user('student', 'student')
+
+    def setUp(self):
+        # 限流计数和待审核计数保存在缓存中，避免受前面测试的影响
+        cache.clear()
+
+
+class WorkloadQueryBudgetTests(WorkloadAPITestCase):
+    """工作量接口的查询次数预算，查询次数不应随返回行数增长"""
+
+    # 条件 GET 校验值聚合 + 主查询（含 submitter/mentor_reviewer/teacher_reviewer/project 连接）+ shares 预加载
+    LIST_BUDGET = 3
+    # 主查询 + shares 预加载
+    DETAIL_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.project = Project.objects.create(
+            name='横向项目', project_status='in_research', start_date=date(2025, 1, 1),
+            submitter=cls.mentor, review_status='approved')
+
+    def create_workloads(self, count):
+        """创建学生、导师和大创工作量各若干条"""
+        for i in range(count):
+            create_workload(self.student, name=f'硬件 {i}', mentor_reviewer=self.mentor)
+            create_workload(
+                self.mentor, name=self.project.name, source='horizontal', work_type='onsite',
+                intensity_type='daily', intensity_value=2, project=self.project,
+                teacher_reviewer=self.teacher, status='teacher_approved')
+            innovation = create_workload(
+                self.mentor, name=f'大创 {i}', source='innovation', intensity_type='weekly',
+                intensity_value=3, innovation_stage='before', status='mentor_approved')
+            WorkloadShare.objects.create(workload=innovation, user=self.mentor, percentage=60)
+            WorkloadShare.objects.create(workload=innovation, user=self.teacher, percentage=40)
+
+    def assert_list_budget(self, user, url, budget=LIST_BUDGET):
+        """在少量和大量数据下分别请求，查询次数都必须等于预算"""
+        self.client.force_authenticate(user)
+        for count in (1, 5):
+            self.create_workloads(count)
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json())
+
+    def test_list_student(self):
+        self.assert_list_budget(self.student, '/api/workload/')
+
+    def test_list_mentor(self):
+        self.assert_list_budget(self.mentor, '/api/workload/')
+
+    def test_list_teacher(self):
+        self.assert_list_budget(self.teacher, '/api/workload/')
+
+    def test_list_paginated(self):
+        self.assert_list_budget(self.teacher, '/api/workload/?page_size=4')
+
+    def test_pending_review_mentor(self):
+        self.assert_list_budget(self.mentor, '/api/workload/pending_review/')
+
+    def test_pending_review_teacher(self):
+        self.assert_list_budget(self.teacher, '/api/workload/pending_review/')
+
+    def test_reviewed_teacher(self):
+        self.assert_list_budget(self.teacher, '/api/workload/reviewed/')
+
+    def test_all_workloads(self):
+        self.assert_list_budget(self.teacher, '/api/workload/all_workloads/')
+
+    def test_detail(self):
+        self.create_workloads(1)
+        innovation = Workload.objects.get(source='innovation')
+        self.client.force_authenticate(self.teacher)
+        with self.assertNumQueries(self.DETAIL_BUDGET):
+            response = self.client.get(f'/api/workload/{innovation.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['shares']), 2)
+
+
+class KeysetPaginationTests(WorkloadAPITestCase):
+    """键集游标分页：游标往返不重复不遗漏，无效游标返回 404，每页数量受上限约束"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.workloads = [create_workload(cls.teacher, name=f'硬件 {i}') for i in range(7)]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.teacher)
+
+    def test_cursor_round_trip(self):
+        ids = []
+        url = '/api/workload/?page_size=3'
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids.extend(item['id'] for item in data['results'])
+            self.assertEqual(data['has_more'], data['next'] is not None)
+            url = data['next']
+            pages += 1
+        self.assertEqual(pages, 3)
+        # (-created_at, -id) 排序，同一时刻创建的记录按 ID 倒序
+        expected = [w.id for w in sorted(self.workloads, key=lambda w: (w.created_at, w.id), reverse=True)]
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-base64!', 'W10=', 'WyJ4IiwgMV0='):
+            response = self.client.get(f'/api/workload/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json()['detail'], KeysetPagination.invalid_cursor_message)
+
+    def test_page_size(self):
+        with mock.patch.object(KeysetPagination, 'max_page_size', 4):
+            response = self.client.get('/api/workload/?page_size=100')
+        self.assertEqual(len(response.json()['results']), 4)
+        self.assertTrue(response.json()['has_more'])
+
+        # 无效的每页数量使用默认值
+        response = self.client.get('/api/workload/?page_size=abc')
+        self.assertEqual(len(response.json()['results']), 7)
+        self.assertFalse(response.json()['has_more'])
+
+        # 不带分页参数时返回完整列表
+        self.assertEqual(len(self.client.get('/api/workload/').json()), 7)
+
+
+class WorkloadExportTests(WorkloadAPITestCase):
+    """同步导出：表头和行内容正确，查询次数与导出行数无关"""
+
+    # exists() 检查 + 主查询（含关联表连接）+ shares 预加载
+    EXPORT_BUDGET = 3
+
+    def create_workloads(self, count):
+        workloads = []
+        for i in range(count):
+            workload = create_workload(
+                self.mentor, name=f'大创 {i}', source='innovation', intensity_type='weekly',
+                intensity_value=3, innovation_stage='before', status='mentor_approved')
+            WorkloadShare.objects.create(workload=workload, user=self.mentor, percentage=60)
+            WorkloadShare.objects.create(workload=workload, user=self.teacher, percentage=40)
+            workloads.append(workload)
+        return workloads
+
+    def export(self, ids):
+        response = self.client.post('/api/workload/export/', {'workload_ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        return load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+
+    def test_headers_and_rows(self):
+        workload = self.create_workloads(1)[0]
+        self.client.force_authenticate(self.teacher)
+        rows = list(self.export([workload.id]).iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), EXPORT_HEADERS)
+        self.assertEqual(len(rows), 2)
+        row = dict(zip(EXPORT_HEADERS, rows[1]))
+        self.assertEqual(row['提交人'], 'mentor')
+        self.assertEqual(row['工作量名称'], '大创 0')
+        self.assertEqual(row['工作来源'], '大创')
+        self.assertEqual(row['开始日期'], '2025-01-01')
+        self.assertEqual(row['工作强度值'], 3)
+        self.assertEqual(row['参与人及占比'], 'mentor:60.0%; teacher:40.0%')
+
+    def test_query_budget(self):
+        self.client.force_authenticate(self.teacher)
+        for count in (1, 5):
+            ids = [w.id for w in self.create_workloads(count)]
+            with self.assertNumQueries(self.EXPORT_BUDGET):
+                sheet = self.export(ids)
+            self.assertEqual(sheet.max_row, count + 1)
+
+    def test_permissions_and_validation(self):
+        self.client.force_authenticate(self.mentor)
+        self.assertEqual(self.client.post('/api/workload/export/', {'workload_ids': [1]}, format='json').status_code, 403)
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.post('/api/workload/export/', {'workload_ids': []}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/workload/export/', {'workload_ids': [999]}, format='json').status_code, 404)
+
+
+@mock.patch('workload.export_jobs.submit_to_pool', side_effect=run_export_job)
+@mock.patch('workload.export_jobs.close_old_connections')
+class ExportJobTests(WorkloadAPITestCase):
+    """后台导出任务：提交、查询进度、下载，未完成 409，文件过期 410，超时任务标记为失败"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_teacher = create_user('teacher2', 'teacher')
+        cls.workload = create_workload(cls.mentor)
+
+    def setUp(self):
+        super().setUp()
+        export_root = tempfile.TemporaryDirectory()
+        self.addCleanup(export_root.cleanup)
+        self.settings_override = override_settings(EXPORT_ROOT=export_root.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.client.force_authenticate(self.teacher)
+
+    def create_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/workload/export_jobs/', {'workload_ids': [self.workload.id]}, format='json')
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_create_status_download(self, *mocks):
+        job = self.create_job()
+        self.assertEqual(job['status'], 'pending')
+
+        response = self.client.get(f'/api/workload/export_jobs/{job["id"]}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'finished')
+        self.assertEqual(response.json()['processed'], 1)
+
+        response = self.client.get(f'/api/workload/export_jobs/{job["id"]}/download/')
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(sheet.cell(row=2, column=2).value, '硬件')
+
+        # 相同条件且数据未变化时复用导出文件
+        self.assertEqual(self.create_job()['status'], 'finished')
+
+        # 只能访问自己的任务
+        self.client.force_authenticate(self.other_teacher)
+        self.assertEqual(self.client.get(f'/api/workload/export_jobs/{job["id"]}/').status_code, 404)
+
+    def test_permissions_and_validation(self, *mocks):
+        self.client.force_authenticate(self.mentor)
+        response = self.client.post('/api/workload/export_jobs/', {'workload_ids': [self.workload.id]}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.post('/api/workload/export_jobs/', {}, format='json').status_code, 400)
+        response = self.client.post('/api/workload/export_jobs/', {'workload_ids': [999]}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_download_not_finished_or_expired(self, *mocks):
+        job = ExportJob.objects.create(user=self.teacher, params={}, cache_key='missing', total=1)
+        response = self.client.get(f'/api/workload/export_jobs/{job.pk}/download/')
+        self.assertEqual(response.status_code, 409)
+
+        ExportJob.objects.filter(pk=job.pk).update(status='finished')
+        response = self.client.get(f'/api/workload/export_jobs/{job.pk}/download/')
+        self.assertEqual(response.status_code, 410)
+
+    def test_stale_job_fails(self, *mocks):
+        job = ExportJob.objects.create(user=self.teacher, params={}, cache_key='stale', total=1, status='running')
+        ExportJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - timedelta(hours=1))
+
+        response = self.client.get(f'/api/workload/export_jobs/{job.pk}/')
+        self.assertEqual(response.json()['status'], 'failed')
+        # 超时后才开始执行的任务不再导出
+        run_export_job(str(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+        fresh = ExportJob.objects.create(user=self.teacher, params={}, cache_key='fresh', total=1, status='running')
+        call_command('fail_stale_export_jobs', stdout=io.StringIO())
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, 'running')
+
+
+class AllWorkloadsFilterTests(WorkloadAPITestCase):
+    """教师工作量总览：服务端筛选、排序参数校验、按排序字段的游标分页和分面统计"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.project = Project.objects.create(
+            name='横向项目', project_status='in_research', start_date=date(2025, 1, 1),
+            submitter=cls.mentor, review_status='approved')
+
+        def create(name, source, status, start, submitter, project=None):
+            return create_workload(
+                submitter, name=name, source=source, status=status, project=project,
+                start_date=start, end_date=start + timedelta(days=1))
+
+        cls.hardware = create('硬件', 'hardware', 'pending', date(2025, 1, 10), cls.student)
+        cls.horizontal = create('横向', 'horizontal', 'teacher_approved', date(2025, 2, 10), cls.mentor, cls.project)
+        cls.assessment = create('考核', 'assessment', 'mentor_approved', date(2025, 3, 10), cls.mentor)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.teacher)
+
+    def ids(self, query=''):
+        response = self.client.get(f'/api/workload/all_workloads/{query}')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()]
+
+    def test_filters(self):
+        self.assertEqual(self.ids('?status=pending,mentor_approved&ordering=start_date'),
+                         [self.hardware.id, self.assessment.id])
+        self.assertEqual(self.ids('?source=horizontal'), [self.horizontal.id])
+        self.assertEqual(self.ids(f'?submitter={self.mentor.id}&ordering=start_date'),
+                         [self.horizontal.id, self.assessment.id])
+        self.assertEqual(self.ids(f'?project={self.project.id}'), [self.horizontal.id])
+        self.assertEqual(self.ids('?date_from=2025-02-01&date_to=2025-02-28'), [self.horizontal.id])
+
+        for query in ('?status=unknown', '?date_from=2025-03-01&date_to=2025-01-01', '?submitter=0'):
+            response = self.client.get(f'/api/workload/all_workloads/{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_ordering(self):
+        self.assertEqual(self.ids('?ordering=start_date'),
+                         [self.hardware.id, self.horizontal.id, self.assessment.id])
+        self.assertEqual(self.ids('?ordering=-end_date'),
+                         [self.assessment.id, self.horizontal.id, self.hardware.id])
+        # 只允许按有索引的字段排序
+        response = self.client.get('/api/workload/all_workloads/?ordering=name')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
+
+        # 游标按所选排序字段翻页
+        response = self.client.get('/api/workload/all_workloads/?ordering=start_date&page_size=2')
+        first = response.json()
+        self.assertEqual([item['id'] for item in first['results']], [self.hardware.id, self.horizontal.id])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([item['id'] for item in second['results']], [self.assessment.id])
+        self.assertFalse(second['has_more'])
+
+    def test_facets(self):
+        response = self.client.get('/api/workload/facets/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(data['status']['pending'], 1)
+        self.assertEqual(data['status']['teacher_rejected'], 0)
+        self.assertEqual(data['source']['horizontal'], 1)
+        self.assertEqual(data['source']['innovation'], 0)
+
+        data = self.client.get(f'/api/workload/facets/?submitter={self.mentor.id}').json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['status']['pending'], 0)
+
+    def test_teacher_only(self):
+        self.client.force_authenticate(self.mentor)
+        self.assertEqual(self.client.get('/api/workload/all_workloads/').status_code, 403)
+        self.assertEqual(self.client.get('/api/workload/facets/').status_code, 403)
+
+
+class WorkloadRollupTests(WorkloadAPITestCase):
+    """月度汇总表随审核、修改和删除增量维护"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_mentor = create_user('mentor2', 'mentor')
+
+    def rollup(self):
+        return {
+            (r.user_id, r.source, r.month.strftime('%Y-%m')): round(r.amount, 6)
+            for r in WorkloadRollup.objects.all()
+        }
+
+    def review(self, workload, status):
+        self.client.force_authenticate(self.teacher)
+        response = self.client.post(
+            f'/api/workload/{workload.id}/review/',
+            {'status': status, 'teacher_comment': '审核意见'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_daily_workload_split_by_month(self):
+        workload = create_workload(
+            self.mentor, start_date=date(2025, 1, 30), end_date=date(2025, 2, 2),
+            intensity_type='daily', intensity_value=2)
+        self.assertEqual(self.rollup(), {})
+
+        self.review(workload, 'teacher_approved')
+        self.assertEqual(self.rollup(), {
+            (self.mentor.id, 'hardware', '2025-01'): 4,
+            (self.mentor.id, 'hardware', '2025-02'): 4,
+        })
+
+    def test_innovation_shares_and_reject(self):
+        workload = create_workload(
+            self.mentor, name='大创', source='innovation', start_date=date(2025, 3, 1),
+            end_date=date(2025, 3, 10), intensity_value=10, innovation_stage='after')
+        WorkloadShare.objects.create(workload=workload, user=self.mentor, percentage=70)
+        WorkloadShare.objects.create(workload=workload, user=self.other_mentor, percentage=30)
+
+        self.review(workload, 'teacher_approved')
+        self.assertEqual(self.rollup(), {
+            (self.mentor.id, 'innovation', '2025-03'): 7,
+            (self.other_mentor.id, 'innovation', '2025-03'): 3,
+        })
+
+        self.client.force_authenticate(self.mentor)
+        response = self.client.get('/api/workload/summary/')
+        self.assertEqual(response.json()[0]['total'], 7)
+
+        # 教师驳回后从汇总中移除
+        self.review(workload, 'teacher_rejected')
+        self.assertEqual(self.rollup(), {})
+
+    def test_rebuild_matches_incremental(self):
+        workload = create_workload(
+            self.mentor, name='考核', source='assessment', work_type='onsite',
+            start_date=date(2025, 4, 1), end_date=date(2025, 4, 14),
+            intensity_type='weekly', intensity_value=5)
+        self.review(workload, 'teacher_approved')
+        incremental = self.rollup()
+
+        rebuild_rollup()
+        self.assertEqual(self.rollup(), incremental)
+        self.assertEqual(incremental, {(self.mentor.id, 'assessment', '2025-04'): 10})
+
+
+class ReviewCountTests(WorkloadAPITestCase):
+    """待审核计数缓存在状态变化后失效"""
+
+    def get_counts(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/workload/review_counts/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counts_follow_review(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            workload = create_workload(self.student, mentor_reviewer=self.mentor)
+        self.assertEqual(self.get_counts(self.mentor), {'workload_pending': 1})
+        self.assertEqual(self.get_counts(self.teacher), {'workload_pending': 0, 'project_pending': 0})
+
+        # 命中缓存时不查询数据库
+        self.client.force_authenticate(self.mentor)
+        with self.assertNumQueries(0):
+            self.client.get('/api/workload/review_counts/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/workload/{workload.id}/review/',
+                {'status': 'mentor_approved', 'mentor_comment': '通过'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_counts(self.mentor), {'workload_pending': 0})
+        self.assertEqual(self.get_counts(self.teacher), {'workload_pending': 1, 'project_pending': 0})
+
+    def test_student_forbidden(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get('/api/workload/review_counts/')
+        self.assertEqual(response.status_code, 403)
+
+
+class ConditionalListTests(WorkloadAPITestCase):
+    """列表接口的 ETag 条件请求"""
+
+    def test_not_modified(self):
+        create_workload(self.mentor, name='硬件')
+        self.client.force_authenticate(self.teacher)
+        response = self.client.get('/api/workload/all_workloads/')
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        # 只执行校验值聚合查询，不查询列表数据
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/workload/all_workloads/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        create_workload(self.mentor, name='硬件 2')
+        response = self.client.get('/api/workload/all_workloads/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_removed_rows_change_etag(self):
+        first = create_workload(self.mentor, name='硬件')
+        second = create_workload(self.mentor, name='硬件 2')
+        self.client.force_authenticate(self.teacher)
+        url = '/api/workload/all_workloads/?status=pending'
+        etag = self.client.get(url)['ETag']
+
+        # 删除的行不是 updated_at 最大的行
+        first.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json()], [second.id])
+        etag = response['ETag']
+
+        # 一行移出筛选范围的同时，另一行通过不更新 updated_at 的批量更新进入范围，行数和最大 updated_at 都不变
+        third = create_workload(self.mentor, name='硬件 3')
+        Workload.objects.filter(pk=third.pk).update(status='mentor_approved', updated_at=second.updated_at)
+        etag = self.client.get(url)['ETag']
+        Workload.objects.filter(pk=second.pk).update(status='mentor_approved')
+        Workload.objects.filter(pk=third.pk).update(status='pending')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # 只带 If-Modified-Since 时不会返回 304
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user_and_query(self):
+        create_workload(self.mentor, name='硬件')
+        self.client.force_authenticate(self.teacher)
+        etag = self.client.get('/api/workload/').get('ETag')
+        self.assertNotEqual(self.client.get('/api/workload/?submitted=true')['ETag'], etag)
+
+        self.client.force_authenticate(self.mentor)
+        response = self.client.get('/api/workload/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class BulkReviewTests(WorkloadAPITestCase):
+    """批量审核：一次权限查询加一条 UPDATE，逐条返回结果"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_mentor = create_user('mentor2', 'mentor')
+
+    def test_mentor_bulk_review(self):
+        own = create_workload(self.student, mentor_reviewer=self.mentor)
+        other = create_workload(self.student, mentor_reviewer=self.other_mentor)
+
+        self.client.force_authenticate(self.mentor)
+        response = self.client.post('/api/workload/bulk_review/', {
+            'ids': [own.id, other.id, 999999], 'status': 'mentor_approved', 'comment': '通过'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['updated'], data['failed']), (1, 2))
+        self.assertEqual([r['success'] for r in data['results']], [True, False, False])
+
+        own.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((own.status, own.mentor_comment), ('mentor_approved', '通过'))
+        self.assertIsNotNone(own.mentor_review_time)
+        self.assertEqual(other.status, 'pending')
+
+    def test_teacher_bulk_review_updates_rollup(self):
+        ready = create_workload(self.student, status='mentor_approved', mentor_reviewer=self.mentor)
+        not_ready = create_workload(self.student, mentor_reviewer=self.mentor)
+        direct = create_workload(self.mentor)
+
+        self.client.force_authenticate(self.teacher)
+        response = self.client.post('/api/workload/bulk_review/', {
+            'ids': [ready.id, not_ready.id, direct.id], 'status': 'teacher_approved', 'comment': '通过'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 2)
+
+        statuses = dict(Workload.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {
+            ready.id: 'teacher_approved', not_ready.id: 'pending', direct.id: 'teacher_approved'
+        })
+        self.assertEqual(
+            set(WorkloadRollup.objects.values_list('user_id', 'workload_count')),
+            {(self.student.id, 1), (self.mentor.id, 1)}
+        )
+
+    def test_invalid_status_for_role(self):
+        workload = create_workload(self.student, mentor_reviewer=self.mentor)
+        self.client.force_authenticate(self.mentor)
+        response = self.client.post('/api/workload/bulk_review/', {
+            'ids': [workload.id], 'status': 'teacher_approved', 'comment': '通过'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(self.student)
+        response = self.client.post('/api/workload/bulk_review/', {
+            'ids': [workload.id], 'status': 'mentor_approved', 'comment': '通过'
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class WorkloadImportTests(WorkloadAPITestCase):
+    """批量导入：按批解析用户和项目，校验通过的行 bulk_create 写入"""
+
+    HEADER = ['提交人', '工作量名称', '工作量内容', '工作来源', '工作类型', '开始日期', '结束日期',
+              '工作强度类型', '工作强度值', '已发助教工资', '审核导师', '项目ID']
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.project = Project.objects.create(
+            name='横向项目', project_status='in_research', start_date=date(2025, 1, 1),
+            submitter=cls.mentor, review_status='approved')
+
+    def rows(self):
+        return [
+            ['student', '助教', '批改作业', '助教', '远程', date(2025, 3, 1), date(2025, 3, 31),
+             '每周', 4, 800, 'mentor', None],
+            ['mentor', '横向项目', '开发', 'horizontal', 'onsite', '2025-03-01', '2025-03-10',
+             'daily', 2, None, None, self.project.id],
+            # 学生未指定导师
+            ['student', '硬件', '调试', '硬件小组', '远程', '2025-03-01', '2025-03-02', '总计', 1, None, None, None],
+            # 助教未填写工资、提交人不存在
+            ['nobody', '助教', '批改作业', '助教', '远程', '2025-03-01', '2025-03-02', '总计', 1, None, None, None],
+        ]
+
+    def test_import_xlsx(self):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(self.HEADER)
+        for row in self.rows():
+            ws.append(row)
+        content = io.BytesIO()
+        wb.save(content)
+
+        self.client.force_authenticate(self.teacher)
+        upload = SimpleUploadedFile('workloads.xlsx', content.getvalue())
+        # 用户、项目各一次查询，事务和 bulk_create 的查询数与行数无关
+        with self.assertNumQueries(5):
+            response = self.client.post('/api/workload/import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result['total'], result['created']), (4, 2))
+        self.assertEqual([error['row'] for error in result['errors']], [4, 5])
+        self.assertIn('学生提交工作量时必须指定导师', result['errors'][0]['errors'])
+        self.assertIn('提交人: 用户不存在', result['errors'][1]['errors'])
+
+        assistant = Workload.objects.get(source='assistant')
+        self.assertEqual(
+            (assistant.submitter, assistant.mentor_reviewer, assistant.assistant_salary_paid, assistant.project),
+            (self.student, self.mentor, 800, None)
+        )
+        self.assertEqual(Workload.objects.get(source='horizontal').project, self.project)
+
+    def test_command_csv_dry_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'workloads.csv')
+            report = os.path.join(tmp, 'report.csv')
+            with open(path, 'w', encoding='utf-8-sig') as f:
+                f.write(','.join(self.HEADER) + '\n')
+                for row in self.rows():
+                    f.write(','.join('' if value is None else str(value) for value in row) + '\n')
+
+            call_command('import_workloads', path, '--dry-run', '--report', report, stdout=io.StringIO())
+            with open(report, encoding='utf-8-sig') as f:
+                lines = f.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertFalse(Workload.objects.exists())
+
+    def test_import_csv(self):
+        lines = [','.join(self.HEADER)]
+        for row in self.rows():
+            lines.append(','.join('' if value is None else str(value) for value in row))
+        content = ('\n'.join(lines) + '\n').encode('utf-8-sig')
+
+        self.client.force_authenticate(self.teacher)
+        upload = SimpleUploadedFile('workloads.csv', content)
+        response = self.client.post('/api/workload/import/', {'file': upload, 'dry_run': 'true'})
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result['total'], result['valid'], result['created']), (4, 2, 0))
+        self.assertEqual([error['row'] for error in result['errors']], [4, 5])
+        self.assertFalse(Workload.objects.exists())
+
+        upload = SimpleUploadedFile('workloads.csv', content)
+        response = self.client.post('/api/workload/import/', {'file': upload})
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(Workload.objects.count(), 2)
+
+    def test_invalid_file(self):
+        self.client.force_authenticate(self.teacher)
+        cases = [
+            ('a.xlsx', b'not a zip', '无法读取 .xlsx 文件'),
+            ('a.csv', '提交人'.encode('gbk'), 'UTF-8'),
+            ('a.txt', b'', '只支持'),
+            ('a.csv', b'', '导入文件为空'),
+            ('a.csv', b'name\n', '导入文件缺少列'),
+        ]
+        for filename, content, message in cases:
+            with self.subTest(filename=filename, message=message):
+                cache.clear()
+                upload = SimpleUploadedFile(filename, content)
+                response = self.client.post('/api/workload/import/', {'file': upload})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, response.json()['detail'])
+
+        # 合法的 zip 包但不是工作簿
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, 'w') as archive:
+            archive.writestr('readme.txt', 'hello')
+        cache.clear()
+        upload = SimpleUploadedFile('a.xlsx', content.getvalue())
+        response = self.client.post('/api/workload/import/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Workload.objects.exists())
+
+    def test_student_forbidden(self):
+        self.client.force_authenticate(self.student)
+        upload = SimpleUploadedFile('workloads.csv', b'')
+        response = self.client.post('/api/workload/import/', {'file': upload})
+        self.assertEqual(response.status_code, 403)
+
+
+class WorkloadShareSyncTests(WorkloadAPITestCase):
+    """占比按差异写入，非大创工作量的保存不访问占比表"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = create_user('mentor2', 'mentor')
+        cls.third = create_user('mentor3', 'mentor')
+
+    def payload(self, **kwargs):
+        data = {
+            'name': '大创', 'content': '内容', 'source': 'innovation', 'work_type': 'remote',
+            'start_date': '2025-01-01', 'end_date': '2025-01-02',
+            'intensity_type': 'total', 'intensity_value': 1, 'innovation_stage': 'before',
+        }
+        data.update(kwargs)
+        return data
+
+    def test_update_shares_by_diff(self):
+        self.client.force_authenticate(self.mentor)
+        response = self.client.post('/api/workload/', self.payload(shares=[
+            {'user': self.mentor.id, 'percentage': 50},
+            {'user': self.other.id, 'percentage': 50},
+        ]), format='json')
+        self.assertEqual(response.status_code, 201)
+        workload_id = response.json()['id']
+        kept = WorkloadShare.objects.get(workload_id=workload_id, user=self.mentor)
+
+        response = self.client.put(f'/api/workload/{workload_id}/', self.payload(shares=[
+            {'user': self.mentor.id, 'percentage': 60},
+            {'user': self.third.id, 'percentage': 40},
+        ]), format='json')
+        self.assertEqual(response.status_code, 200)
+        shares = {
+            share.user_id: (share.pk, share.percentage)
+            for share in WorkloadShare.objects.filter(workload_id=workload_id)
+        }
+        self.assertEqual(set(shares), {self.mentor.id, self.third.id})
+        # 已有记录原地更新，不是删除后重建
+        self.assertEqual(shares[self.mentor.id], (kept.pk, 60))
+
+    def test_non_innovation_update_skips_shares(self):
+        workload = create_workload(self.mentor)
+
+        self.client.force_authenticate(self.mentor)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f'/api/workload/{workload.id}/', {'content': '新内容'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if 'workload_workloadshare' in q['sql']
+                          and not q['sql'].startswith('SELECT')])
+
+
+class WorkloadSaveQueryTests(WorkloadAPITestCase):
+    """保存工作量和项目：新建一次 INSERT，修改一次 UPDATE"""
+
+    def test_create_with_attachment_single_insert(self):
+        workload = Workload(
+            name='硬件', content='内容', source='hardware', work_type='remote',
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 2),
+            intensity_type='total', intensity_value=1, submitter=self.mentor,
+            attachments=SimpleUploadedFile('证明.pdf', b'%PDF-1.4'))
+        with CaptureQueriesContext(connection) as queries:
+            workload.save()
+        self.addCleanup(workload.attachments.delete, save=False)
+
+        # 工作量表只有一次 INSERT，其余为附件引用数的维护
+        workload_queries = [q['sql'] for q in queries.captured_queries if '"workload_workload"' in q['sql']]
+        self.assertEqual(len(workload_queries), 1)
+        self.assertTrue(workload_queries[0].startswith('INSERT'))
+        self.assertEqual(workload.original_filename, '证明.pdf')
+        self.assertTrue(os.path.isfile(workload.attachments.path))
+
+    def test_update_single_query(self):
+        create_workload(self.mentor)
+        workload = Workload.objects.get()
+        workload.content = '新内容'
+        with self.assertNumQueries(1):
+            workload.save()
+
+        project = Project.objects.create(
+            name='横向项目', project_status='in_research', start_date=date(2025, 1, 1),
+            submitter=self.mentor)
+        project.name = '横向项目 2'
+        with self.assertNumQueries(1):
+            project.save()
+
+    def test_serializer_update_single_save(self):
+        workload = create_workload(self.mentor)
+
+        self.client.force_authenticate(self.mentor)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f'/api/workload/{workload.id}/', {'content': '新内容'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "workload_workload"')]
+        self.assertEqual(len(updates), 1)
+
+
+class ChunkedUploadTests(WorkloadAPITestCase):
+    """分片上传：按偏移量追加写入，完成后通过 upload_id 引用为附件"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = create_user('mentor2', 'mentor')
+
+    def put_chunk(self, upload_id, offset, data):
+        return self.client.put(
+            f'/api/workload/uploads/{upload_id}/chunk/?offset={offset}',
+            data, content_type='application/octet-stream')
+
+    def test_resumable_upload_attached_by_reference(self):
+        content = b'0123456789' * 100
+        self.client.force_authenticate(self.mentor)
+        response = self.client.post('/api/workload/uploads/', {'filename': '扫描件.pdf', 'size': len(content)})
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()['id']
+
+        self.assertEqual(self.put_chunk(upload_id, 0, content[:400]).json()['offset'], 400)
+        # 偏移量不正确时返回当前偏移量
+        response = self.put_chunk(upload_id, 0, content[:400])
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 400))
+        response = self.put_chunk(upload_id, 400, content[400:])
+        self.assertEqual(response.json()['status'], 'completed')
+
+        # 其他用户不能引用
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(f'/api/workload/uploads/{upload_id}/').status_code, 404)
+
+        self.client.force_authenticate(self.mentor)
+        response = self.client.post('/api/workload/', {
+            'name': '硬件', 'content': '内容', 'source': 'hardware', 'work_type': 'remote',
+            'start_date': '2025-01-01', 'end_date': '2025-01-02',
+            'intensity_type': 'total', 'intensity_value': 1, 'upload_id': upload_id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        workload = Workload.objects.get()
+        self.addCleanup(workload.attachments.delete, save=False)
+        self.assertEqual(response.json()['original_filename'], '扫描件.pdf')
+        with workload.attachments.open('rb') as f:
+            self.assertEqual(f.read(), content)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_reject_oversized_and_unfinished(self):
+        self.client.force_authenticate(self.mentor)
+        response = self.client.post('/api/workload/uploads/', {'filename': 'a.pdf', 'size': 11 * 1024 * 1024})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/workload/uploads/', {'filename': 'a.pdf', 'size': 10})
+        upload_id = response.json()['id']
+        self.assertEqual(self.put_chunk(upload_id, 0, b'0' * 11).status_code, 400)
+        response = self.client.post('/api/workload/', {
+            'name': '硬件', 'content': '内容', 'source': 'hardware', 'work_type': 'remote',
+            'start_date': '2025-01-01', 'end_date': '2025-01-02',
+            'intensity_type': 'total', 'intensity_value': 1, 'upload_id': upload_id,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.client.delete(f'/api/workload/uploads/{upload_id}/').status_code, 204)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_stale_session_rechecked_under_lock(self):
+        """并发请求读到的会话已过期时，加锁后按数据库中的偏移量拒绝，不截断已写入的数据"""
+        self.client.force_authenticate(self.mentor)
+        response = self.client.post('/api/workload/uploads/', {'filename': 'a.pdf', 'size': 10})
+        upload_id = response.json()['id']
+        stale = UploadSession.objects.get(pk=upload_id)
+        self.addCleanup(delete_upload_session, stale)
+        self.assertEqual(self.put_chunk(upload_id, 0, b'01234').json()['offset'], 5)
+
+        with self.assertRaises(UploadOffsetMismatch) as cm:
+            append_chunk(stale, 0, io.BytesIO(b'abcde'), 5)
+        self.assertEqual(cm.exception.offset, 5)
+        with open(default_storage.path(stale.path), 'rb') as f:
+            self.assertEqual(f.read(), b'01234')
+
+    def test_chunk_written_without_transaction(self):
+        """读取请求体期间不开启事务；同一会话的分片正在写入时，并发的分片立即返回 409"""
+        self.client.force_authenticate(self.mentor)
+        upload_id = self.client.post('/api/workload/uploads/', {'filename': 'a.pdf', 'size': 10}).json()['id']
+        session = UploadSession.objects.get(pk=upload_id)
+        self.addCleanup(delete_upload_session, session)
+        depth = len(connection.atomic_blocks)
+        attempts = []
+
+        class Stream(io.BytesIO):
+            def read(stream, size=-1):
+                if not attempts:
+                    self.assertEqual(len(connection.atomic_blocks), depth)
+                    # 写入第一个分片的过程中收到同一偏移量的分片
+                    with self.assertRaises(UploadOffsetMismatch) as cm:
+                        append_chunk(UploadSession.objects.get(pk=upload_id), 0, io.BytesIO(b'abcde'), 5)
+                    attempts.append(cm.exception.offset)
+                return super().read(size)
+
+        session = append_chunk(session, 0, Stream(b'01234'), 5)
+        self.assertEqual((attempts, session.offset), ([0], 5))
+        session = append_chunk(session, 5, io.BytesIO(b'56789'), 5)
+        self.assertEqual(session.status, 'completed')
+        with attachment_storage.open(session.path, 'rb') as f:
+            self.assertEqual(f.read(), b'0123456789')
+
+
+class AttachmentStorageTests(WorkloadAPITestCase):
+    """相同内容的附件只保存一份，引用数归零后删除文件"""
+
+    def create_workload(self, filename, content):
+        return create_workload(self.mentor, attachments=SimpleUploadedFile(filename, content))
+
+    def test_deduplicated_and_reference_counted(self):
+        first = self.create_workload('证明.pdf', b'%PDF-1.4 same')
+        second = self.create_workload('另一个名字.pdf', b'%PDF-1.4 same')
+        path = first.attachments.path
+
+        self.assertEqual(first.attachments.name, second.attachments.name)
+        self.assertEqual((first.original_filename, second.original_filename), ('证明.pdf', '另一个名字.pdf'))
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.isfile(path))
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 1)
+
+        # 替换附件后释放旧文件
+        with self.captureOnCommitCallbacks(execute=True):
+            second.attachments = SimpleUploadedFile('新文件.pdf', b'%PDF-1.4 new')
+            second.save()
+        self.addCleanup(second.attachments.delete, save=False)
+        self.assertFalse(os.path.isfile(path))
+        self.assertEqual(list(AttachmentBlob.objects.values_list('name', 'ref_count')),
+                         [(second.attachments.name, 1)])
+        self.assertEqual(second.original_filename, '新文件.pdf')
+
+    def test_concurrent_release_during_reuse(self):
+        """相同内容再次上传时，并发的删除回调恰好在增加引用之前执行：文件被重新写入，不会丢失"""
+        first = self.create_workload('证明.pdf', b'%PDF-1.4 same')
+        path = first.attachments.path
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 0)
+
+        acquire = AttachmentBlob.acquire.__func__
+
+        def acquire_after_delete(cls, name, size=0):
+            for callback in callbacks:
+                callback()
+            self.assertFalse(os.path.isfile(path))
+            return acquire(cls, name, size)
+
+        with mock.patch.object(AttachmentBlob, 'acquire', classmethod(acquire_after_delete)):
+            second = self.create_workload('证明.pdf', b'%PDF-1.4 same')
+        self.addCleanup(second.attachments.delete, save=False)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 same')
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 1)
+
+    def test_completed_upload_holds_reference(self):
+        """已完成的上传会话持有文件引用，删除相同内容的工作量不会删除会话的文件"""
+        content = b'%PDF-1.4 chunked'
+        self.client.force_authenticate(self.mentor)
+        upload_id = self.client.post('/api/workload/uploads/', {'filename': '扫描件.pdf', 'size': len(content)}).json()['id']
+        self.client.put(f'/api/workload/uploads/{upload_id}/chunk/?offset=0', content,
+                        content_type='application/octet-stream')
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual(session.status, 'completed')
+        self.assertEqual(AttachmentBlob.objects.get(name=session.path).ref_count, 1)
+
+        other = self.create_workload('副本.pdf', content)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertTrue(attachment_storage.exists(session.path))
+
+        # 引用到工作量后会话的引用转给工作量
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/workload/', {
+                'name': '硬件', 'content': '内容', 'source': 'hardware', 'work_type': 'remote',
+                'start_date': '2025-01-01', 'end_date': '2025-01-02',
+                'intensity_type': 'total', 'intensity_value': 1, 'upload_id': upload_id,
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        workload = Workload.objects.get(pk=response.json()['id'])
+        self.addCleanup(workload.attachments.delete, save=False)
+        self.assertEqual(AttachmentBlob.objects.get(name=session.path).ref_count, 1)
+        self.assertFalse(UploadSession.objects.exists())
+
+        # 取消已完成的上传释放引用，没有其他引用时删除文件
+        upload_id = self.client.post('/api/workload/uploads/', {'filename': 'b.pdf', 'size': 3}).json()['id']
+        self.client.put(f'/api/workload/uploads/{upload_id}/chunk/?offset=0', b'abc',
+                        content_type='application/octet-stream')
+        name = UploadSession.objects.get(pk=upload_id).path
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f'/api/workload/uploads/{upload_id}/').status_code, 204)
+        self.assertFalse(attachment_storage.exists(name))
+        self.assertFalse(AttachmentBlob.objects.filter(name=name).exists())
+
+
+class AttachmentDownloadTests(WorkloadAPITestCase):
+    """附件下载：按工作量可见范围检查权限，支持 Range 和 X-Accel-Redirect"""
+
+    CONTENT = b'%PDF-1.4 ' + bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = create_user('student2', 'student')
+
+    def setUp(self):
+        super().setUp()
+        self.workload = create_workload(
+            self.student, mentor_reviewer=self.mentor, attachments=SimpleUploadedFile('证明.pdf', self.CONTENT))
+        self.addCleanup(self.workload.attachments.delete, save=False)
+        self.url = f'/api/workload/{self.workload.id}/attachment/'
+
+    def test_visibility(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.client.force_authenticate(self.mentor)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('inline', response['Content-Disposition'])
+
+        self.client.logout()
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
+
+    def test_detail_hides_storage_path(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(f'/api/workload/{self.workload.id}/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertNotIn('attachments', data)
+        self.assertTrue(data['attachments_url'].endswith(self.url))
+        self.assertEqual(data['original_filename'], '证明.pdf')
+
+    def test_range(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=9-18')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 9-18/{len(self.CONTENT)}')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[9:19])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_accel_redirect(self):
+        self.client.force_authenticate(self.student)
+        with self.settings(MEDIA_ACCEL_REDIRECT='nginx'):
+            response = self.client.get(self.url + '?download=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.workload.attachments.name)
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(response.content, b'')
+
+    def test_unsafe_types_forced_to_download(self):
+        """HTML、SVG 等类型不能在站点域名下直接打开，前置代理传输时同样处理"""
+        self.client.force_authenticate(self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+        for filename in ('页面.html', 'logo.svg', 'data.bin'):
+            self.workload.attachments = SimpleUploadedFile(filename, b'<script>alert(1)</script>')
+            self.workload.original_filename = filename
+            self.workload.save()
+            self.addCleanup(self.workload.attachments.storage.delete, self.workload.attachments.name)
+            for accel in ('', 'nginx', 'apache'):
+                with self.subTest(filename=filename, accel=accel), self.settings(MEDIA_ACCEL_REDIRECT=accel):
+                    response = self.client.get(self.url)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response['Content-Type'], 'application/octet-stream')
+                    self.assertIn('attachment', response['Content-Disposition'])
+                    self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+
+class ThumbnailTests(WorkloadAPITestCase):
+    """图片附件缩略图：上传后生成，按需补齐，附件文件删除时一并删除"""
+
+    def create_workload(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_workload(self.student, mentor_reviewer=self.mentor, attachments=upload)
+
+    def image_upload(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (2000, 1000), (200, 30, 30)).save(buffer, 'JPEG')
+        return SimpleUploadedFile('照片.jpg', buffer.getvalue())
+
+    def test_generate_serve_and_delete(self):
+        workload = self.create_workload(self.image_upload())
+        names = [thumbnail_name(workload.attachments.name, size) for size in THUMBNAIL_SIZES]
+        for name in names:
+            self.assertTrue(os.path.exists(attachment_storage.path(name)))
+
+        self.client.force_authenticate(self.student)
+        response = self.client.get(f'/api/workload/{workload.id}/')
+        self.assertTrue(response.json()['thumbnail_url'].endswith(f'/api/workload/{workload.id}/thumbnail/'))
+
+        response = self.client.get(f'/api/workload/{workload.id}/thumbnail/?size=small')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (160, 80))
+        self.assertEqual(self.client.get(f'/api/workload/{workload.id}/thumbnail/?size=huge').status_code, 400)
+
+        # 缺失的缩略图在请求时重新生成
+        medium = attachment_storage.path(thumbnail_name(workload.attachments.name, 'medium'))
+        os.remove(medium)
+        self.assertEqual(self.client.get(f'/api/workload/{workload.id}/thumbnail/').status_code, 200)
+        self.assertTrue(os.path.exists(medium))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            workload.delete()
+        for name in names:
+            self.assertFalse(os.path.exists(attachment_storage.path(name)))
+
+    def test_non_image(self):
+        workload = self.create_workload(SimpleUploadedFile('证明.pdf', b'%PDF-1.4'))
+        self.addCleanup(workload.attachments.delete, save=False)
+        self.client.force_authenticate(self.student)
+        self.assertIsNone(self.client.get(f'/api/workload/{workload.id}/').json()['thumbnail_url'])
+        self.assertEqual(self.client.get(f'/api/workload/{workload.id}/thumbnail/').status_code, 404)
+
+
+@override_settings(WORKLOAD_IMAGE_MAX_DIMENSION=400, WORKLOAD_ATTACHMENT_MAX_SIZE=1024 * 1024)
+class ImageOptimizeTests(WorkloadAPITestCase):
+    """图片附件保存前缩小、重新压缩并去掉 EXIF，大小限制按处理后的文件检查"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.mentor)
+
+    def post(self, upload):
+        return self.client.post('/api/workload/', {
+            'name': '硬件', 'content': '内容', 'source': 'hardware', 'work_type': 'remote',
+            'start_date': '2025-01-01', 'end_date': '2025-01-02',
+            'intensity_type': 'total', 'intensity_value': 1, 'attachments': upload,
+        }, format='multipart')
+
+    def test_photo_resized_and_exif_removed(self):
+        # 随机像素难以压缩，原图超过大小限制
+        image = Image.frombytes('RGB', (1600, 800), os.urandom(1600 * 800 * 3))
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=95, exif=exif)
+        self.assertGreater(buffer.tell(), 1024 * 1024)
+
+        # 扩展名与实际类型不一致时按文件内容处理
+        response = self.post(SimpleUploadedFile('照片.png', buffer.getvalue()))
+        self.assertEqual(response.status_code, 201)
+        workload = Workload.objects.get()
+        self.addCleanup(workload.attachments.delete, save=False)
+        self.assertEqual(workload.original_filename, '照片.png')
+        with Image.open(workload.attachments.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.size, (400, 200))
+            self.assertFalse(stored.getexif())
+
+    def test_other_files_unchanged(self):
+        content = b'%PDF-1.4 ' + os.urandom(64)
+        response = self.post(SimpleUploadedFile('证明.pdf', content))
+        self.assertEqual(response.status_code, 201)
+        workload = Workload.objects.get()
+        self.addCleanup(workload.attachments.delete, save=False)
+        with workload.attachments.open('rb') as f:
+            self.assertEqual(f.read(), content)
+
+        response = self.post(SimpleUploadedFile('大文件.pdf', b'%PDF-1.4 ' + b'0' * 1024 * 1024))
+        self.assertEqual(response.status_code, 400)
+
+    def test_animated_images_unchanged(self):
+        """动态 WebP / APNG 重新编码会丢掉后续帧，按原文件保存"""
+        frames = [Image.new('RGB', (1600, 800), color) for color in ((200, 30, 30), (30, 200, 30))]
+        for fmt, filename in (('WEBP', '动图.webp'), ('PNG', '动图.png')):
+            with self.subTest(fmt=fmt):
+                buffer = io.BytesIO()
+                frames[0].save(buffer, fmt, save_all=True, append_images=frames[1:], duration=100, loop=0)
+                response = self.post(SimpleUploadedFile(filename, buffer.getvalue()))
+                self.assertEqual(response.status_code, 201)
+                workload = Workload.objects.get(pk=response.json()['id'])
+                self.addCleanup(workload.attachments.delete, save=False)
+                with workload.attachments.open('rb') as f:
+                    self.assertEqual(f.read(), buffer.getvalue())
+
+
+class SearchTests(WorkloadAPITestCase):
+    """全文搜索：n-gram 倒排索引，按角色可见范围筛选，按相关度排序并分页"""
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.in_name = create_workload(self.student, name='机器学习平台搭建', content='部署训练环境')
+            self.in_content = create_workload(self.student, name='服务器维护', content='为机器学习课程准备 GPU')
+            self.other = create_workload(self.mentor, name='机器学习讲座', content='讲座')
+            self.unrelated = create_workload(self.student, name='硬件采购', content='采购显示器')
+            self.project = Project.objects.create(
+                name='机器学习横向课题', project_status='in_research', start_date=date(2025, 1, 1),
+                submitter=self.teacher)
+
+    def search_ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('机器学习 GPU'), ['机器', '器学', '学习', 'gp', 'pu'])
+        self.assertEqual(tokenize('课'), ['课'])
+
+    def test_ranked_and_visible(self):
+        self.client.force_authenticate(self.student)
+        # 名称中的命中权重更高，只返回学生自己的工作量
+        self.assertEqual(self.search_ids('/api/workload/search/?q=机器学习'),
+                         [self.in_name.id, self.in_content.id])
+
+        self.client.force_authenticate(self.teacher)
+        response = self.client.get('/api/workload/search/?q=机器学习&page_size=2')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        self.assertGreater(response.data['results'][0]['score'], 0)
+
+        self.assertEqual(self.search_ids('/api/project/search/?q=机器学习'), [self.project.id])
+        self.assertEqual(self.client.get('/api/workload/search/?q=').status_code, 400)
+
+    def test_index_follows_changes(self):
+        deleted_id = self.in_name.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.unrelated.content = '采购机器学习服务器'
+            self.unrelated.save()
+            self.in_name.delete()
+
+        self.client.force_authenticate(self.student)
+        # 相关度相同时新记录在前
+        self.assertEqual(self.search_ids('/api/workload/search/?q=机器学习'),
+                         [self.unrelated.id, self.in_content.id])
+        self.assertFalse(SearchToken.objects.filter(kind='workload.workload', object_id=deleted_id).exists())
+
+
+class ThrottleView:
+    throttle_costs = {'export': 4, 'thumbnail': 0}
+
+    def __init__(self, action):
+        self.action = action
+
+
+def redis_available():
+    try:
+        return redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.2).ping()
+    except redis.RedisError:
+        return False
+
+
+# 测试使用的 django-redis 配置，只用于生成键名和连接真实的 Redis
+REDIS_TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': settings.REDIS_URL,
+        'KEY_PREFIX': 'throttle-test',
+    }
+}
+
+
+class FakeSlidingWindowScript:
+    """按 SLIDING_WINDOW_SCRIPT 的语义模拟脚本，返回值类型与 redis-py 相同（字符串为 bytes）"""
+
+    def __init__(self):
+        self.store = {}
+        self.calls = []
+
+    def __call__(self, keys, args):
+        self.calls.append((keys, args))
+        limit, cost, previous_weight, _ = args
+        current, previous = self.store.get(keys[0], 0), self.store.get(keys[1], 0)
+        used = previous * previous_weight + current
+        if used + cost > limit:
+            return [0, str(used).encode(), previous]
+        self.store[keys[0]] = current + cost
+        return [1, str(used + cost).encode(), previous]
+
+
+class CostThrottleTests(WorkloadAPITestCase):
+    """按代价扣减的滑动窗口限流：高代价动作消耗更多额度，高代价请求另有独立额度"""
+
+    def setUp(self):
+        super().setUp()
+        self.now = 600.0
+        request = APIRequestFactory().get('/')
+        request.user = self.teacher
+        self.request = Request(request)
+        self.request.user = self.teacher
+
+    def make_throttle(self, throttle_class, rate):
+        throttle = type('TestThrottle', (throttle_class,), {'rate': rate})()
+        throttle.timer = lambda: self.now
+        return throttle
+
+    def test_cost_and_sliding_window(self):
+        throttle = self.make_throttle(CostUserRateThrottle, '10/minute')
+        export = ThrottleView('export')
+        self.assertTrue(throttle.allow_request(self.request, export))
+        self.assertTrue(throttle.allow_request(self.request, export))
+        self.assertFalse(throttle.allow_request(self.request, export))
+        self.assertGreater(throttle.wait(), 0)
+        # 剩余 2 个额度仍可用于普通请求
+        self.assertTrue(throttle.allow_request(self.request, ThrottleView('list')))
+
+        # 下一窗口过半时上一窗口的 9 个计数折算为 4.5
+        self.now += 90
+        self.assertTrue(throttle.allow_request(self.request, export))
+        self.assertFalse(throttle.allow_request(self.request, export))
+
+    def test_zero_cost_not_counted(self):
+        throttle = self.make_throttle(CostUserRateThrottle, '2/minute')
+        self.assertTrue(throttle.allow_request(self.request, ThrottleView('list')))
+        self.assertTrue(throttle.allow_request(self.request, ThrottleView('list')))
+        self.assertFalse(throttle.allow_request(self.request, ThrottleView('list')))
+        for _ in range(5):
+            self.assertTrue(throttle.allow_request(self.request, ThrottleView('thumbnail')))
+
+    def test_downloads_not_throttled(self):
+        """附件和缩略图不扣减任何范围的额度"""
+        workload = create_workload(self.teacher, attachments=SimpleUploadedFile('证明.pdf', b'%PDF-1.4'))
+        self.addCleanup(workload.attachments.delete, save=False)
+        self.client.force_authenticate(self.teacher)
+
+        def throttled_requests():
+            return sum(
+                REGISTRY.get_sample_value('api_throttle_requests_total', {
+                    'scope': scope, 'view': 'WorkloadViewSet', 'result': result}) or 0
+                for scope in ('user', 'heavy') for result in ('allowed', 'throttled')
+            )
+
+        before = throttled_requests()
+        self.assertEqual(self.client.get(f'/api/workload/{workload.id}/attachment/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/workload/{workload.id}/thumbnail/').status_code, 404)
+        self.assertEqual(throttled_requests(), before)
+        self.client.get('/api/workload/facets/')
+        self.assertEqual(throttled_requests(), before + 2)
+
+    def test_heavy_scope_ignores_reads(self):
+        throttle = self.make_throttle(HeavyRateThrottle, '4/minute')
+        for _ in range(10):
+            self.assertTrue(throttle.allow_request(self.request, ThrottleView('list')))
+        self.assertTrue(throttle.allow_request(self.request, ThrottleView('export')))
+        self.assertFalse(throttle.allow_request(self.request, ThrottleView('export')))
+
+    @override_settings(CACHES=REDIS_TEST_CACHES)
+    @mock.patch.object(CostRateThrottle, 'redis_script', None)
+    def test_redis_script_path(self):
+        """django-redis 缓存通过 Lua 脚本计数：键名带缓存前缀，脚本结果按类型转换"""
+        script = FakeSlidingWindowScript()
+        redis_connection = mock.Mock()
+        redis_connection.register_script.return_value = script
+        throttle = self.make_throttle(CostUserRateThrottle, '10/minute')
+        export = ThrottleView('export')
+        with mock.patch('django_redis.get_redis_connection', return_value=redis_connection):
+            self.assertTrue(throttle.allow_request(self.request, export))
+            self.assertTrue(throttle.allow_request(self.request, export))
+            self.assertFalse(throttle.allow_request(self.request, export))
+            self.now += 90
+            self.assertTrue(throttle.allow_request(self.request, export))
+        # 脚本只注册一次
+        redis_connection.register_script.assert_called_once_with(SLIDING_WINDOW_SCRIPT)
+
+        keys, args = script.calls[0]
+        self.assertEqual(keys, [
+            f'throttle-test:1:throttle_user_{self.teacher.pk}:10',
+            f'throttle-test:1:throttle_user_{self.teacher.pk}:9',
+        ])
+        self.assertEqual(args, [10, 4, 1.0, 120])
+        self.assertEqual(script.calls[-1][1][2], 0.5)
+        self.assertGreater(throttle.wait(), 0)
+
+    @override_settings(CACHES=REDIS_TEST_CACHES)
+    @mock.patch.object(CostRateThrottle, 'redis_script', None)
+    def test_redis_unavailable_allows(self):
+        throttle = self.make_throttle(CostUserRateThrottle, '1/minute')
+        with mock.patch('django_redis.get_redis_connection', side_effect=redis.ConnectionError('down')):
+            for _ in range(3):
+                self.assertTrue(throttle.allow_request(self.request, ThrottleView('export')))
+
+    @skipUnless(redis_available(), 'Redis 不可用')
+    @override_settings(CACHES=REDIS_TEST_CACHES)
+    @mock.patch.object(CostRateThrottle, 'redis_script', None)
+    def test_lua_script_on_redis(self):
+        """在真实的 Redis 上执行 Lua 脚本"""
+        throttle = self.make_throttle(CostUserRateThrottle, '10/minute')
+        self.addCleanup(cache.delete_pattern, 'throttle_*')
+        cache.delete_pattern('throttle_*')
+        export = ThrottleView('export')
+        self.assertTrue(throttle.allow_request(self.request, export))
+        self.assertTrue(throttle.allow_request(self.request, export))
+        self.assertFalse(throttle.allow_request(self.request, export))
+        self.assertTrue(throttle.allow_request(self.request, ThrottleView('list')))
+
+        # 下一窗口过半时上一窗口的 9 个计数折算为 4.5
+        self.now += 90
+        self.assertTrue(throttle.allow_request(self.request, export))
+        self.assertFalse(throttle.allow_request(self.request, export))
+
+    def test_metrics(self):
+        labels = {'scope': 'user', 'view': 'WorkloadViewSet', 'result': 'allowed'}
+        before = REGISTRY.get_sample_value('api_throttle_requests_total', labels) or 0
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.get('/api/workload/summary/').status_code, 200)
+        self.assertEqual(REGISTRY.get_sample_value('api_throttle_requests_total', labels), before + 1)
+        self.assertIn(b'api_throttle_cost_total', self.client.get('/metrics').content)
+
+
+class ReadEndpointTests(WorkloadAPITestCase):
+    """工作量详情、待审核数量和汇总统计：认证、可见范围和错误响应"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = create_user('other', 'student')
+        cls.workload = create_workload(cls.student, mentor_reviewer=cls.mentor)
+
+    def test_detail(self):
+        url = f'/api/workload/{self.workload.id}/'
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_authenticate(self.student)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], '硬件')
+        self.assertEqual(response.json()['submitter']['username'], 'student')
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_review_counts(self):
+        url = '/api/workload/review_counts/'
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_authenticate(self.mentor)
+        self.assertEqual(self.client.get(url).json(), {'workload_pending': 1})
+        # 计数已缓存，不再执行 COUNT 查询
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).json(), {'workload_pending': 1})
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT' in q['sql']])
+
+        # 审核后在事务提交时清除计数
+        with self.captureOnCommitCallbacks(execute=True):
+            self.workload.status = 'mentor_approved'
+            self.workload.save()
+        self.assertEqual(self.client.get(url).json(), {'workload_pending': 0})
+
+        Project.objects.create(
+            name='横向项目', project_status='in_research', start_date=date(2025, 1, 1),
+            submitter=self.mentor, review_status='pending')
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.get(url).json(), {'workload_pending': 1, 'project_pending': 1})
+
+    def test_summary_validation(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get('/api/workload/summary/?month_from=2025')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('month_from', response.json())
+        self.assertEqual(self.client.get('/api/workload/summary/').json(), [])
@@ -0,0 +1,135 @@
+"""
+图片附件缩略图
+
+图片附件上传后在事务提交时生成固定尺寸的缩略图，之后按需生成缺失的尺寸（例如更早上传的附件）。
+缩略图保存在 workload_thumbnails/ 下，路径由附件路径决定：
+按内容存储的附件以哈希命名，相同内容的图片共用一组缩略图。
+附件文件被删除时一并删除它的缩略图。
+
+格式由 WORKLOAD_THUMBNAIL_FORMAT 决定，默认 WebP，Pillow 不支持 WebP 时使用 JPEG。
+"""
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+from .storage import attachment_storage
+
+logger = logging.getLogger(__name__)
+
+# 尺寸名称 -> 长边最大像素
+THUMBNAIL_SIZES = {
+    'small': 160,
+    'medium': 480,
+    'large': 1024,
+}
+DEFAULT_THUMBNAIL_SIZE = 'medium'
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+THUMBNAIL_PREFIX = 'workload_thumbnails'
+ATTACHMENT_PREFIX = 'workload_files/'
+
+
+def is_image(filename):
+    return bool(filename) and filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def thumbnail_format():
+    """返回 (Pillow 格式名, 扩展名)"""
+    if settings.WORKLOAD_THUMBNAIL_FORMAT == 'webp' and features.check('webp'):
+        return 'WEBP', '.webp'
+    return 'JPEG', '.jpg'
+
+
+def thumbnail_name(name, size):
+    """附件路径对应的缩略图路径"""
+    stem = os.path.splitext(name)[0]
+    if stem.startswith(ATTACHMENT_PREFIX):
+        stem = stem[len(ATTACHMENT_PREFIX):]
+    return f'{THUMBNAIL_PREFIX}/{stem}_{size}{thumbnail_format()[1]}'
+
+
+def open_image(path, max_size):
+    """打开图片并按 EXIF 方向旋转，JPEG 在解码时直接缩小，不需要解码完整分辨率"""
+    with Image.open(path) as original:
+        original.draft('RGB', (max_size, max_size))
+        # exif_transpose 返回新的图片对象，文件可以随即关闭
+        image = ImageOps.exif_transpose(original)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    return image
+
+
+def save_thumbnail(image, name):
+    """先写临时文件再改名，并发生成同一缩略图时不会读到不完整的文件"""
+    fmt = thumbnail_format()[0]
+    if fmt == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    full_path = attachment_storage.path(name)
+    directory = os.path.dirname(full_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # 缩略图不保留 EXIF 等元数据
+            image.save(f, fmt, quality=settings.WORKLOAD_THUMBNAIL_QUALITY)
+        os.replace(tmp_path, full_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def generate_thumbnails(name, sizes=None):
+    """
+    为附件生成缩略图，已存在的尺寸跳过
+
+    只解码一次原图，从大到小依次缩小。返回 {尺寸名称: 缩略图路径}，
+    原图无法识别时返回空字典。
+    """
+    sizes = sizes or list(THUMBNAIL_SIZES)
+    missing = [size for size in sizes if not attachment_storage.exists(thumbnail_name(name, size))]
+    result = {size: thumbnail_name(name, size) for size in sizes if size not in missing}
+    if not missing:
+        return result
+
+    missing.sort(key=THUMBNAIL_SIZES.get, reverse=True)
+    try:
+        image = open_image(attachment_storage.path(name), THUMBNAIL_SIZES[missing[0]])
+        for size in missing:
+            max_size = THUMBNAIL_SIZES[size]
+            image.thumbnail((max_size, max_size), Image.LANCZOS)
+            save_thumbnail(image, thumbnail_name(name, size))
+            result[size] = thumbnail_name(name, size)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning(f"生成缩略图失败: {name}, {e}")
+    return result
+
+
+def get_thumbnail(name, size=DEFAULT_THUMBNAIL_SIZE):
+    """返回指定尺寸的缩略图路径，不存在时生成，无法生成时返回 None"""
+    return generate_thumbnails(name, [size]).get(size)
+
+
+def generate_thumbnails_on_commit(name):
+    """新上传的图片附件在事务提交后生成缩略图，失败不影响保存"""
+    if not is_image(name):
+        return
+    try:
+        generate_thumbnails(name)
+    except Exception as e:
+        logger.error(f"生成缩略图失败: {name}, {e}")
+
+
+def delete_thumbnails(name):
+    """删除附件的全部缩略图"""
+    for size in THUMBNAIL_SIZES:
+        path = thumbnail_name(name, size)
+        try:
+            attachment_storage.delete(path)
+        except OSError as e:
+            logger.warning(f"删除缩略图失败: {path}, {e}")
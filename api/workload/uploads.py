@@ -0,0 +1,158 @@
+"""
+附件分片上传
+
+1. 创建上传会话时声明文件名和大小，在存储中预先创建空文件
+2. 客户端按顺序上传分片，每个分片携带起始偏移量，请求体直接追加写入该文件，不在内存中缓冲
+3. 中断后通过查询会话得到已接收的字节数，从该偏移量继续上传
+4. 全部字节接收后转入按内容寻址的附件存储，会话变为已完成，
+   提交或修改工作量时通过 upload_id 引用，不再复制文件
+
+每个分片是一个独立的短请求，网络较慢时不会长时间占用一个工作进程。
+"""
+import fcntl
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .image_optimize import optimize_image_upload
+from .models import AttachmentBlob, UploadSession, attachment_path
+from .storage import attachment_storage
+
+logger = logging.getLogger(__name__)
+
+# 从请求体读取并写入文件的块大小
+UPLOAD_READ_SIZE = 64 * 1024
+
+
+class UploadOffsetMismatch(Exception):
+    """分片偏移量与服务端已接收的字节数不一致"""
+
+    def __init__(self, offset):
+        super().__init__(offset)
+        self.offset = offset
+
+
+def prune_upload_sessions():
+    """删除超过保留时间仍未被引用的上传会话及其文件"""
+    expire_before = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    for session in UploadSession.objects.filter(updated_at__lt=expire_before):
+        delete_upload_session(session)
+
+
+def delete_upload_session(session):
+    """删除上传会话和已写入的文件"""
+    if session.status == 'completed':
+        # 释放会话持有的引用，文件没有被其他工作量引用时删除
+        AttachmentBlob.release(session.path)
+    else:
+        remove_upload_file(session.path)
+    session.delete()
+
+
+def create_upload_session(user, filename, size):
+    """创建上传会话并预先创建空文件"""
+    prune_upload_sessions()
+    filename = os.path.basename(filename)
+    path = default_storage.generate_filename(attachment_path(user.username, filename))
+    full_path = default_storage.path(path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    open(full_path, 'wb').close()
+
+    session = UploadSession.objects.create(
+        user=user, filename=filename, path=path, size=size
+    )
+    logger.info(f"用户 {user.username} 创建上传会话 {session.pk}: {filename}, {size} 字节")
+    return session
+
+
+def store_completed_upload(session):
+    """把接收完整的文件转入按内容寻址的附件存储，返回存储路径，会话持有该文件的一个引用"""
+    with default_storage.open(session.path, 'rb') as f:
+        f.name = session.filename
+        name = attachment_storage.save(session.filename, optimize_image_upload(f))
+    remove_upload_file(session.path)
+    return name
+
+
+def remove_upload_file(path):
+    """删除上传中的临时文件及其所在的随机目录"""
+    try:
+        default_storage.delete(path)
+        os.rmdir(os.path.dirname(default_storage.path(path)))
+    except OSError as e:
+        logger.warning(f"删除上传文件失败: {path}, {e}")
+
+
+def append_chunk(session, offset, stream, length):
+    """
+    把请求体写入上传文件的 offset 位置
+
+    offset 必须等于已接收的字节数，否则抛出 UploadOffsetMismatch。
+    连接中断时只记录实际收到的字节数，客户端从新的偏移量继续上传。
+    返回更新后的会话。
+
+    读取请求体可能很慢，写入期间不开启事务、不锁数据库行：同一会话的分片通过文件锁串行，
+    拿到锁后按数据库中的偏移量重新检查，写完后带条件地推进偏移量。
+    接收完整后在锁外转入附件存储。
+    """
+    with open(default_storage.path(session.path), 'r+b') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # 同一会话的另一个分片正在写入，客户端稍后按返回的偏移量重试
+            raise UploadOffsetMismatch(session.offset)
+
+        current = UploadSession.objects.filter(
+            pk=session.pk, status='uploading'
+        ).values_list('offset', flat=True).first()
+        if current != offset:
+            raise UploadOffsetMismatch(session.offset if current is None else current)
+
+        remaining = length
+        # 截掉上一次中断时写入但未记录的字节
+        f.seek(offset)
+        f.truncate()
+        while remaining:
+            data = stream.read(min(UPLOAD_READ_SIZE, remaining))
+            if not data:
+                break
+            f.write(data)
+            remaining -= len(data)
+        f.flush()
+
+        new_offset = offset + length - remaining
+        updated = UploadSession.objects.filter(
+            pk=session.pk, offset=offset, status='uploading'
+        ).update(offset=new_offset, updated_at=timezone.now())
+    if not updated:
+        # 写入期间会话被取消
+        session.refresh_from_db()
+        raise UploadOffsetMismatch(session.offset)
+
+    session.offset = new_offset
+    if remaining:
+        logger.warning(f"上传会话 {session.pk} 分片未完整接收，已接收 {new_offset} 字节")
+    elif new_offset == session.size:
+        complete_upload(session)
+    return session
+
+
+def complete_upload(session):
+    """
+    接收完整后把文件转入附件存储，会话变为已完成
+
+    只有推进偏移量成功的那个请求会执行到这里，不需要加锁。
+    """
+    name = store_completed_upload(session)
+    updated = UploadSession.objects.filter(
+        pk=session.pk, status='uploading'
+    ).update(status='completed', path=name, updated_at=timezone.now())
+    if not updated:
+        # 转存期间会话被取消，释放刚增加的引用
+        AttachmentBlob.release(name)
+        raise UploadOffsetMismatch(session.offset)
+    session.refresh_from_db()
@@ -1,8 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import WorkloadViewSet
+from .views import WorkloadViewSet, ExportJobViewSet, UploadSessionViewSet
 
 router = DefaultRouter()
+# 需在工作量视图集之前注册，避免 export_jobs 被当作工作量ID匹配
+router.register('export_jobs', ExportJobViewSet, basename='export-job')
+router.register('uploads', UploadSessionViewSet, basename='upload-session')
 router.register('', WorkloadViewSet, basename='workload')
 
 urlpatterns = [
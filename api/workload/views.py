@@ -1,18 +1,49 @@
-from django.shortcuts import render
-from rest_framework import viewsets, permissions, status
+from django.shortcuts import render, get_object_or_404
+from rest_framework import viewsets, permissions, status, mixins, serializers
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Q
-from django.http import HttpResponse
-from .models import Workload
-from .serializers import WorkloadSerializer, WorkloadReviewSerializer
+from rest_framework.parsers import MultiPartParser, FormParser
+from django.db.models import Q, Count
+from django.http import FileResponse
+from django.conf import settings
+from .models import Workload, ExportJob, WorkloadRollup, UploadSession
+from .serializers import (
+    WorkloadSerializer,
+    WorkloadReviewSerializer,
+    WorkloadBulkReviewSerializer,
+    ExportJobSerializer,
+    ExportJobCreateSerializer,
+    WorkloadFilterSerializer,
+    WorkloadOrderingSerializer,
+    WorkloadSummaryFilterSerializer,
+    UploadSessionSerializer,
+    UploadSessionCreateSerializer,
+    UserSimpleSerializer,
+)
+from .pagination import KeysetPagination
+from mysite.conditional import ConditionalListMixin
+from .search import SearchMixin
+from .exports import build_export_file, XLSX_CONTENT_TYPE
+from .export_jobs import create_export_job, fail_stale_jobs, get_cache_path
+from .rollup import track_rollup
+from .bulk_review import apply_bulk_review
+from .imports import import_workloads
+from .media import serve_file
+from .storage import attachment_storage
+from .thumbnails import THUMBNAIL_SIZES, DEFAULT_THUMBNAIL_SIZE, get_thumbnail, is_image
+from .uploads import create_upload_session, append_chunk, delete_upload_session, UploadOffsetMismatch
+from .review_counts import (
+    get_review_count,
+    workload_mentor_key,
+    WORKLOAD_TEACHER_KEY,
+    PROJECT_TEACHER_KEY,
+)
+from project.models import Project
 import logging
 import traceback
 import os
 import django.db.utils
 import re
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
 from datetime import datetime
 
 # 获取logger
@@ -20,10 +51,26 @@ logger = logging.getLogger(__name__)
 
 # Create your views here.
 
-class WorkloadViewSet(viewsets.ModelViewSet):
+class WorkloadViewSet(ConditionalListMixin, SearchMixin, viewsets.ModelViewSet):
     """工作量视图集"""
     serializer_class = WorkloadSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    # 各动作的限流代价，未列出的动作为 1
+    # 附件和缩略图随列表页成批加载，已按工作量可见范围检查权限，不计入限流额度
+    throttle_costs = {
+        'create': 2,
+        'update': 2,
+        'partial_update': 2,
+        'attachment': 0,
+        'thumbnail': 0,
+        'facets': 2,
+        'summary': 2,
+        'search': 2,
+        'bulk_review': 5,
+        'import_workloads': 10,
+        'export': 10,
+    }
 
     def get_queryset(self):
         """获取用户可以访问的工作量列表"""
@@ -32,21 +79,21 @@ class WorkloadViewSet(viewsets.ModelViewSet):
 
         # 如果是获取已提交的工作量列表，只返回自己提交的
         if submitted:
-            return Workload.objects.filter(submitter=user)
+            return Workload.objects.with_related().filter(submitter=user)
 
         # 否则根据角色返回可访问的工作量
         if user.role == 'student':
             # 学生只能看到自己提交的工作量
-            return Workload.objects.filter(submitter=user)
+            return Workload.objects.with_related().filter(submitter=user)
         elif user.role == 'mentor':
             # 导师可以看到：1.自己提交的工作量 2.自己需要审核的学生工作量
-            return Workload.objects.filter(
+            return Workload.objects.with_related().filter(
                 Q(submitter=user) |  # 自己提交的
                 Q(mentor_reviewer=user, submitter__role='student')  # 需要审核的学生工作量
             )
         elif user.role == 'teacher':
             # 教师可以看到所有工作量
-            return Workload.objects.all()
+            return Workload.objects.with_related()
         return Workload.objects.none()
 
     def create(self, request, *args, **kwargs):
@@ -150,10 +197,11 @@ class WorkloadViewSet(viewsets.ModelViewSet):
             serializer.is_valid(raise_exception=True)
             
             # 如果是被驳回的工作量，修改后重置状态为待审核
-            if user.role != 'teacher' and instance.status in ['mentor_rejected', 'teacher_rejected']:
-                serializer.save(status='pending')
-            else:
-                serializer.save()
+            with track_rollup([instance.pk]):
+                if user.role != 'teacher' and instance.status in ['mentor_rejected', 'teacher_rejected']:
+                    serializer.save(status='pending')
+                else:
+                    serializer.save()
 
             return Response(serializer.data)
             
@@ -182,15 +230,14 @@ class WorkloadViewSet(viewsets.ModelViewSet):
                 {"detail": "只能删除未审核或审核未通过的工作量"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        instance.delete()
+        with track_rollup([instance.pk]):
+            instance.delete()
 
-    @action(detail=False, methods=['get'])
-    def pending_review(self, request):
-        """获取待审核的工作量列表"""
-        user = request.user
+    def get_pending_review_queryset(self, user):
+        """待审核工作量查询集，非导师/教师返回 None"""
         if user.role == 'mentor':
             # 导师获取自己需要审核的待审核工作量
-            queryset = Workload.objects.filter(
+            return Workload.objects.with_related().filter(
                 mentor_reviewer=user,
                 submitter__role='student'
             ).filter(
@@ -198,41 +245,68 @@ class WorkloadViewSet(viewsets.ModelViewSet):
             )
         elif user.role == 'teacher':
             # 教师获取所有需要教师审核的工作量
-            queryset = Workload.objects.filter(
+            return Workload.objects.with_related().filter(
                 Q(status='mentor_approved') |  # 导师已审核通过的工作量
                 Q(submitter__role='mentor', status='pending')  # 导师提交的待审核工作量
             )
-        else:
-            return Response(
-                {"detail": "只有导师和教师可以查看待审核工作量"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return None
 
-    @action(detail=False, methods=['get'])
-    def reviewed(self, request):
-        """获取已审核的工作量列表"""
-        user = request.user
+    def get_reviewed_queryset(self, user):
+        """已审核工作量查询集，非导师/教师返回 None"""
         if user.role == 'mentor':
             # 导师获取自己已审核的工作量
-            queryset = Workload.objects.filter(
+            return Workload.objects.with_related().filter(
                 mentor_reviewer=user,
                 submitter__role='student'
             ).exclude(status='pending')
         elif user.role == 'teacher':
             # 教师获取所有已审核的工作量
-            queryset = Workload.objects.filter(
+            return Workload.objects.with_related().filter(
                 teacher_reviewer=user)
-        else:
+        return None
+
+    @action(detail=False, methods=['get'])
+    def pending_review(self, request):
+        """获取待审核的工作量列表"""
+        queryset = self.get_pending_review_queryset(request.user)
+        if queryset is None:
+            return Response(
+                {"detail": "只有导师和教师可以查看待审核工作量"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        return self.list_response(queryset)
+
+    @action(detail=False, methods=['get'])
+    def review_counts(self, request):
+        """获取待审核数量，计数缓存在 Redis 中，状态变化时失效"""
+        user = request.user
+        queryset = self.get_pending_review_queryset(user)
+        if queryset is None:
+            return Response(
+                {"detail": "只有导师和教师可以查看待审核数量"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        key = workload_mentor_key(user.id) if user.role == 'mentor' else WORKLOAD_TEACHER_KEY
+        counts = {'workload_pending': get_review_count(key, queryset)}
+        if user.role == 'teacher':
+            counts['project_pending'] = get_review_count(
+                PROJECT_TEACHER_KEY, Project.objects.filter(review_status='pending')
+            )
+        return Response(counts)
+
+    @action(detail=False, methods=['get'])
+    def reviewed(self, request):
+        """获取已审核的工作量列表"""
+        queryset = self.get_reviewed_queryset(request.user)
+        if queryset is None:
             return Response(
                 {"detail": "只有导师和教师可以查看已审核工作量列表"},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     @action(detail=False, methods=['get'])
     def all_workloads(self, request):
@@ -244,9 +318,77 @@ class WorkloadViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        queryset = Workload.objects.all()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        # 服务端筛选和排序，配合游标分页只返回一页数据
+        filters = WorkloadFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        ordering = WorkloadOrderingSerializer(data=request.query_params)
+        ordering.is_valid(raise_exception=True)
+        self.keyset_ordering = ordering.get_ordering()
+
+        queryset = filters.filter_queryset(Workload.objects.with_related()).order_by(*self.keyset_ordering)
+        return self.list_response(queryset)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """教师工作量总览的分面统计：按状态和来源计数"""
+        user = request.user
+        if user.role != 'teacher':
+            return Response(
+                {"detail": "只有教师可以查看工作量统计"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        filters = WorkloadFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+
+        # 一次 GROUP BY (status, source) 查询，再在内存中汇总两个维度
+        # order_by() 清除默认排序，避免 created_at 被加入分组
+        rows = filters.filter_queryset(Workload.objects.all()).order_by().values(
+            'status', 'source'
+        ).annotate(count=Count('id'))
+
+        status_counts = {value: 0 for value, _ in Workload.STATUS_CHOICES}
+        source_counts = {value: 0 for value, _ in Workload.SOURCE_CHOICES}
+        total = 0
+        for row in rows:
+            status_counts[row['status']] = status_counts.get(row['status'], 0) + row['count']
+            source_counts[row['source']] = source_counts.get(row['source'], 0) + row['count']
+            total += row['count']
+
+        return Response({
+            'total': total,
+            'status': status_counts,
+            'source': source_counts,
+        })
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """已审核工作量汇总，只读取月度汇总表"""
+        user = request.user
+        filters = WorkloadSummaryFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+
+        queryset = filters.filter_queryset(WorkloadRollup.objects.select_related('user'))
+        # 教师可以查看所有用户，其他角色只能查看自己
+        if user.role != 'teacher':
+            queryset = queryset.filter(user=user)
+
+        summaries = {}
+        for rollup in queryset.order_by('user_id', 'month', 'source'):
+            summary = summaries.get(rollup.user_id)
+            if summary is None:
+                summary = summaries[rollup.user_id] = {
+                    'user': UserSimpleSerializer(rollup.user).data,
+                    'total': 0.0,
+                    'by_source': {},
+                    'by_month': {},
+                }
+            month = rollup.month.strftime('%Y-%m')
+            summary['total'] += rollup.amount
+            summary['by_source'][rollup.source] = summary['by_source'].get(rollup.source, 0.0) + rollup.amount
+            summary['by_month'][month] = summary['by_month'].get(month, 0.0) + rollup.amount
+
+        return Response(list(summaries.values()))
 
     @action(detail=True, methods=['post'])
     def review(self, request, pk=None):
@@ -280,7 +422,8 @@ class WorkloadViewSet(viewsets.ModelViewSet):
         )
         
         if serializer.is_valid():
-            serializer.save()
+            with track_rollup([instance.pk]):
+                serializer.save()
             # 返回更新后的完整工作量信息
             return Response(
                 self.get_serializer(instance).data
@@ -290,6 +433,126 @@ class WorkloadViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(detail=True, methods=['get'])
+    def attachment(self, request, pk=None):
+        """
+        下载附件
+
+        可见范围与工作量列表相同（管理员可以访问全部附件），
+        文件传输由前置代理完成或由 Django 流式返回，?download=true 时以附件形式下载。
+        """
+        workload = self.get_attachment_workload(pk)
+        if not workload.attachments:
+            return Response(
+                {"detail": "该工作量没有附件"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            path = workload.attachments.path
+            filename = workload.original_filename or os.path.basename(workload.attachments.name)
+            as_attachment = request.query_params.get('download', 'false').lower() == 'true'
+            return serve_file(request._request, workload.attachments.name, path, filename, as_attachment)
+        except FileNotFoundError:
+            logger.error(f"附件文件不存在: {workload.attachments.name}")
+            return Response(
+                {"detail": "附件文件不存在"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+    @action(detail=True, methods=['get'])
+    def thumbnail(self, request, pk=None):
+        """
+        图片附件的缩略图
+
+        ?size= 可选 small、medium、large，默认 medium。缩略图不存在时生成并缓存，
+        权限检查与下载附件相同。
+        """
+        size = request.query_params.get('size', DEFAULT_THUMBNAIL_SIZE)
+        if size not in THUMBNAIL_SIZES:
+            return Response(
+                {"detail": f"size 只能是 {', '.join(THUMBNAIL_SIZES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        workload = self.get_attachment_workload(pk)
+        if not workload.attachments or not is_image(workload.attachments.name):
+            return Response(
+                {"detail": "该工作量没有图片附件"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        name = get_thumbnail(workload.attachments.name, size)
+        if name is None:
+            return Response(
+                {"detail": "无法生成缩略图"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        filename = os.path.splitext(workload.original_filename or 'thumbnail')[0] + os.path.splitext(name)[1]
+        return serve_file(request._request, name, attachment_storage.path(name), filename)
+
+    def get_attachment_workload(self, pk):
+        """按下载附件的可见范围获取工作量，管理员可以访问全部附件"""
+        queryset = Workload.objects.all() if self.request.user.is_staff else self.get_queryset()
+        return get_object_or_404(queryset.select_related(None).prefetch_related(None), pk=pk)
+
+    @action(detail=False, methods=['post'])
+    def bulk_review(self, request):
+        """批量审核工作量，返回每条工作量的审核结果"""
+        user = request.user
+        if user.role not in ['mentor', 'teacher']:
+            return Response(
+                {"detail": "只有导师和教师可以审核工作量"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = WorkloadBulkReviewSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = serializer.validated_data
+        updated, results = apply_bulk_review(user, data['ids'], data['status'], data['comment'])
+        logger.info(f"用户 {user.username} 批量审核工作量 {len(data['ids'])} 条，成功 {updated} 条")
+        return Response({
+            'updated': updated,
+            'failed': sum(1 for result in results if not result['success']),
+            'results': results,
+        })
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def import_workloads(self, request):
+        """从 .xlsx / .csv 文件批量导入工作量，返回逐行错误报告"""
+        user = request.user
+        if user.role != 'teacher':
+            return Response(
+                {"detail": "只有教师可以导入工作量"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {"detail": "请选择要导入的文件"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        dry_run = str(request.data.get('dry_run', 'false')).lower() == 'true'
+        try:
+            result = import_workloads(upload, upload.name, dry_run=dry_run)
+        except serializers.ValidationError as e:
+            # 文件格式错误（扩展名不支持、文件损坏、缺少列等），整个文件无法导入
+            return Response(
+                {"detail": '; '.join(str(message) for message in e.detail)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        logger.info(
+            f"用户 {user.username} 导入工作量文件 {upload.name}，"
+            f"共 {result['total']} 行，写入 {result['created']} 行，失败 {len(result['errors'])} 行"
+        )
+        return Response(result)
+
     @action(detail=False, methods=['post'])
     def export(self, request):
         """导出选中的工作量为Excel文件"""
@@ -311,92 +574,21 @@ class WorkloadViewSet(viewsets.ModelViewSet):
 
             # 获取工作量数据
             workloads = Workload.objects.filter(id__in=workload_ids)
-            if not workloads:
+            if not workloads.exists():
                 return Response(
                     {"detail": "未找到指定的工作量"},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # 创建Excel工作簿
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "工作量记录"
-
-            # 设置表头样式
-            header_font = Font(bold=True)
-            header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-            header_alignment = Alignment(horizontal='center', vertical='center')
-
-            # 设置表头
-            headers = [
-                '提交人', '工作量名称', '工作量内容', '工作来源', '工作类型',
-                '开始日期', '结束日期', '工作强度类型', '工作强度值', '状态',
-                '导师评语', '导师审核时间', '教师评语', '教师审核时间',
-                '创建时间', '大创阶段', '参与人及占比', '已发助教工资'
-            ]
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-
-            # 写入数据
-            for row, workload in enumerate(workloads, 2):
-                ws.cell(row=row, column=1, value=workload.submitter.username)
-                ws.cell(row=row, column=2, value=workload.name)
-                ws.cell(row=row, column=3, value=workload.content)
-                ws.cell(row=row, column=4, value=workload.get_source_display())
-                ws.cell(row=row, column=5, value=workload.get_work_type_display())
-                ws.cell(row=row, column=6, value=workload.start_date.strftime('%Y-%m-%d'))
-                ws.cell(row=row, column=7, value=workload.end_date.strftime('%Y-%m-%d'))
-                ws.cell(row=row, column=8, value=workload.get_intensity_type_display())
-                ws.cell(row=row, column=9, value=workload.intensity_value)
-                ws.cell(row=row, column=10, value=workload.get_status_display())
-                ws.cell(row=row, column=11, value=workload.mentor_comment)
-                ws.cell(row=row, column=12, value=workload.mentor_review_time.strftime('%Y-%m-%d %H:%M:%S') if workload.mentor_review_time else '')
-                ws.cell(row=row, column=13, value=workload.teacher_comment)
-                ws.cell(row=row, column=14, value=workload.teacher_review_time.strftime('%Y-%m-%d %H:%M:%S') if workload.teacher_review_time else '')
-                ws.cell(row=row, column=15, value=workload.created_at.strftime('%Y-%m-%d %H:%M:%S'))
-
-                # 大创阶段（仅当来源为大创）
-                ws.cell(row=row, column=16,
-                        value=workload.get_source_display() == '大创' and workload.get_innovation_stage_display() or '')
-
-                # 大创参与人及占比
-                if workload.source == 'innovation':
-                    share_text = "; ".join(
-                        [f"{share.user.username}:{share.percentage}%" for share in workload.shares.all()]
-                    )
-                    ws.cell(row=row, column=17, value=share_text)
-                else:
-                    ws.cell(row=row, column=17, value='')
-
-                # 已发助教工资（仅当来源为助教）
-                ws.cell(row=row, column=18,
-                        value=workload.assistant_salary_paid if workload.source == 'assistant' else '')
-
-            # 调整列宽
-            for column in ws.columns:
-                max_length = 0
-                column = list(column)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                ws.column_dimensions[column[0].column_letter].width = adjusted_width
-
-            # 创建响应
-            response = HttpResponse(
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename=workload_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-
-            # 保存文件
-            wb.save(response)
-            return response
+            # 以 write_only 模式写入临时文件，再分块流式返回，内存占用与行数无关
+            export_file = build_export_file(workloads)
+            filename = f'workload_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+            return FileResponse(
+                export_file,
+                as_attachment=True,
+                filename=filename,
+                content_type=XLSX_CONTENT_TYPE
+            )
 
         except Exception as e:
             logger.error(f"导出工作量失败: {str(e)}")
@@ -405,3 +597,137 @@ class WorkloadViewSet(viewsets.ModelViewSet):
                 {"detail": f"导出失败: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class ExportJobViewSet(mixins.CreateModelMixin,
+                       mixins.RetrieveModelMixin,
+                       viewsets.GenericViewSet):
+    """后台导出任务视图集：提交任务、查询进度、下载结果"""
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_costs = {'create': 10, 'download': 2}
+
+    def get_queryset(self):
+        """只能访问自己提交的导出任务"""
+        return ExportJob.objects.filter(user=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        """查询任务进度，超时未完成的任务标记为失败"""
+        fail_stale_jobs(self.get_queryset().filter(pk=kwargs['pk']))
+        return super().retrieve(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        """提交导出任务"""
+        if request.user.role != 'teacher':
+            return Response(
+                {"detail": "只有教师可以导出工作量"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = ExportJobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = create_export_job(request.user, serializer.get_params())
+        return Response(
+            self.get_serializer(job).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """下载已完成的导出文件"""
+        job = self.get_object()
+        if job.status != 'finished':
+            return Response(
+                {"detail": "导出任务尚未完成"},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            export_file = open(get_cache_path(job.cache_key), 'rb')
+        except FileNotFoundError:
+            return Response(
+                {"detail": "导出文件已过期，请重新导出"},
+                status=status.HTTP_410_GONE
+            )
+
+        filename = f'workload_export_{job.created_at.strftime("%Y%m%d_%H%M%S")}.xlsx'
+        return FileResponse(
+            export_file,
+            as_attachment=True,
+            filename=filename,
+            content_type=XLSX_CONTENT_TYPE
+        )
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """附件分片上传：创建会话、按偏移量上传分片、查询进度、取消上传"""
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_costs = {'create': 2, 'chunk': 2}
+
+    def get_queryset(self):
+        """只能访问自己创建的上传会话"""
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        """创建上传会话"""
+        serializer = UploadSessionCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = create_upload_session(
+            request.user, serializer.validated_data['filename'], serializer.validated_data['size']
+        )
+        return Response(
+            self.get_serializer(session).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        """
+        上传一个分片
+
+        请求体为分片的原始字节，查询参数 offset 为分片在文件中的起始位置。
+        偏移量与已接收的字节数不一致时返回 409 和当前偏移量，客户端从该位置继续上传。
+        """
+        session = self.get_object()
+        if session.status != 'uploading':
+            return Response(
+                {"detail": "上传已完成", "offset": session.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            offset = int(request.query_params.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or '')
+        except ValueError:
+            return Response(
+                {"detail": "请提供分片偏移量 offset 和 Content-Length"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if length <= 0 or length > settings.UPLOAD_CHUNK_MAX_SIZE:
+            return Response(
+                {"detail": f"分片大小必须在 1 到 {settings.UPLOAD_CHUNK_MAX_SIZE} 字节之间"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if offset + length > session.size:
+            return Response(
+                {"detail": "分片超出声明的文件大小"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            # 直接读取原始请求流，不经过 DRF 解析器，避免整块读入内存
+            session = append_chunk(session, offset, request._request, length)
+        except UploadOffsetMismatch as e:
+            return Response(
+                {"detail": "分片偏移量不正确", "offset": e.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(self.get_serializer(session).data)
+
+    def perform_destroy(self, instance):
+        """取消上传，删除已写入的文件"""
+        delete_upload_session(instance)